@@ -19,11 +19,17 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'bets.middleware.StaticFilesMiddleware',  # answers before gzip: assets are precompressed
+    'bets.middleware.QueryContextMiddleware',  # labels slow-query log entries with the view
+    'django.middleware.gzip.GZipMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'bets.middleware.PrimaryPinMiddleware',
+    'bets.middleware.ProfilerMiddleware',  # staff only, ?_profile=1 or X-Bets-Profile: 1
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -46,20 +52,90 @@ TEMPLATES = [
     },
 ]
 
+# Optional Jinja2 engine for the hot pages (dashboard, market detail/history).
+# Templates live in bets/jinja2/; views pick the engine via HOT_TEMPLATE_ENGINE.
+try:
+    import jinja2  # noqa: F401
+except ImportError:
+    HOT_TEMPLATE_ENGINE = 'django'
+else:
+    TEMPLATES.append({
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'bets.jinja_env.environment',
+            'context_processors': TEMPLATES[0]['OPTIONS']['context_processors'],
+        },
+    })
+    HOT_TEMPLATE_ENGINE = 'jinja2'
+
 
 WSGI_APPLICATION = 'be_the_house.wsgi.application'
 
+# Compile templates, build the URL resolver and check the DB connection hooks
+# when wsgi.py loads, so a new worker's first requests run at steady-state
+# speed (bets.warmup; measure with `manage.py bench_startup`). Enable it per
+# deployment.
+WARMUP_ON_BOOT = False
+
 
 DATABASES = {
     'default': {
     'ENGINE': 'django.db.backends.sqlite3',
     'NAME': BASE_DIR / 'db.sqlite3',
+    'CONN_MAX_AGE': 600,  # persistent connections, pragmas below are set once per connection
     }
 }
 
 
+# SQLite profile for concurrent load: WAL lets readers run alongside the writer,
+# busy_timeout makes writers wait for the lock instead of raising "database is locked".
+# Applied on connection_created in bets.signals; ledger services use BEGIN IMMEDIATE.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,  # first, so the pragmas below wait for locks too
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+}
+# Funnel deposits/wagers/settlements through one in-process writer thread (bets.db).
+BETS_SERIALIZED_WRITES = False
+
+# Statements slower than this are logged with their query plan (bets.slowlog);
+# None turns the wrapper off. Set it per environment (e.g. 100 in production);
+# summarise with `manage.py slow_queries`.
+SLOW_QUERY_MS = None
+SLOW_QUERY_LOG = BASE_DIR / 'logs' / 'slow_queries.jsonl'
+
+
+# Read replicas: SQLite copies of default, refreshed with `manage.py sync_replicas`.
+# e.g. READ_REPLICA_FILES = [BASE_DIR / 'db.replica1.sqlite3']
+READ_REPLICA_FILES = []
+for _i, _name in enumerate(READ_REPLICA_FILES, start=1):
+    DATABASES[f'replica{_i}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _name,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['bets.routers.ReplicaRouter']
+PRIMARY_PIN_SECONDS = 10  # reads stay on default this long after a user writes
+
+
 AUTH_PASSWORD_VALIDATORS = []
 
+# Fast authenticated path: sessions, the user row, wallet and invite count come
+# from the cache (bets.usercache). Use a shared cache (Redis/Memcached) when
+# running more than one process; LocMem is per process, so with it the user
+# row (is_active, password hash) is still read from the database.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['bets.usercache.CachedModelBackend']
+
 
 LANGUAGE_CODE = 'en-au'
 TIME_ZONE = 'Australia/Melbourne'
@@ -69,12 +145,56 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # hashed names + .gz copies at collectstatic; served by bets.middleware.StaticFilesMiddleware
+    'staticfiles': {'BACKEND': 'bets.staticfiles.CompressedManifestStaticFilesStorage'},
+}
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
 
+# Cold storage for settled markets / old ledger rows (manage.py archive_markets)
+ARCHIVE_DIR = BASE_DIR / 'archive'
+ARCHIVE_AFTER_DAYS = 180
+
+
+# Online snapshots (bets.backup; `manage.py backup_db [--verify]`, `manage.py restore_db --at ...`)
+BACKUP_DIR = BASE_DIR / 'backups'
+BACKUP_KEEP = 14                 # newest snapshots kept; older ones are deleted after each backup
+BACKUP_PAGES_PER_STEP = 256      # pages copied while holding the read lock (1 MB at 4 KB pages)
+BACKUP_STEP_SLEEP = 0.005        # seconds between steps, for writers to get in
+
+
+# On-demand request profiles (bets.profiling); browse them under admin > Request profiles
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_KEEP = 200              # older profiles and their files are deleted
+PROFILE_SAMPLE_INTERVAL = 0.001  # seconds between stack samples for the flame graph
+
+
+# Parlays (bets.services.place_parlay): most legs one parlay may combine
+PARLAY_MAX_LEGS = 8
+
+
+# Activity feed (bets.activity) on event and market pages
+ACTIVITY_CAP = 500          # newest rows kept per event (or per market outside an event)
+ACTIVITY_TRIM_BATCH = 100   # rows allowed past the cap before one DELETE trims back to it
+ACTIVITY_PAGE = 30          # rows per page render or poll
+
+
+# Market / event search (bets.search): only the newest N visible matches of each kind are ranked
+SEARCH_CANDIDATES = 1000
+
+
 # Dev email: password reset messages saved as files
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'tmp' / 'emails'  # make sure this dir exists
 DEFAULT_FROM_EMAIL = 'noreply@be-the-house.local'
+
+# Notification outbox (bets.notifications), drained by `manage.py send_notifications --loop`
+NOTIFICATION_DIGEST_MINUTES = 15   # a user's notifications are held this long so they go out as one digest
+NOTIFICATION_MAX_ATTEMPTS = 5      # failed digests are retried with exponential backoff, then marked FAILED
+NOTIFICATION_RETRY_SECONDS = 60    # first retry delay; doubles per attempt, capped at 6 hours
+NOTIFICATION_SITE_URL = 'http://localhost:8000'  # links in digest emails
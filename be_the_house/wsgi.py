@@ -3,4 +3,7 @@ from django.core.wsgi import get_wsgi_application
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'be_the_house.settings')
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+from bets.warmup import warm_up_if_enabled  # noqa: E402  (needs the app registry)
+warm_up_if_enabled()
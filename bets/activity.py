@@ -0,0 +1,108 @@
+# bets/activity.py
+"""Per-event and per-market activity feed.
+
+Deriving the feed on each page view would mean a UNION over wagers,
+memberships and both ledgers. Instead the services append an ``Activity`` row
+for each thing worth showing (a wager or parlay placed, a member joined, a
+market settled or voided), inside the transaction that made the change.
+
+Reads are one range of an index:
+
+* ``feed(event=...)`` reads ``(event, id)``;
+* ``feed(market=...)`` reads ``(market, id)``.
+
+``poll(since, ...)`` reads the same ranges after a cursor (the last id the
+client saw), oldest first, and says whether more rows follow. A client
+therefore pages forward through a burst larger than one page without gaps.
+
+Each scope keeps its newest ``ACTIVITY_CAP`` rows. A scope is the event, or
+the market itself for a market without an event. After each write, one probe
+checks whether the scope has grown ``ACTIVITY_TRIM_BATCH`` rows past the cap.
+When it has, one DELETE removes everything older than the cap. The table
+therefore stays bounded without deleting on every write.
+"""
+from __future__ import annotations
+from typing import Iterable
+
+from django.conf import settings
+from django.db.models import Subquery
+
+from .models import Activity
+
+
+def cap() -> int:
+    return getattr(settings, 'ACTIVITY_CAP', 500)
+
+
+def trim_batch() -> int:
+    return getattr(settings, 'ACTIVITY_TRIM_BATCH', 100)
+
+
+def page_size() -> int:
+    return getattr(settings, 'ACTIVITY_PAGE', 30)
+
+
+def record(kind: str, text: str, event_id=None, market_id=None, user_id=None) -> Activity:
+    row = Activity.objects.create(event_id=event_id, market_id=market_id, user_id=user_id, kind=kind, text=text[:255])
+    trim(event_id, market_id)
+    return row
+
+
+def record_many(rows: Iterable[Activity]) -> int:
+    """Append ``rows`` with one insert, then trim each scope they touch."""
+    rows = list(rows)
+    for row in rows:
+        row.text = row.text[:255]
+    Activity.objects.bulk_create(rows)
+    for event_id, market_id in {_scope_key(r.event_id, r.market_id) for r in rows}:
+        trim(event_id, market_id)
+    return len(rows)
+
+
+def _scope_key(event_id, market_id):
+    return (event_id, None) if event_id is not None else (None, market_id)
+
+
+def _scope(event_id, market_id):
+    if event_id is not None:
+        return Activity.objects.filter(event_id=event_id)
+    return Activity.objects.filter(event_id=None, market_id=market_id)
+
+
+def trim(event_id, market_id=None) -> int:
+    """Delete the scope's rows older than its newest ``cap()``, once ``trim_batch()`` have piled up past it."""
+    newest = _scope(event_id, market_id).order_by('-id').values('id')
+    limit = cap()
+    if not newest[limit + trim_batch() - 1:limit + trim_batch()].exists():
+        return 0
+    deleted, _ = _scope(event_id, market_id).filter(id__lte=Subquery(newest[limit:limit + 1])).delete()
+    return deleted
+
+
+def _rows(event, market):
+    qs = Activity.objects.filter(market=market) if market is not None else Activity.objects.filter(event=event)
+    return qs.select_related('user')
+
+
+def feed(event=None, market=None, limit: int | None = None) -> list[Activity]:
+    """The newest ``limit`` rows, newest first."""
+    return list(_rows(event, market).order_by('-id')[:limit or page_size()])
+
+
+def poll(since: int, event=None, market=None, limit: int | None = None) -> tuple[list[Activity], bool]:
+    """Up to ``limit`` rows after ``since``, oldest first, and whether more follow them."""
+    limit = limit or page_size()
+    rows = list(_rows(event, market).filter(id__gt=since).order_by('id')[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def as_json(row: Activity) -> dict:
+    return {
+        'id': row.id,
+        'kind': row.kind,
+        'text': row.text,
+        'user': row.user.username if row.user else None,
+        'event_id': row.event_id,
+        'market_id': row.market_id,
+        'created_at': row.created_at.isoformat(),
+    }
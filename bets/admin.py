@@ -1,41 +1,277 @@
+import csv
+
 from django.contrib import admin
-from .models import Wallet, Transaction, Event, Market, Outcome, Wager, EventWallet, EventTransaction, UserSettings
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Max
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
+
+from . import profiling
+from .models import (
+    Wallet, Transaction, Event, Market, Outcome, Wager, EventWallet, EventTransaction, UserSettings, RequestProfile,
+    MarketTemplate, MarketTemplateOutcome, Notification, Parlay, ParlayLeg,
+)
+from .routers import read_from_replica
+from .services import void_markets
+
+COUNT_CAP = 10_000  # filtered changelists count at most this many rows
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never runs COUNT(*) over a whole ledger table.
+
+    Every changelist first counts at most ``COUNT_CAP`` rows (through the
+    filter's index, if any); below the cap that count is exact. Filtered
+    changelists stop there, so narrow the filter or the date hierarchy to page
+    further back. Unfiltered ones past the cap use the table's own row estimate:
+    ``pg_class`` on PostgreSQL, ``sqlite_stat1`` on SQLite once ``ANALYZE`` has
+    run, and otherwise the largest primary key, which overestimates after
+    deletes.
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        exact = qs.order_by()[:COUNT_CAP].count()
+        if exact < COUNT_CAP or qs.query.where:
+            return exact
+        return max(self._table_estimate(qs), COUNT_CAP)
+
+    @staticmethod
+    def _table_estimate(qs):
+        connection = connections[qs.db]
+        table = qs.model._meta.db_table
+        if connection.vendor == 'postgresql':
+            sql = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s"
+        elif connection.vendor == 'sqlite':
+            # the first number of any index's stat is the table's row count
+            sql = "SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s LIMIT 1"
+        else:
+            sql = None
+        if sql:
+            try:
+                with connection.cursor() as c:
+                    c.execute(sql, [table])
+                    row = c.fetchone()
+            except DatabaseError:  # no sqlite_stat1 before the first ANALYZE
+                row = None
+            if row and row[0] > 0:
+                return row[0]
+        return qs.model._default_manager.using(qs.db).aggregate(n=Max('pk'))['n'] or 0
+
+
+class ReplicaChangelistMixin:
+    # ledger changelists are read-heavy; serve them from a replica
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        with read_from_replica():
+            return super().changelist_view(request, extra_context)
+
+
+class LargeTableAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    actions = ['export_csv']
+
+    class _Echo:
+        def write(self, value):
+            return value
+
+    @admin.action(description='Export selected rows as CSV')
+    def export_csv(self, request, queryset):
+        fields = [f.attname for f in self.model._meta.concrete_fields]
+        writer = csv.writer(self._Echo())
+
+        def rows():
+            yield writer.writerow(fields)
+            for row in queryset.order_by('pk').values_list(*fields).iterator(chunk_size=2000):
+                yield writer.writerow(row)
+
+        response = StreamingHttpResponse(rows(), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{self.model._meta.model_name}.csv"'
+        return response
+
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
     list_display = ('user','balance')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(LargeTableAdmin):
     list_display = ('user','type','amount','created_at','note')
     list_filter = ('type',)
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    date_hierarchy = 'created_at'
 
 class OutcomeInline(admin.TabularInline):
     model = Outcome
     extra = 0
 
 @admin.register(Market)
-class MarketAdmin(admin.ModelAdmin):
+class MarketAdmin(LargeTableAdmin):
     list_display = ('title','event','creator','house','house_margin','max_bet_limit','status','created_at')
+    list_filter = ('status',)
+    list_select_related = ('event', 'creator', 'house')
+    autocomplete_fields = ('event', 'creator', 'house')
+    search_fields = ('title',)
+    date_hierarchy = 'created_at'
     inlines = [OutcomeInline]
+    actions = ['export_csv', 'suspend_selected', 'reopen_selected', 'void_selected']
+
+    @admin.action(description='Suspend selected open markets')
+    def suspend_selected(self, request, queryset):
+        n = queryset.filter(status=Market.OPEN).update(status=Market.SUSPENDED)
+        self.message_user(request, f"Suspended {n} market(s).")
+
+    @admin.action(description='Reopen selected suspended markets')
+    def reopen_selected(self, request, queryset):
+        n = queryset.filter(status=Market.SUSPENDED).update(status=Market.OPEN)
+        self.message_user(request, f"Reopened {n} market(s).")
+
+    @admin.action(description='Void selected markets and refund open stakes')
+    def void_selected(self, request, queryset):
+        n = void_markets(queryset.values_list('id', flat=True))
+        self.message_user(request, f"Voided {n} market(s).")
+
+class MarketTemplateOutcomeInline(admin.TabularInline):
+    model = MarketTemplateOutcome
+    extra = 0
+
+@admin.register(MarketTemplate)
+class MarketTemplateAdmin(admin.ModelAdmin):
+    list_display = ('title','owner','house_margin','max_bet_limit','created_at')
+    list_select_related = ('owner',)
+    raw_id_fields = ('owner',)
+    search_fields = ('title',)
+    inlines = [MarketTemplateOutcomeInline]
 
 @admin.register(UserSettings)
 class UserSettingsAdmin(admin.ModelAdmin):
     list_display = ('user','default_max_bet_limit')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ('name','creator','default_house','is_active','created_at')
+    list_select_related = ('creator', 'default_house')
+    autocomplete_fields = ('creator', 'default_house')
+    search_fields = ('name',)
+    actions = ['void_open_markets']
+
+    @admin.action(description='Void all open markets of selected events and refund stakes')
+    def void_open_markets(self, request, queryset):
+        n = void_markets(Market.objects.filter(event__in=queryset).values_list('id', flat=True))
+        self.message_user(request, f"Voided {n} market(s).")
 
 @admin.register(Wager)
-class WagerAdmin(admin.ModelAdmin):
+class WagerAdmin(LargeTableAdmin):
     list_display = ('user','market','outcome','stake','odds_at_placement','status','placed_at')
+    list_filter = ('status',)
+    list_select_related = ('user', 'market', 'outcome')
+    raw_id_fields = ('user', 'market', 'outcome')
+    date_hierarchy = 'placed_at'
+
+class ParlayLegInline(admin.TabularInline):
+    model = ParlayLeg
+    extra = 0
+    raw_id_fields = ('market', 'outcome')
+    readonly_fields = ('market_title', 'outcome_title')
+
+@admin.register(Parlay)
+class ParlayAdmin(LargeTableAdmin):
+    list_display = ('user','event','stake','odds_at_placement','open_legs','payout','status','placed_at')
+    list_filter = ('status',)
+    list_select_related = ('user', 'event')
+    raw_id_fields = ('user', 'event')
+    date_hierarchy = 'placed_at'
+    inlines = [ParlayLegInline]
 
 @admin.register(EventWallet)
 class EventWalletAdmin(admin.ModelAdmin):
     list_display = ('event','balance')
+    list_select_related = ('event',)
+    raw_id_fields = ('event',)
 
 @admin.register(EventTransaction)
-class EventTransactionAdmin(admin.ModelAdmin):
+class EventTransactionAdmin(LargeTableAdmin):
     list_display = ('event','type','amount','created_at','note')
     list_filter  = ('type',)
+    list_select_related = ('event',)
+    raw_id_fields = ('event',)
+    date_hierarchy = 'created_at'
+
+
+@admin.register(Notification)
+class NotificationAdmin(LargeTableAdmin):
+    list_display = ('created_at','user','kind','text','status','attempts','next_attempt_at','sent_at')
+    list_filter = ('status','kind')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    date_hierarchy = 'created_at'
+    actions = ['export_csv', 'retry_selected']
+
+    @admin.action(description='Retry selected failed notifications')
+    def retry_selected(self, request, queryset):
+        n = queryset.filter(status=Notification.FAILED).update(
+            status=Notification.PENDING, attempts=0, next_attempt_at=timezone.now(), last_error='',
+        )
+        self.message_user(request, f"Queued {n} notification(s) for the next digest run.")
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at','user','method','path','status_code','duration_ms','query_count','query_ms','downloads')
+    list_filter = ('view_name',)
+    list_select_related = ('user',)
+    search_fields = ('path',)
+    fields = ('created_at','user','method','path','view_name','status_code','duration_ms','query_count','query_ms',
+              'downloads','slowest_queries','top_functions')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/<str:kind>/', self.admin_site.admin_view(self.download),
+                 name='bets_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download(self, request, pk, kind):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if not self.has_view_permission(request, profile) or kind not in profiling.ARTIFACTS:
+            raise Http404
+        file = profiling.artifact_path(profile, kind)
+        if not file.exists():
+            raise Http404
+        return FileResponse(open(file, 'rb'), as_attachment=True, filename=f"profile-{pk}{profiling.ARTIFACTS[kind]}")
+
+    @admin.display(description='Artifacts')
+    def downloads(self, obj):
+        return format_html_join(' | ', '<a href="{}">{}</a>', (
+            (reverse('admin:bets_requestprofile_download', args=[obj.pk, kind]), kind) for kind in profiling.ARTIFACTS
+        ))
+
+    @admin.display(description='Slowest queries')
+    def slowest_queries(self, obj):
+        return format_html_join('', '<p><b>{} ms</b> <code>{}</code><br><small>{}</small></p>', (
+            (q['ms'], q['sql'][:500], ' ← '.join(reversed(q['stack'][-3:]))) for q in profiling.slowest_queries(obj)
+        ))
+
+    @admin.display(description='Top functions (cumulative)')
+    def top_functions(self, obj):
+        return format_html('<pre style="font-size:11px">{}</pre>', profiling.top_functions(obj))
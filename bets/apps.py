@@ -5,5 +5,5 @@ class BetsConfig(AppConfig):
     name = 'bets'
 
     # Only import things here if absolutely needed, and do it inside ready().
-    # def ready(self):
-    #     import bets.signals  # example
+    def ready(self):
+        from . import checks, signals  # noqa: F401
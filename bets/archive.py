@@ -0,0 +1,231 @@
+# bets/archive.py
+"""Cold storage for settled markets and old ledger rows.
+
+Archive files are append-only, gzip-compressed JSON lines. Every archival run
+appends one gzip member to the month's file; the byte offset of that member is
+recorded on the summary rows so a single market can be read back without
+decompressing the whole file.
+
+Files are written before the database is touched. If the database step fails,
+the member is left orphaned, which is harmless because nothing references its
+offset.
+"""
+from __future__ import annotations
+import gzip
+import json
+import os
+import zlib
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .db import write_atomic
+from .money import Money
+from .models import (
+    ArchivedMarket, ArchivedPosition, EventMembership, EventTransaction, Market, Parlay, ParlayLeg, Transaction,
+)
+
+def archive_dir() -> Path:
+    path = Path(getattr(settings, 'ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def default_cutoff():
+    return timezone.now() - timedelta(days=getattr(settings, 'ARCHIVE_AFTER_DAYS', 180))
+
+
+def _jsonable(v):
+    if isinstance(v, (Decimal, Money)):
+        return str(v)
+    if hasattr(v, 'isoformat'):
+        return v.isoformat()
+    return v
+
+
+def _append_member(kind: str, records: list[dict]) -> tuple[str, int]:
+    """Append ``records`` as one gzip member; returns (file name, member offset)."""
+    name = f"{kind}-{timezone.now():%Y-%m}.jsonl.gz"
+    with open(archive_dir() / name, 'ab') as fh:
+        offset = fh.tell()
+        with gzip.GzipFile(fileobj=fh, mode='wb') as gz:
+            for rec in records:
+                gz.write(json.dumps({k: _jsonable(v) for k, v in rec.items()}).encode() + b'\n')
+        fh.flush()
+        os.fsync(fh.fileno())
+    return name, offset
+
+
+def _read_member(name: str, offset: int):
+    """Yield the records of the single gzip member starting at ``offset``."""
+    d = zlib.decompressobj(wbits=31)
+    buf = b''
+    with open(archive_dir() / name, 'rb') as fh:
+        fh.seek(offset)
+        while not d.eof:
+            chunk = fh.read(64 * 1024)
+            if not chunk:
+                break
+            buf += d.decompress(chunk)
+            *lines, buf = buf.split(b'\n')
+            for line in lines:
+                if line:
+                    yield json.loads(line)
+    if buf.strip():
+        yield json.loads(buf)
+
+
+# --- Markets -----------------------------------------------------------------
+
+def _market_record(m: Market) -> dict:
+    return {
+        'id': m.id, 'title': m.title, 'creator_id': m.creator_id, 'house_id': m.house_id,
+        'event_id': m.event_id, 'house_margin': m.house_margin, 'status': m.status,
+        'closes_at': m.closes_at, 'created_at': m.created_at, 'settled_at': m.settled_at,
+        'max_bet_limit': m.max_bet_limit,
+        'outcomes': [
+            {k: _jsonable(getattr(oc, k)) for k in ('id', 'title', 'slider_weight', 'implied_probability', 'decimal_odds', 'is_winner')}
+            for oc in m.outcomes.all()
+        ],
+        'wagers': [
+            {k: _jsonable(getattr(w, k)) for k in ('id', 'user_id', 'outcome_id', 'stake', 'odds_at_placement', 'potential_payout', 'status', 'placed_at')}
+            for w in m.wagers.all()
+        ],
+    }
+
+
+@write_atomic
+def archive_settled_markets(older_than=None, limit: int = 500) -> int:
+    """Move up to ``limit`` settled or voided markets closed before ``older_than`` into cold storage."""
+    cutoff = older_than or default_cutoff()
+    markets = list(
+        Market.objects.filter(status__in=[Market.SETTLED, Market.VOID])
+        .filter(Q(settled_at__lt=cutoff) | Q(settled_at__isnull=True, created_at__lt=cutoff))
+        .exclude(id__in=ParlayLeg.objects.filter(parlay__status=Parlay.OPEN).values('market_id'))  # their legs still count
+        .prefetch_related('outcomes', 'wagers')
+        .order_by('id')[:limit]
+    )
+    if not markets:
+        return 0
+
+    name, offset = _append_member('markets', [_market_record(m) for m in markets])
+
+    summaries, positions = [], []
+    for m in markets:
+        winners = {oc.id: oc.title for oc in m.outcomes.all() if oc.is_winner}
+        per_user = defaultdict(lambda: [Money(0), Money(0), 0, 0])  # staked, returned, wagers, wins
+        for w in m.wagers.all():
+            per_user[w.user_id][0] += w.stake
+            if m.status == Market.VOID:
+                per_user[w.user_id][1] += w.stake  # refunded
+                continue
+            per_user[w.user_id][2] += 1
+            if w.outcome_id in winners:
+                per_user[w.user_id][1] += w.stake.times_odds(w.odds_at_placement)
+                per_user[w.user_id][3] += 1
+        summaries.append(ArchivedMarket(
+            id=m.id, title=m.title, creator_id=m.creator_id, house_id=m.house_id, event_id=m.event_id,
+            winner_title=next(iter(winners.values()), ''),
+            total_staked=sum((v[0] for v in per_user.values()), Money(0)),
+            total_payout=sum((v[1] for v in per_user.values()), Money(0)),
+            created_at=m.created_at, settled_at=m.settled_at,
+            archive_file=name, archive_offset=offset,
+        ))
+        positions.extend(
+            ArchivedPosition(market_id=m.id, user_id=uid, staked=st, returned=ret, wagers=n, wins=wins)
+            for uid, (st, ret, n, wins) in per_user.items()
+        )
+
+    ArchivedMarket.objects.bulk_create(summaries)
+    ArchivedPosition.objects.bulk_create(positions)
+    Market.objects.filter(id__in=[m.id for m in markets]).delete()  # cascades outcomes/wagers/shares
+    return len(markets)
+
+
+def load_archived_market(market_id: int) -> dict | None:
+    am = ArchivedMarket.objects.filter(pk=market_id).only('archive_file', 'archive_offset').first()
+    if am is None:
+        return None
+    for rec in _read_member(am.archive_file, am.archive_offset):
+        if rec['id'] == market_id:
+            return rec
+    return None
+
+
+def can_view_archived_market(user, am: ArchivedMarket) -> bool:
+    if not user.is_authenticated:
+        return False
+    if user.is_superuser or user.id in (am.creator_id, am.house_id):
+        return True
+    if am.event_id and EventMembership.objects.filter(event_id=am.event_id, user=user).exists():
+        return True
+    return am.positions.filter(user=user).exists()
+
+
+def archived_history(user, f: str = 'all'):
+    """Archived markets for ``market_history``, annotated with the user's net result."""
+    created = Q(creator=user)
+    bet_on = Q(positions__user=user)
+    if f == 'set_by_me':
+        cond = created
+    elif f in ('bet_on', 'winning_bets'):
+        cond = bet_on
+    elif f == 'winning_sets':
+        cond = created
+    else:
+        cond = created | bet_on
+    markets = list(ArchivedMarket.objects.filter(cond).distinct().order_by('-created_at'))
+    positions = {p.market_id: p for p in ArchivedPosition.objects.filter(user=user, market__in=markets)}
+    if f == 'winning_bets':
+        markets = [m for m in markets if m.id in positions and positions[m.id].returned > 0]
+    elif f == 'winning_sets':
+        markets = [m for m in markets if m.house_net > 0]
+    return markets, {mid: p.net for mid, p in positions.items()}
+
+
+# --- Ledger ------------------------------------------------------------------
+
+def _archive_ledger_model(model, owner_field: str, summary_type: str, cutoff, note_label: str) -> int:
+    owner_id = f'{owner_field}_id'
+    old = model.objects.filter(created_at__lt=cutoff)
+    records, totals, moved = [], defaultdict(Money), 0
+    for tx in old.order_by('id').iterator():
+        totals[getattr(tx, owner_id)] += tx.amount
+        if tx.type != summary_type:  # earlier summaries are folded in, their detail is already archived
+            records.append({'id': tx.id, owner_id: getattr(tx, owner_id), 'amount': tx.amount,
+                            'type': tx.type, 'created_at': tx.created_at, 'note': tx.note})
+        moved += 1
+    if not moved:
+        return 0
+
+    name, offset = _append_member(model._meta.model_name, records) if records else ('', 0)
+    old.delete()
+    model.objects.bulk_create([
+        model(**{owner_id: oid}, amount=total, type=summary_type, created_at=cutoff,
+              note=f"{note_label} before {cutoff:%Y-%m-%d} ({name}@{offset})")
+        for oid, total in totals.items()
+    ])
+    return moved
+
+
+@write_atomic
+def archive_ledger(older_than=None) -> dict:
+    """Replace ledger rows older than the cutoff with one summary row per wallet."""
+    cutoff = older_than or default_cutoff()
+    return {
+        'transactions': _archive_ledger_model(Transaction, 'user', Transaction.ARCHIVE_SUMMARY, cutoff, 'Archived ledger'),
+        'event_transactions': _archive_ledger_model(EventTransaction, 'event', EventTransaction.ARCHIVE_SUMMARY, cutoff, 'Archived treasury'),
+    }
+
+
+def iter_archived_ledger(kind: str = 'transaction'):
+    """Scan every archived ledger row of ``kind`` ('transaction' or 'eventtransaction')."""
+    for path in sorted(archive_dir().glob(f'{kind}-*.jsonl.gz')):
+        with gzip.open(path, 'rt') as fh:
+            for line in fh:
+                yield json.loads(line)
@@ -0,0 +1,225 @@
+# bets/backup.py
+"""Online snapshots of the SQLite database, and point-in-time restore.
+
+``snapshot`` copies the live database with SQLite's online backup API while
+the site keeps serving. The copy advances ``BACKUP_PAGES_PER_STEP`` pages at a
+time and sleeps ``BACKUP_STEP_SLEEP`` seconds between steps. It holds a read
+lock only during a step, which is what lets writers in under a rollback
+journal. A write from another connection restarts the copy from the first
+page. After ``MAX_RESTARTS`` restarts the remainder is copied in one step.
+Under WAL (``SQLITE_PRAGMAS``) that step holds only a read snapshot, so
+writers still proceed.
+
+The copy is written beside its final name and checked with ``PRAGMA
+quick_check``, plus the ledger reconciliation (``bets.reconcile``) if asked.
+It is then gzipped and renamed into place, so any snapshot that exists is
+complete. Snapshots beyond ``BACKUP_KEEP`` are deleted, oldest first.
+
+``restore`` writes a snapshot back into the live database through the same
+API, in a single step under the write lock. Other connections see either the
+old data or the restored data, never a file swapped out beneath them.
+"""
+from __future__ import annotations
+import gzip
+import logging
+import re
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.utils import load_backend
+from django.utils import timezone
+
+from .reconcile import LEDGERS, Discrepancy, check_range, chunks
+
+log = logging.getLogger(__name__)
+
+MAX_RESTARTS = 3
+VERIFY_ALIAS = 'backup_verify'
+_NAME = re.compile(r'^db-(\d{8}-\d{6})\.sqlite3\.gz$')
+
+
+@dataclass
+class Snapshot:
+    path: Path
+    taken_at: datetime
+    size: int
+
+
+def backup_dir() -> Path:
+    return Path(getattr(settings, 'BACKUP_DIR', Path(settings.BASE_DIR) / 'backups'))
+
+
+def connect_live(timeout: float = 30) -> sqlite3.Connection:
+    """A plain sqlite3 connection to the default database (which may be a ``file:`` URI, as under tests)."""
+    conn = connections['default']
+    if conn.vendor != 'sqlite':
+        raise ValueError("Backups only support SQLite databases.")
+    name = str(conn.settings_dict['NAME'])
+    return sqlite3.connect(name, timeout=timeout, uri=name.startswith('file:'))
+
+
+def list_snapshots(directory=None) -> list[Snapshot]:
+    """Complete snapshots in ``directory``, oldest first."""
+    directory = Path(directory or backup_dir())
+    found = []
+    for path in directory.glob('db-*.sqlite3.gz'):
+        m = _NAME.match(path.name)
+        if m:
+            taken = datetime.strptime(m.group(1), '%Y%m%d-%H%M%S').replace(tzinfo=dt_timezone.utc)
+            found.append(Snapshot(path, taken, path.stat().st_size))
+    return sorted(found, key=lambda s: s.taken_at)
+
+
+def snapshot_at(at: datetime, directory=None) -> Snapshot:
+    """The newest snapshot taken at or before ``at``."""
+    candidates = [s for s in list_snapshots(directory) if s.taken_at <= at]
+    if not candidates:
+        raise ValueError(f"No snapshot taken at or before {at:%Y-%m-%d %H:%M:%S %Z}.")
+    return candidates[-1]
+
+
+# --- Taking snapshots ----------------------------------------------------------
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _copy(src: sqlite3.Connection, dst: sqlite3.Connection, pages: int, sleep: float) -> int:
+    """Back ``src`` up into ``dst`` in ``pages``-page steps; returns how many times writers restarted it."""
+    state = {'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > MAX_RESTARTS:
+                raise _TooManyRestarts
+        state['remaining'] = remaining
+        if remaining and sleep:
+            time.sleep(sleep)
+
+    try:
+        src.backup(dst, pages=pages, progress=progress)
+    except _TooManyRestarts:
+        src.backup(dst)
+    return state['restarts']
+
+
+def check(path: Path, ledger: bool = False) -> None:
+    """Raise ``ValueError`` unless the uncompressed database at ``path`` passes quick_check (and the ledger check)."""
+    con = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        result = con.execute('PRAGMA quick_check').fetchone()[0]
+    finally:
+        con.close()
+    if result != 'ok':
+        raise ValueError(f"{path.name} failed quick_check: {result}")
+    if ledger:
+        bad = verify_ledger(path)
+        if bad:
+            raise ValueError(f"{path.name}: {len(bad)} balance(s) do not match their ledger.")
+
+
+def verify_ledger(path: Path, chunk_size: int = 5000) -> list[Discrepancy]:
+    """Run the ledger reconciliation against the database file at ``path``.
+
+    Uses a temporary ``VERIFY_ALIAS`` connection, which ``configure_sqlite``
+    leaves alone, so the snapshot is not switched to WAL.
+    """
+    # a connection of this thread only, not added to DATABASES; configure_settings
+    # fills in the defaults but insists on the key 'default'
+    config = connections.configure_settings({
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(path)},
+    })['default']
+    connections[VERIFY_ALIAS] = load_backend(config['ENGINE']).DatabaseWrapper(config, VERIFY_ALIAS)
+    try:
+        bad = []
+        for kind in LEDGERS:
+            for lo, hi in chunks(kind, chunk_size, using=VERIFY_ALIAS):
+                bad += check_range(kind, lo, hi, using=VERIFY_ALIAS)[1]
+        return bad
+    finally:
+        connections[VERIFY_ALIAS].close()
+        del connections[VERIFY_ALIAS]
+
+
+def snapshot(directory=None, pages: int | None = None, sleep: float | None = None,
+             verify: bool = False, keep: int | None = None) -> Snapshot:
+    """Take a compressed snapshot of the default database, then rotate old ones."""
+    directory = Path(directory or backup_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    pages = pages or getattr(settings, 'BACKUP_PAGES_PER_STEP', 256)
+    sleep = getattr(settings, 'BACKUP_STEP_SLEEP', 0.005) if sleep is None else sleep
+
+    taken = timezone.now().replace(microsecond=0)
+    final = directory / f"db-{taken.astimezone(dt_timezone.utc):%Y%m%d-%H%M%S}.sqlite3.gz"
+    raw = final.with_name(final.name[:-3] + '.partial')
+    packed = final.with_name(final.name + '.partial')
+    try:
+        src = connect_live()
+        dst = sqlite3.connect(raw)
+        try:
+            started = time.perf_counter()
+            restarts = _copy(src, dst, pages, sleep)
+            dst.execute('PRAGMA journal_mode = DELETE')  # a self-contained file, without -wal/-shm
+        finally:
+            dst.close()
+            src.close()
+        log.info("Copied %s in %.2fs (%d restarts)", final.name, time.perf_counter() - started, restarts)
+
+        check(raw, ledger=verify)
+        with open(raw, 'rb') as f, gzip.open(packed, 'wb', compresslevel=6) as out:
+            shutil.copyfileobj(f, out, 1 << 20)
+        packed.replace(final)
+    finally:
+        raw.unlink(missing_ok=True)
+        packed.unlink(missing_ok=True)
+
+    rotate(directory, keep)
+    return Snapshot(final, taken, final.stat().st_size)
+
+
+def rotate(directory=None, keep: int | None = None) -> list[Path]:
+    """Delete all but the newest ``keep`` snapshots; returns the deleted paths."""
+    keep = max(keep or getattr(settings, 'BACKUP_KEEP', 14), 1)
+    old = [s.path for s in list_snapshots(directory)[:-keep]]
+    for path in old:
+        path.unlink(missing_ok=True)
+    return old
+
+
+# --- Restore ---------------------------------------------------------------------
+
+def restore(snap: Snapshot, safety_snapshot: bool = True) -> Snapshot | None:
+    """Replace the default database's contents with ``snap``.
+
+    Unless ``safety_snapshot`` is false, the current database is snapshotted
+    first (and returned), so the restore itself can be undone.
+    """
+    raw = snap.path.with_name(snap.path.name[:-3] + '.restore-partial')
+    try:
+        with gzip.open(snap.path, 'rb') as f, open(raw, 'wb') as out:
+            shutil.copyfileobj(f, out, 1 << 20)
+        check(raw)
+        before = None
+        if safety_snapshot:  # kept however many snapshots exist, so rotation cannot remove ``snap``
+            before = snapshot(directory=snap.path.parent, keep=len(list_snapshots(snap.path.parent)) + 1)
+
+        connections.close_all()
+        src = sqlite3.connect(f'file:{raw}?mode=ro', uri=True)
+        dst = connect_live()
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+    finally:
+        raw.unlink(missing_ok=True)
+    cache.clear()  # cached users, wallets and invite counts describe the old data
+    return before
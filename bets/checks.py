@@ -0,0 +1,38 @@
+# bets/checks.py
+"""System checks for database objects that migrations can lose silently."""
+import importlib
+
+from django.core.checks import Error, Tags, register
+from django.db import connections
+
+SEARCH_MIGRATION = 'bets.migrations.0009_search_fts'
+
+
+@register(Tags.database)
+def check_search_triggers(app_configs, databases=None, **kwargs):
+    """The FTS sync triggers exist wherever ``bets_search`` does.
+
+    SQLite drops a table's triggers when a migration rebuilds it, so
+    ``manage.py check --database default`` (and ``migrate``) catch a
+    migration that forgot to re-create them.
+    """
+    triggers = importlib.import_module(SEARCH_MIGRATION).TRIGGERS
+    errors = []
+    for alias in databases or []:
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name = 'bets_search' OR type = 'trigger'")
+            names = {name for name, in cursor.fetchall()}
+        if 'bets_search' not in names:  # not migrated yet
+            continue
+        missing = [name for name in triggers if name not in names]
+        if missing:
+            errors.append(Error(
+                f"Search index triggers missing on database '{alias}': {', '.join(missing)}.",
+                hint="A migration rebuilt bets_market, bets_outcome or bets_event. Re-create them with "
+                     f"RunPython({SEARCH_MIGRATION}.create_triggers) in a new migration.",
+                id='bets.E001',
+            ))
+    return errors
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+class immediate_atomic:
+    """``transaction.atomic`` that opens the outermost SQLite transaction with
+    ``BEGIN IMMEDIATE``, so the write lock is taken up front (and waited for via
+    busy_timeout) instead of failing mid-transaction when a read lock is upgraded.
+
+    Relies on the sqlite backend's ``transaction_mode`` (Django 5.1+); on older
+    versions this is a plain ``atomic``.
+    """
+
+    def __init__(self, using=None):
+        self.using = using or DEFAULT_DB_ALIAS
+        self._atomic = transaction.atomic(using=self.using)
+
+    def __enter__(self):
+        conn = connections[self.using]
+        if conn.vendor != 'sqlite' or conn.in_atomic_block:
+            return self._atomic.__enter__()
+        conn.ensure_connection()  # connecting resets transaction_mode from settings
+        if not hasattr(conn, 'transaction_mode'):
+            return self._atomic.__enter__()
+        previous = conn.transaction_mode
+        conn.transaction_mode = 'IMMEDIATE'
+        try:
+            return self._atomic.__enter__()
+        finally:
+            conn.transaction_mode = previous
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._atomic.__exit__(exc_type, exc_value, traceback)
+
+    def __call__(self, func):
+        @wraps(func)
+        def inner(*args, **kwargs):
+            with immediate_atomic(self.using):
+                return func(*args, **kwargs)
+        return inner
+
+
+def write_atomic(func):
+    """Decorator for ledger writes: immediate transaction, optionally run on the writer lane."""
+    return serialized(immediate_atomic()(func))
+
+
+# --- Writer lane -------------------------------------------------------------
+
+_lane: ThreadPoolExecutor | None = None
+_lane_lock = threading.Lock()
+_lane_thread = threading.local()
+
+
+def _mark_lane_thread():
+    _lane_thread.active = True
+
+
+def writer_lane() -> ThreadPoolExecutor:
+    global _lane
+    with _lane_lock:
+        if _lane is None:
+            _lane = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bets-writer', initializer=_mark_lane_thread)
+        return _lane
+
+
+def serialized(func):
+    """Run money-moving operations one at a time on a single in-process writer
+    thread when ``BETS_SERIALIZED_WRITES`` is on, instead of letting request
+    threads contend for the SQLite write lock.
+
+    Calls made inside an open transaction (or from the lane itself) run inline:
+    the lane has its own connection and could not see uncommitted work.
+    """
+    @wraps(func)
+    def inner(*args, **kwargs):
+        if (
+            not getattr(settings, 'BETS_SERIALIZED_WRITES', False)
+            or getattr(_lane_thread, 'active', False)
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return func(*args, **kwargs)
+        return writer_lane().submit(func, *args, **kwargs).result()
+    return inner
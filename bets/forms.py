@@ -1,13 +1,36 @@
+import re
 from decimal import Decimal
 from django import forms
 from django.contrib.auth import get_user_model
-from .models import Event, Market, UserSettings
+from django.db.models import Q
+from django.urls import reverse_lazy
+from .models import Event, Market, MarketTemplate, Outcome, UserSettings
 
 User = get_user_model()
 
 class DepositForm(forms.Form):
     amount = forms.DecimalField(min_value=1, decimal_places=2, max_digits=12)
 
+class EventCreditForm(forms.Form):
+    amount = forms.DecimalField(min_value=Decimal('0.01'), decimal_places=2, max_digits=12, label="Amount per member")
+    note = forms.CharField(max_length=255, required=False)
+
+class ParlayForm(forms.Form):
+    outcomes = forms.ModelMultipleChoiceField(
+        queryset=Outcome.objects.none(), widget=forms.CheckboxSelectMultiple, label="Legs",
+        help_text="Pick one outcome in each market you want in the parlay; every leg must win.",
+    )
+    stake = forms.DecimalField(min_value=Decimal('0.01'), decimal_places=2, max_digits=12)
+
+    def __init__(self, *args, event=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields['outcomes']
+        field.queryset = (
+            Outcome.objects.filter(market__event=event, market__status=Market.OPEN)
+            .select_related('market').order_by('market__title', 'market_id', 'id')
+        )
+        field.label_from_instance = lambda oc: f"{oc.market.title}: {oc.title} @ {oc.decimal_odds}"
+
 class EventForm(forms.ModelForm):
     class Meta:
         model = Event
@@ -38,10 +61,81 @@ class MarketForm(forms.ModelForm):
 
 
 class UserLookupForm(forms.Form):
-    query = forms.CharField(label="Username or email", max_length=150)
+    query = forms.CharField(
+        label="Username or email", max_length=150,
+        widget=forms.TextInput(attrs={'autocomplete': 'off', 'data-user-suggest': reverse_lazy('bets:user_suggest')}),
+    )
 
 class EventInviteForm(UserLookupForm):
     pass
 
 class MarketShareForm(UserLookupForm):
     pass
+
+
+class BulkInviteForm(forms.Form):
+    FRIENDS = 'friends'
+    LIST = 'list'
+    EVENT = 'event'
+    SOURCES = [(FRIENDS, 'All my friends'), (LIST, 'These people'), (EVENT, 'Members of another event')]
+
+    source = forms.ChoiceField(choices=SOURCES, initial=FRIENDS, widget=forms.RadioSelect)
+    people = forms.CharField(
+        required=False, widget=forms.Textarea(attrs={'rows': 3}),
+        help_text="Usernames or emails, separated by commas or new lines.",
+    )
+    event = forms.ModelChoiceField(queryset=Event.objects.none(), required=False, label="Event")
+
+    def __init__(self, *args, user=None, exclude_event=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        events = _user_events(user)
+        if exclude_event is not None:
+            events = events.exclude(pk=exclude_event.pk)
+        self.fields['event'].queryset = events
+
+    def clean(self):
+        data = super().clean()
+        if data.get('source') == self.LIST and not self.people_list():
+            self.add_error('people', "List at least one username or email.")
+        if data.get('source') == self.EVENT and not data.get('event'):
+            self.add_error('event', "Pick an event.")
+        return data
+
+    def people_list(self) -> list[str]:
+        return [p for p in re.split(r'[\s,;]+', self.cleaned_data.get('people', '')) if p]
+
+
+def _user_events(user):
+    return Event.objects.filter(Q(creator=user) | Q(memberships__user=user)).distinct().order_by('name')
+
+
+class BatchMarketsForm(forms.Form):
+    # shared by "markets from templates" and "clone markets from another event"
+    be_the_house = forms.BooleanField(required=False, help_text="Act as the house for every new market.")
+    closes_at = forms.DateTimeField(
+        required=False, input_formats=['%Y-%m-%dT%H:%M'],
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'),
+        help_text="Optional closing time for all of them.",
+    )
+
+
+class UseTemplatesForm(BatchMarketsForm):
+    templates = forms.ModelMultipleChoiceField(queryset=MarketTemplate.objects.none(), widget=forms.CheckboxSelectMultiple)
+    event = forms.ModelChoiceField(queryset=Event.objects.none(), required=False)
+    field_order = ['templates', 'event', 'be_the_house', 'closes_at']
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['templates'].queryset = MarketTemplate.objects.filter(owner=user)
+        self.fields['event'].queryset = _user_events(user)
+        self.fields['be_the_house'].initial = True
+
+
+class CloneMarketsForm(BatchMarketsForm):
+    source = forms.ModelChoiceField(queryset=Event.objects.none(), label="Copy markets from")
+    field_order = ['source', 'be_the_house', 'closes_at']
+
+    def __init__(self, *args, user=None, target=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['source'].queryset = _user_events(user).exclude(pk=target.pk)
+        self.fields['be_the_house'].help_text = "Act as the house for every copy; otherwise each keeps its original house."
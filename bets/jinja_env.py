@@ -0,0 +1,36 @@
+from django.templatetags.static import static
+from django.template.defaultfilters import date
+from django.urls import reverse
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+
+from .templatetags.formatting import get_item, money, mul, oddsfmt, pct, sub
+
+
+def url(viewname, *args, **kwargs):
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def local_date(value, arg=None):
+    # Django's `date` is flagged expects_localtime, which only its own engine
+    # honours; convert to TIME_ZONE here so both engines show the same times
+    return date(template_localtime(value), arg)
+
+
+def environment(**options):
+    # Jinja2 counterpart of the DjangoTemplates setup: same helpers, same `formatting` filters
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': url,
+    })
+    env.filters.update({
+        'money': money,
+        'oddsfmt': oddsfmt,
+        'get_item': get_item,
+        'mul': mul,
+        'sub': sub,
+        'pct': pct,
+        'date': local_date,
+    })
+    return env
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bets.archive import archive_ledger, archive_settled_markets
+
+
+class Command(BaseCommand):
+    help = "Move settled markets and old ledger rows into compressed archive files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'ARCHIVE_AFTER_DAYS', 180),
+                            help="Archive markets settled (and ledger rows created) more than this many days ago.")
+        parser.add_argument('--batch', type=int, default=500, help="Markets moved per transaction.")
+        parser.add_argument('--skip-ledger', action='store_true')
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(days=opts['days'])
+        total = 0
+        while moved := archive_settled_markets(cutoff, limit=opts['batch']):
+            total += moved
+        self.stdout.write(f"Archived {total} markets settled before {cutoff:%Y-%m-%d}.")
+
+        if not opts['skip_ledger']:
+            counts = archive_ledger(cutoff)
+            self.stdout.write(
+                f"Archived {counts['transactions']} wallet and {counts['event_transactions']} treasury ledger rows."
+            )
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.backup import backup_dir, snapshot
+
+
+class Command(BaseCommand):
+    help = "Snapshot the SQLite database online (no writer lockout), gzip it and rotate old snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Snapshot directory (default: BACKUP_DIR).")
+        parser.add_argument('--pages', type=int, help="Pages copied per backup step (default: BACKUP_PAGES_PER_STEP).")
+        parser.add_argument('--sleep', type=float, help="Seconds to pause between steps (default: BACKUP_STEP_SLEEP).")
+        parser.add_argument('--keep', type=int, help="Snapshots to keep (default: BACKUP_KEEP).")
+        parser.add_argument('--verify', action='store_true',
+                            help="Also reconcile every wallet against its ledger inside the snapshot.")
+
+    def handle(self, *args, **opts):
+        started = time.perf_counter()
+        try:
+            snap = snapshot(directory=opts['dir'] or backup_dir(), pages=opts['pages'], sleep=opts['sleep'],
+                            verify=opts['verify'], keep=opts['keep'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {snap.path} ({snap.size / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s"
+            + (", ledger verified." if opts['verify'] else ".")
+        ))
@@ -0,0 +1,94 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from bets.models import Market
+
+User = get_user_model()
+
+# Runs in a fresh interpreter per sample: load the WSGI application the way
+# be_the_house/wsgi.py does, optionally warm it, then time real requests
+# through the handler (middleware, session, auth and all).
+CHILD = r'''
+import json, os, sys, time
+t0 = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+t_import = time.perf_counter() - t0
+t_warm = 0.0
+if sys.argv[1] == 'warm':
+    from bets.warmup import warm_up
+    t1 = time.perf_counter()
+    warm_up()
+    t_warm = time.perf_counter() - t1
+from django.test.client import RequestFactory
+from django.conf import settings
+
+def get(path):
+    environ = RequestFactory()._base_environ(PATH_INFO=path, SERVER_NAME='localhost',
+                                             HTTP_COOKIE=f'{settings.SESSION_COOKIE_NAME}={sys.argv[2]}')
+    t = time.perf_counter()
+    chunks = application(environ, lambda status, headers, exc_info=None: None)
+    b''.join(chunks)
+    return time.perf_counter() - t
+
+out = {'import': t_import, 'warm_up': t_warm}
+paths = sys.argv[3:]
+for path in paths:
+    out['first ' + path] = get(path)
+for path in paths:
+    out['steady ' + path] = min(get(path) for _ in range(5))
+print(json.dumps(out))
+'''
+
+
+class Command(BaseCommand):
+    help = "Measure worker start-up: application import time and first-request latency, with and without warm-up."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to request pages as (default: the first superuser).")
+        parser.add_argument('--market', type=int, help="Market id for market_detail (default: the newest one).")
+        parser.add_argument('--runs', type=int, default=3, help="Fresh processes per mode; medians are reported.")
+
+    def handle(self, *args, **opts):
+        users = User.objects.filter(username=opts['user']) if opts['user'] else User.objects.filter(is_superuser=True)
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError("No such user; pass --user or create a superuser.")
+        market_id = opts['market'] or Market.objects.order_by('-id').values_list('id', flat=True).first()
+        paths = [reverse('bets:dashboard')]
+        if market_id:
+            paths.append(reverse('bets:market_detail', args=[market_id]))
+
+        session = SessionStore()
+        session['_auth_user_id'] = str(user.pk)
+        session['_auth_user_backend'] = settings.AUTHENTICATION_BACKENDS[0]
+        session['_auth_user_hash'] = user.get_session_auth_hash()
+        session.create()
+        try:
+            results = {mode: [self._sample(mode, session.session_key, paths) for _ in range(opts['runs'])]
+                       for mode in ('cold', 'warm')}
+        finally:
+            session.delete()
+
+        self.stdout.write(f"{'':<34}{'cold':>10}{'warm':>10}")
+        for key in results['cold'][0]:
+            cold, warm = (statistics.median(r[key] for r in results[mode]) * 1000 for mode in ('cold', 'warm'))
+            self.stdout.write(f"{key:<34}{cold:>8.1f}ms{warm:>8.1f}ms")
+
+    def _sample(self, mode, session_key, paths):
+        proc = subprocess.run(
+            [sys.executable, '-c', CHILD, mode, session_key, *paths],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        if proc.returncode:
+            raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "benchmark process failed")
+        return json.loads(proc.stdout.strip().splitlines()[-1])
@@ -0,0 +1,88 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.template import engines
+from django.test import RequestFactory
+from django.utils import timezone
+
+from bets.models import Market, Outcome, Wager
+from bets.services import compute_odds
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare DjangoTemplates and Jinja2 render times for market_detail/market_history with many wagers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wagers', type=int, default=500)
+        parser.add_argument('--markets', type=int, default=200, help="Settled markets shown on market_history.")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **opts):
+        if 'jinja2' not in [e.name for e in engines.all()]:
+            raise CommandError("Jinja2 is not installed/configured; nothing to compare.")
+        try:
+            with transaction.atomic():
+                self._bench(opts)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _bench(self, opts):
+        user = User.objects.create(username='bench_templates_user', is_superuser=True)
+        bettors = User.objects.bulk_create([User(username=f'bench_templates_{i}') for i in range(20)])
+        odds = compute_odds([40, 35, 25], Decimal('0.05'))
+
+        markets = []
+        for i in range(opts['markets']):
+            m = Market.objects.create(title=f'Bench market {i}', creator=user, house=user,
+                                      status=Market.SETTLED, settled_at=timezone.now())
+            ocs = [Outcome(market=m, title=f'Outcome {j}', slider_weight=w, is_winner=(j == 0),
+                           implied_probability=odds[j]['prob'], decimal_odds=odds[j]['odds'])
+                   for j, w in enumerate([40, 35, 25])]
+            markets.append((m, Outcome.objects.bulk_create(ocs)))
+
+        market, outcomes = markets[0]
+        Wager.objects.bulk_create([
+            Wager(user=bettors[i % len(bettors)], market=market, outcome=outcomes[i % 3],
+                  stake=Decimal('10.00'), odds_at_placement=outcomes[i % 3].decimal_odds,
+                  potential_payout=(Decimal('10.00') * outcomes[i % 3].decimal_odds).quantize(Decimal('0.01')),
+                  status=Wager.PAID)
+            for i in range(opts['wagers'])
+        ])
+
+        request = RequestFactory().get('/')
+        request.user = user
+        request._messages = CookieStorage(request)
+
+        wagers = list(market.wagers.select_related('user', 'outcome'))
+        pages = {
+            'bets/market_detail.html': {
+                'market': market, 'wagers': wagers, 'can_manage': True,
+                'total_staked': Decimal('0'), 'total_payout': Decimal('0'), 'house_net': Decimal('0'),
+            },
+            'bets/market_history.html': {
+                'settled_markets': Market.objects.filter(id__in=[m.id for m, _ in markets]).prefetch_related('outcomes'),
+                'archived_markets': [], 'filter': 'all',
+                'bettor_net': {m.id: Decimal('-12.34') for m, _ in markets},
+            },
+        }
+
+        for name, ctx in pages.items():
+            for engine in ('django', 'jinja2'):
+                template = engines[engine].get_template(name)
+                template.render(ctx, request)  # compile + warm caches
+                t0 = time.perf_counter()
+                for _ in range(opts['repeat']):
+                    template.render(ctx, request)
+                ms = (time.perf_counter() - t0) * 1000 / opts['repeat']
+                self.stdout.write(f"{name:<28} {engine:<7} {ms:8.2f} ms/render")
@@ -0,0 +1,85 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from bets.models import Market, Outcome
+from bets.services import compute_odds, deposit, place_wager
+
+User = get_user_model()
+PREFIX = 'bench_wagers_'
+
+
+class Command(BaseCommand):
+    help = "Measure wagers/second through place_wager with 1, 8 and 32 concurrent threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each run.")
+        parser.add_argument('--serialized', action='store_true', help="Enable the in-process writer lane.")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark users and market.")
+
+    def handle(self, *args, **opts):
+        settings.BETS_SERIALIZED_WRITES = opts['serialized']
+        with connection.cursor() as c:
+            c.execute('PRAGMA journal_mode')
+            journal = c.fetchone()[0]
+        self.stdout.write(f"journal_mode={journal} serialized={opts['serialized']}")
+
+        users = self._users(max(opts['threads']))
+        market = Market.objects.create(title=f'{PREFIX}market', creator=users[0], house=users[0])
+        odds = compute_odds([50, 50], market.house_margin)
+        outcome = Outcome.objects.create(market=market, title='Yes', slider_weight=50,
+                                         implied_probability=odds[0]['prob'], decimal_odds=odds[0]['odds'])
+        try:
+            for n in opts['threads']:
+                placed, errors, elapsed = self._run(users[:n], outcome, opts['seconds'])
+                self.stdout.write(
+                    f"threads={n:>3}  wagers={placed:>6}  errors={errors:>4}  "
+                    f"wagers/s={placed / elapsed:>8.1f}"
+                )
+        finally:
+            if not opts['keep']:
+                market.delete()
+                User.objects.filter(username__startswith=PREFIX).delete()
+
+    def _users(self, n):
+        users = []
+        for i in range(n):
+            u, created = User.objects.get_or_create(username=f'{PREFIX}{i}')
+            if created:
+                deposit(u, Decimal('1000000.00'), note='benchmark bankroll')
+            users.append(u)
+        return users
+
+    def _run(self, users, outcome, seconds):
+        counts = [0] * len(users)
+        errors = [0] * len(users)
+        start = threading.Barrier(len(users) + 1)
+        deadline = [0.0]
+
+        def worker(i, user):
+            start.wait()
+            try:
+                while time.perf_counter() < deadline[0]:
+                    try:
+                        place_wager(user, outcome, Decimal('1.00'))
+                        counts[i] += 1
+                    except Exception:
+                        errors[i] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(i, u)) for i, u in enumerate(users)]
+        for t in threads:
+            t.start()
+        t0 = time.perf_counter()
+        deadline[0] = t0 + seconds
+        start.wait()
+        for t in threads:
+            t.join()
+        return sum(counts), sum(errors), time.perf_counter() - t0
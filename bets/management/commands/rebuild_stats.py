@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bets.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every BettingStats row (leaderboards, dashboard stats) from settled and archived wagers."
+
+    def handle(self, *args, **opts):
+        n = rebuild_stats()
+        self.stdout.write(f"Rebuilt {n} stats rows.")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bets.services import rebuild_user_lookup
+
+
+class Command(BaseCommand):
+    help = "Recompute every UserLookup row (user search and typeahead) from the user table."
+
+    def handle(self, *args, **opts):
+        n = rebuild_user_lookup()
+        self.stdout.write(f"Rebuilt {n} user lookup rows.")
@@ -0,0 +1,86 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from bets.reconcile import LEDGERS, check_range, chunks
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _check(args):
+    kind, lo, hi = args
+    checked, bad = check_range(kind, lo, hi)
+    return kind, lo, hi, checked, [d.as_dict() for d in bad]
+
+
+class Command(BaseCommand):
+    help = "Verify that every wallet and event treasury balance equals the sum of its ledger rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Owner ids checked per query.")
+        parser.add_argument('--workers', type=int, default=1, help="Processes to spread chunks over.")
+        parser.add_argument('--only', choices=sorted(LEDGERS), help="Check just one kind of wallet.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+        parser.add_argument('--checkpoint', default=str(Path(settings.BASE_DIR) / 'reconcile-checkpoint.json'))
+        parser.add_argument('--resume', action='store_true', help="Continue after the last checkpointed chunk.")
+
+    def handle(self, *args, **opts):
+        size = opts['chunk_size']
+        checkpoint = Path(opts['checkpoint'])
+        state = {'chunk_size': size, 'next': {}, 'checked': {}, 'discrepancies': []}
+        if opts['resume'] and checkpoint.exists():
+            state = json.loads(checkpoint.read_text())
+            if state['chunk_size'] != size:
+                raise CommandError(f"Checkpoint was written with --chunk-size {state['chunk_size']}.")
+            self.stderr.write(f"Resuming from {state['next']}")
+
+        kinds = [opts['only']] if opts['only'] else list(LEDGERS)
+        started = time.perf_counter()
+        pool = None
+        if opts['workers'] > 1:
+            connections.close_all()  # don't hand open connections to forked workers
+            pool = ProcessPoolExecutor(max_workers=opts['workers'], initializer=_init_worker)
+        try:
+            for kind in kinds:
+                work = [(kind, lo, hi) for lo, hi in chunks(kind, size, state['next'].get(kind))]
+                results = pool.map(_check, work, chunksize=4) if pool else map(_check, work)
+                for kind_, lo, hi, checked, bad in results:
+                    state['checked'][kind_] = state['checked'].get(kind_, 0) + checked
+                    state['discrepancies'].extend(bad)
+                    state['next'][kind_] = hi
+                    self._save(checkpoint, state)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        report = {
+            'checked': state['checked'],
+            'discrepancies': state['discrepancies'],
+            'seconds': round(time.perf_counter() - started, 2),
+        }
+        text = json.dumps(report, indent=2)
+        if opts['output']:
+            Path(opts['output']).write_text(text + '\n')
+        else:
+            self.stdout.write(text)
+        checkpoint.unlink(missing_ok=True)
+
+        if report['discrepancies']:
+            raise CommandError(f"{len(report['discrepancies'])} balance(s) do not match their ledger.")
+        summary = ', '.join(f"{n} {k}" for k, n in report['checked'].items())
+        self.stderr.write(f"OK: {summary or 'nothing'} reconciled in {report['seconds']}s.")
+
+    @staticmethod
+    def _save(path: Path, state: dict):
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, path)
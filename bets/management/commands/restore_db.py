@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from bets.backup import Snapshot, backup_dir, list_snapshots, restore, snapshot_at
+
+
+class Command(BaseCommand):
+    help = "Restore the SQLite database from a snapshot written by backup_db."
+
+    def add_arguments(self, parser):
+        parser.add_argument('snapshot', nargs='?', help="Snapshot file to restore.")
+        parser.add_argument('--at', help="Restore the newest snapshot taken at or before this local time "
+                                         "('YYYY-MM-DD HH:MM[:SS]').")
+        parser.add_argument('--dir', help="Snapshot directory (default: BACKUP_DIR).")
+        parser.add_argument('--list', action='store_true', help="List the available snapshots and exit.")
+        parser.add_argument('--no-safety-snapshot', action='store_false', dest='safety',
+                            help="Don't snapshot the current database before overwriting it.")
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+
+    def handle(self, *args, **opts):
+        directory = opts['dir'] or backup_dir()
+        if opts['list']:
+            for s in list_snapshots(directory):
+                self.stdout.write(f"{timezone.localtime(s.taken_at):%Y-%m-%d %H:%M:%S}  {s.size / 1e6:8.1f} MB  {s.path}")
+            return
+
+        snap = self._pick(opts, directory)
+        if opts['interactive']:
+            answer = input(f"Overwrite the database with the snapshot from "
+                           f"{timezone.localtime(snap.taken_at):%Y-%m-%d %H:%M:%S}? Type 'yes' to continue: ")
+            if answer != 'yes':
+                raise CommandError("Restore cancelled.")
+        try:
+            before = restore(snap, safety_snapshot=opts['safety'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if before:
+            self.stdout.write(f"Previous contents saved to {before.path}")
+        self.stdout.write(self.style.SUCCESS(f"Restored {snap.path.name}."))
+
+    def _pick(self, opts, directory) -> Snapshot:
+        try:
+            if opts['snapshot']:
+                match = [s for s in list_snapshots(directory) if s.path.name == opts['snapshot'].rsplit('/', 1)[-1]]
+                if not match:
+                    raise ValueError(f"{opts['snapshot']} is not a snapshot in {directory}.")
+                return match[0]
+            if opts['at']:
+                at = None
+                for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+                    try:
+                        at = timezone.make_aware(datetime.strptime(opts['at'], fmt))
+                        break
+                    except ValueError:
+                        continue
+                if at is None:
+                    raise ValueError(f"Can't read --at {opts['at']!r}; use 'YYYY-MM-DD HH:MM[:SS]'.")
+                return snapshot_at(at, directory)
+            snaps = list_snapshots(directory)
+            if not snaps:
+                raise ValueError(f"No snapshots in {directory}.")
+            return snaps[-1]
+        except ValueError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bets.notifications import drain
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notifications as per-user digest emails, one mail connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Users whose digests share one mail connection.")
+        parser.add_argument('--flush', action='store_true',
+                            help="Send everything due now, without waiting for the digest window.")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running, draining the outbox every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=60.0)
+
+    def handle(self, *args, **opts):
+        while True:
+            sent, failed = drain(batch_size=opts['batch_size'], flush=opts['flush'])
+            if sent or failed or not opts['loop']:
+                self.stdout.write(f"Sent {sent} digest(s); {failed} to retry.")
+            if not opts['loop']:
+                return
+            time.sleep(opts['interval'])
@@ -0,0 +1,79 @@
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from bets.slowlog import log_path, normalize, read_log
+
+
+def plan_warnings(plan: list[str]) -> list[str]:
+    warnings = []
+    for line in plan:
+        detail = line.strip()
+        if detail.startswith('SCAN '):  # every row of the table (or index) is visited
+            warnings.append(f"full scan: {detail[5:]}")
+        elif 'USE TEMP B-TREE' in detail:
+            warnings.append(detail.lower())
+    return warnings
+
+
+class Command(BaseCommand):
+    help = "Rank statements from the slow-query log by total time, with their query plans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help="Log file (default: SLOW_QUERY_LOG).")
+        parser.add_argument('--hours', type=float, help="Only entries from the last N hours.")
+        parser.add_argument('--view', help="Only statements issued by this view name.")
+        parser.add_argument('--limit', type=int, default=15)
+        parser.add_argument('--json', action='store_true', help="Print the ranking as JSON.")
+
+    def handle(self, *args, **opts):
+        since = None
+        if opts['hours']:
+            since = datetime.now(dt_timezone.utc) - timedelta(hours=opts['hours'])
+
+        groups = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': Counter()})
+        for e in read_log(Path(opts['log']) if opts['log'] else log_path()):
+            if since and datetime.fromisoformat(e['ts']) < since:
+                continue
+            if opts['view'] and e.get('view') != opts['view']:
+                continue
+            g = groups[e['fingerprint']]
+            g['count'] += 1
+            g['total_ms'] += e['ms']
+            if e['ms'] >= g['max_ms']:
+                g.update(max_ms=e['ms'], worst_params=e['params'], worst_path=e.get('path', ''))
+            g['views'][e.get('view') or '(no view)'] += 1
+            g['sql'] = normalize(e['sql'])
+            if e.get('plan'):
+                g['plan'] = e['plan']
+
+        ranked = sorted(groups.items(), key=lambda kv: kv[1]['total_ms'], reverse=True)[:opts['limit']]
+        rows = [
+            {
+                'fingerprint': fp, 'count': g['count'], 'total_ms': round(g['total_ms'], 1),
+                'avg_ms': round(g['total_ms'] / g['count'], 1), 'max_ms': round(g['max_ms'], 1),
+                'views': dict(g['views'].most_common(5)), 'sql': g['sql'],
+                'plan': g.get('plan', []), 'warnings': plan_warnings(g.get('plan', [])),
+                'worst_params': g.get('worst_params'), 'worst_path': g.get('worst_path'),
+            }
+            for fp, g in ranked
+        ]
+        if opts['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+        if not rows:
+            self.stdout.write("No slow queries logged.")
+            return
+        for i, r in enumerate(rows, 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{i} {r['fingerprint']}  {r['count']}x  total {r['total_ms']} ms  avg {r['avg_ms']}  max {r['max_ms']}"
+            ))
+            self.stdout.write("  views: " + ', '.join(f"{v} ({n})" for v, n in r['views'].items()))
+            self.stdout.write(f"  sql:   {r['sql'][:400]}")
+            for line in r['plan']:
+                self.stdout.write(f"  plan:  {line}")
+            for w in r['warnings']:
+                self.stdout.write(self.style.WARNING(f"  !! {w}"))
@@ -0,0 +1,36 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    help = "Copy the default SQLite database onto every configured read replica."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=1024,
+                            help="Pages copied per backup step (smaller = shorter write locks).")
+
+    def handle(self, *args, **opts):
+        source = settings.DATABASES['default']
+        if source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("sync_replicas only supports SQLite databases.")
+
+        aliases = replica_aliases()
+        if not aliases:
+            self.stdout.write("No replicas configured (READ_REPLICA_FILES is empty).")
+            return
+
+        src = sqlite3.connect(str(source['NAME']))
+        try:
+            for alias in aliases:
+                dst = sqlite3.connect(str(settings.DATABASES[alias]['NAME']))
+                try:
+                    src.backup(dst, pages=opts['pages'])
+                finally:
+                    dst.close()
+                self.stdout.write(self.style.SUCCESS(f"Synced {alias} <- default"))
+        finally:
+            src.close()
@@ -0,0 +1,109 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+
+from .profiling import is_requested, profile_request
+from .routers import pinned_to_primary
+from .slowlog import current_view
+
+PIN_COOKIE = 'bets_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')  # app.3f2a9c1d7e4b.js
+
+
+class PrimaryPinMiddleware:
+    """After a user writes, keep their reads on the primary for PRIMARY_PIN_SECONDS
+    so replica lag never hides their own changes (read-your-writes)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with pinned_to_primary(PIN_COOKIE in request.COOKIES):
+            response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'PRIMARY_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class QueryContextMiddleware:
+    """Tell the slow-query log (bets.slowlog) which view issued a statement."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_view.set(('', request.path))
+        try:
+            return self.get_response(request)
+        finally:
+            current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        current_view.set((match.view_name if match else view_func.__name__, request.path))
+
+
+class ProfilerMiddleware:
+    """Profile this request when a staff user asks for it (see bets.profiling).
+    Must come after AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if is_requested(request) and request.user.is_staff:
+            return profile_request(request, self.get_response)
+        return self.get_response(request)
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files from STATIC_ROOT.
+
+    Content-hashed names (from the manifest storage) never change, so they get
+    a one-year ``immutable`` Cache-Control. Clients that accept gzip receive the
+    ``.gz`` copy that collectstatic already wrote. Any other URL passes through.
+    """
+
+    IMMUTABLE = 'public, max-age=31536000, immutable'
+    REVALIDATE = 'public, max-age=60'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = getattr(settings, 'STATIC_ROOT', None)
+
+    def __call__(self, request):
+        if self.root and request.path.startswith(self.prefix) and request.method in ('GET', 'HEAD'):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        content_type, _ = mimetypes.guess_type(path)
+        gz_path = path + '.gz'
+        use_gz = 'gzip' in request.headers.get('Accept-Encoding', '') and os.path.isfile(gz_path)
+        response = FileResponse(open(gz_path if use_gz else path, 'rb'),
+                                content_type=content_type or 'application/octet-stream')
+        if use_gz:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = self.IMMUTABLE if HASHED_NAME.search(name) else self.REVALIDATE
+        return response
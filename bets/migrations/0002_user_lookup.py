@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_user_lookup(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserLookup = apps.get_model('bets', 'UserLookup')
+    UserLookup.objects.bulk_create(
+        [
+            UserLookup(user_id=u.id, username_lower=u.username.strip().lower(), email_lower=(u.email or '').strip().lower())
+            for u in User.objects.only('id', 'username', 'email').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserLookup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username_lower', models.CharField(db_index=True, max_length=150)),
+                ('email_lower', models.CharField(blank=True, db_index=True, max_length=254)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='lookup', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_user_lookup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0002_user_lookup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='market',
+            name='settled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='eventtransaction',
+            name='type',
+            field=models.CharField(choices=[('TREASURY_CREDIT', 'Treasury Credit'), ('TREASURY_DEBIT', 'Treasury Debit'), ('ARCHIVE_SUMMARY', 'Archived Ledger Summary')], max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='type',
+            field=models.CharField(choices=[('DEPOSIT', 'Deposit'), ('WITHDRAW', 'Withdraw'), ('WAGER_STAKE', 'Wager Stake'), ('WAGER_PAYOUT', 'Wager Payout'), ('HOUSE_COMMISSION', 'House Commission/Settlement'), ('ARCHIVE_SUMMARY', 'Archived Ledger Summary')], max_length=32),
+        ),
+        migrations.CreateModel(
+            name='ArchivedMarket',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('winner_title', models.CharField(blank=True, max_length=120)),
+                ('total_staked', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('total_payout', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('created_at', models.DateTimeField()),
+                ('settled_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('archive_file', models.CharField(max_length=255)),
+                ('archive_offset', models.BigIntegerField()),
+                ('creator', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_created_markets', to=settings.AUTH_USER_MODEL)),
+                ('event', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_markets', to='bets.event')),
+                ('house', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_house_markets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('staked', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('returned', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('market', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='bets.archivedmarket')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_positions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('market', 'user')},
+            },
+        ),
+    ]
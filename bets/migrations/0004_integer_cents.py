@@ -0,0 +1,69 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+import bets.money
+from django.db import migrations, models
+
+# (model, field, has default) for every ledger amount moved from DecimalField to integer cents
+MONEY_FIELDS = [
+    ('wallet', 'balance', True),
+    ('transaction', 'amount', False),
+    ('eventwallet', 'balance', True),
+    ('eventtransaction', 'amount', False),
+    ('wager', 'stake', False),
+    ('wager', 'potential_payout', False),
+    ('archivedmarket', 'total_staked', True),
+    ('archivedmarket', 'total_payout', True),
+    ('archivedposition', 'staked', False),
+    ('archivedposition', 'returned', False),
+]
+
+
+def _to_cents(value) -> int:
+    return int(Decimal(value).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def _copy(apps, src_suffix, dst_suffix, convert):
+    for model_name, field, _ in MONEY_FIELDS:
+        Model = apps.get_model('bets', model_name)
+        src, dst = field + src_suffix, field + dst_suffix
+        batch = []
+        for row in Model.objects.only('pk', src).iterator(chunk_size=2000):
+            setattr(row, dst, convert(getattr(row, src)))
+            batch.append(row)
+            if len(batch) >= 2000:
+                Model.objects.bulk_update(batch, [dst])
+                batch = []
+        if batch:
+            Model.objects.bulk_update(batch, [dst])
+
+
+def decimal_to_cents(apps, schema_editor):
+    _copy(apps, '', '_cents', _to_cents)
+
+
+def cents_to_decimal(apps, schema_editor):
+    _copy(apps, '_cents', '', lambda c: Decimal(c).scaleb(-2))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0003_market_archive'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(model_name=m, name=f'{f}_cents', field=models.BigIntegerField(default=0))
+            for m, f, _ in MONEY_FIELDS
+        ],
+        migrations.RunPython(decimal_to_cents, cents_to_decimal),
+        *[migrations.RemoveField(model_name=m, name=f) for m, f, _ in MONEY_FIELDS],
+        *[migrations.RenameField(model_name=m, old_name=f'{f}_cents', new_name=f) for m, f, _ in MONEY_FIELDS],
+        *[
+            migrations.AlterField(
+                model_name=m, name=f,
+                field=bets.money.MoneyField(default=0) if has_default else bets.money.MoneyField(),
+            )
+            for m, f, has_default in MONEY_FIELDS
+        ],
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0004_integer_cents'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='market',
+            name='status',
+            field=models.CharField(choices=[('OPEN', 'Open'), ('SUSPENDED', 'Suspended'), ('SETTLED', 'Settled'), ('VOID', 'Void')], default='OPEN', max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='type',
+            field=models.CharField(choices=[('DEPOSIT', 'Deposit'), ('WITHDRAW', 'Withdraw'), ('WAGER_STAKE', 'Wager Stake'), ('WAGER_PAYOUT', 'Wager Payout'), ('WAGER_REFUND', 'Wager Refund'), ('HOUSE_COMMISSION', 'House Commission/Settlement'), ('ARCHIVE_SUMMARY', 'Archived Ledger Summary')], max_length=32),
+        ),
+    ]
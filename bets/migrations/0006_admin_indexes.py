@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:04
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0005_market_void'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventtransaction',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='market',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='wager',
+            name='placed_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='eventtransaction',
+            index=models.Index(fields=['type', 'created_at'], name='bets_eventt_type_ea1989_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='market',
+            index=models.Index(fields=['status', 'created_at'], name='bets_market_status_ac3234_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['type', 'created_at'], name='bets_transa_type_4f5631_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wager',
+            index=models.Index(fields=['status', 'placed_at'], name='bets_wager_status_162f58_idx'),
+        ),
+    ]
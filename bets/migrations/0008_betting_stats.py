@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:10
+
+import bets.money
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0007_request_profile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedposition',
+            name='wagers',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='archivedposition',
+            name='wins',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BettingStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wagers', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('staked', bets.money.MoneyField(default=0)),
+                ('returned', bets.money.MoneyField(default=0)),
+                ('net', bets.money.MoneyField(default=0)),
+                ('roi', models.FloatField(default=0)),
+                ('win_rate', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('event', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='betting_stats', to='bets.event')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='betting_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'net', 'user'], name='bettingstats_net'), models.Index(fields=['event', 'roi', 'user'], name='bettingstats_roi'), models.Index(fields=['event', 'win_rate', 'user'], name='bettingstats_win_rate')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'event'), name='bettingstats_user_event'), models.UniqueConstraint(condition=models.Q(('event__isnull', True)), fields=('user',), name='bettingstats_user_overall')],
+            },
+        ),
+    ]
@@ -0,0 +1,103 @@
+from django.db import migrations
+
+# One FTS5 row per market (rowid = market id) and per event (rowid = -event id).
+# Triggers keep it in step with every write path, including bulk_create,
+# queryset.update() and archival deletes, which signals would miss.
+# SQLite only: on other backends bets.search falls back to ORM lookups.
+#
+# Any later migration that makes SQLite rebuild bets_market, bets_outcome or
+# bets_event (AlterField, RemoveField, most constraint changes: Django copies
+# the table and drops the old one) silently drops these triggers, and search
+# goes stale. Such a migration must end with
+# RunPython(<this module>.create_triggers, migrations.RunPython.noop).
+# The bets.E001 system check (bets/checks.py) reports missing triggers.
+
+MARKET_BODY = "coalesce((SELECT group_concat(title, ' ') FROM bets_outcome WHERE market_id = {id}), '')"
+
+FORWARD = [
+    """CREATE VIRTUAL TABLE bets_search USING fts5(
+        kind UNINDEXED, title, body,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+
+    f"""INSERT INTO bets_search(rowid, kind, title, body)
+        SELECT m.id, 'market', m.title, {MARKET_BODY.format(id='m.id')} FROM bets_market m""",
+    """INSERT INTO bets_search(rowid, kind, title, body)
+        SELECT -e.id, 'event', e.name, e.description FROM bets_event e""",
+]
+
+TRIGGER_SQL = [
+    f"""CREATE TRIGGER bets_search_market_ai AFTER INSERT ON bets_market BEGIN
+        INSERT INTO bets_search(rowid, kind, title, body)
+        VALUES (NEW.id, 'market', NEW.title, {MARKET_BODY.format(id='NEW.id')});
+    END""",
+    """CREATE TRIGGER bets_search_market_au AFTER UPDATE OF title ON bets_market BEGIN
+        UPDATE bets_search SET title = NEW.title WHERE rowid = NEW.id;
+    END""",
+    """CREATE TRIGGER bets_search_market_ad AFTER DELETE ON bets_market BEGIN
+        DELETE FROM bets_search WHERE rowid = OLD.id;
+    END""",
+
+    f"""CREATE TRIGGER bets_search_outcome_ai AFTER INSERT ON bets_outcome BEGIN
+        UPDATE bets_search SET body = {MARKET_BODY.format(id='NEW.market_id')} WHERE rowid = NEW.market_id;
+    END""",
+    f"""CREATE TRIGGER bets_search_outcome_au AFTER UPDATE OF title, market_id ON bets_outcome BEGIN
+        UPDATE bets_search SET body = {MARKET_BODY.format(id='OLD.market_id')} WHERE rowid = OLD.market_id;
+        UPDATE bets_search SET body = {MARKET_BODY.format(id='NEW.market_id')} WHERE rowid = NEW.market_id;
+    END""",
+    f"""CREATE TRIGGER bets_search_outcome_ad AFTER DELETE ON bets_outcome BEGIN
+        UPDATE bets_search SET body = {MARKET_BODY.format(id='OLD.market_id')} WHERE rowid = OLD.market_id;
+    END""",
+
+    """CREATE TRIGGER bets_search_event_ai AFTER INSERT ON bets_event BEGIN
+        INSERT INTO bets_search(rowid, kind, title, body) VALUES (-NEW.id, 'event', NEW.name, NEW.description);
+    END""",
+    """CREATE TRIGGER bets_search_event_au AFTER UPDATE OF name, description ON bets_event BEGIN
+        UPDATE bets_search SET title = NEW.name, body = NEW.description WHERE rowid = -NEW.id;
+    END""",
+    """CREATE TRIGGER bets_search_event_ad AFTER DELETE ON bets_event BEGIN
+        DELETE FROM bets_search WHERE rowid = -OLD.id;
+    END""",
+]
+
+TRIGGERS = [
+    'bets_search_market_ai', 'bets_search_market_au', 'bets_search_market_ad',
+    'bets_search_outcome_ai', 'bets_search_outcome_au', 'bets_search_outcome_ad',
+    'bets_search_event_ai', 'bets_search_event_au', 'bets_search_event_ad',
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FORWARD + TRIGGER_SQL:
+        schema_editor.execute(sql)
+
+
+def create_triggers(apps, schema_editor):
+    """(Re-)create the sync triggers, e.g. after a migration rebuilt one of their tables."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    for sql in TRIGGER_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    schema_editor.execute('DROP TABLE IF EXISTS bets_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0008_betting_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_missing_wallets(apps, schema_editor):
+    # wallets are now created on signup (bets.signals.create_wallet); backfill older users
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Wallet = apps.get_model('bets', 'Wallet')
+    missing = User.objects.filter(wallet__isnull=True).values_list('id', flat=True)
+    Wallet.objects.bulk_create([Wallet(user_id=uid) for uid in missing.iterator()], batch_size=2000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0010_market_templates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_wallets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:31
+
+import bets.money
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0012_notification_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Parlay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stake', bets.money.MoneyField()),
+                ('odds_at_placement', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('potential_payout', bets.money.MoneyField()),
+                ('open_legs', models.PositiveSmallIntegerField()),
+                ('payout', bets.money.MoneyField(default=0)),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('WON', 'Won'), ('LOST', 'Lost'), ('VOID', 'Void')], default='OPEN', max_length=8)),
+                ('placed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('settled_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parlays', to='bets.event')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parlays', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-placed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ParlayLeg',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('odds_at_placement', models.DecimalField(decimal_places=3, max_digits=8)),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('WON', 'Won'), ('LOST', 'Lost'), ('VOID', 'Void')], default='OPEN', max_length=8)),
+                ('market', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parlay_legs', to='bets.market')),
+                ('outcome', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parlay_legs', to='bets.outcome')),
+                ('parlay', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='legs', to='bets.parlay')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='parlay',
+            index=models.Index(fields=['event', 'status'], name='bets_parlay_event_i_5cb901_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parlayleg',
+            index=models.Index(fields=['outcome', 'status'], name='bets_parlay_outcome_e98448_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='parlayleg',
+            constraint=models.UniqueConstraint(fields=('parlay', 'market'), name='one_parlay_leg_per_market'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_titles(apps, schema_editor):
+    ParlayLeg = apps.get_model('bets', 'ParlayLeg')
+    Market = apps.get_model('bets', 'Market')
+    Outcome = apps.get_model('bets', 'Outcome')
+    ParlayLeg.objects.update(
+        market_title=Subquery(Market.objects.filter(pk=OuterRef('market_id')).values('title')[:1]),
+        outcome_title=Subquery(Outcome.objects.filter(pk=OuterRef('outcome_id')).values('title')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0014_activity_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parlayleg',
+            name='market_title',
+            field=models.CharField(default='', max_length=200),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='parlayleg',
+            name='outcome_title',
+            field=models.CharField(default='', max_length=120),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_titles, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='parlayleg',
+            name='market',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='parlay_legs', to='bets.market'),
+        ),
+        migrations.AlterField(
+            model_name='parlayleg',
+            name='outcome',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='parlay_legs', to='bets.outcome'),
+        ),
+    ]
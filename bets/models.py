@@ -4,13 +4,15 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from .money import MoneyField
+
 
 User = settings.AUTH_USER_MODEL
 
 
 class Wallet(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wallet')
-    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    balance = MoneyField(default=0)
 
 
 def __str__(self):
@@ -22,26 +24,33 @@ class Transaction(models.Model):
     WITHDRAW = 'WITHDRAW'
     WAGER_STAKE = 'WAGER_STAKE'
     WAGER_PAYOUT = 'WAGER_PAYOUT'
+    WAGER_REFUND = 'WAGER_REFUND'
     HOUSE_COMMISSION = 'HOUSE_COMMISSION'
+    ARCHIVE_SUMMARY = 'ARCHIVE_SUMMARY'
     TYPES = [
         (DEPOSIT, 'Deposit'),
         (WITHDRAW, 'Withdraw'),
         (WAGER_STAKE, 'Wager Stake'),
         (WAGER_PAYOUT, 'Wager Payout'),
+        (WAGER_REFUND, 'Wager Refund'),
         (HOUSE_COMMISSION, 'House Commission/Settlement'),
+        (ARCHIVE_SUMMARY, 'Archived Ledger Summary'),
     ]
 
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions')
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = MoneyField()
     type = models.CharField(max_length=32, choices=TYPES)
-    created_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
     note = models.CharField(max_length=255, blank=True)
 
 
     class Meta:
       ordering = ['-created_at']
+      indexes = [models.Index(fields=['type', 'created_at'])]
 
+# Event, Market and Outcome carry the search-index triggers (migration 0009);
+# a migration that rebuilds one of their tables on SQLite must re-create them.
 class Event(models.Model):
     name = models.CharField(max_length=120)
     description = models.TextField(blank=True)
@@ -58,7 +67,7 @@ class Event(models.Model):
 
 class EventWallet(models.Model):
     event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='wallet')
-    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    balance = MoneyField(default=0)
 
     def __str__(self):
         return f"EventWallet({self.event.name}, balance={self.balance})"
@@ -67,19 +76,22 @@ class EventWallet(models.Model):
 class EventTransaction(models.Model):
     TREASURY_CREDIT = 'TREASURY_CREDIT'  # positive → house surplus
     TREASURY_DEBIT  = 'TREASURY_DEBIT'   # negative → house deficit
+    ARCHIVE_SUMMARY = 'ARCHIVE_SUMMARY'  # net of rows moved to cold storage
     TYPES = [
         (TREASURY_CREDIT, 'Treasury Credit'),
         (TREASURY_DEBIT,  'Treasury Debit'),
+        (ARCHIVE_SUMMARY, 'Archived Ledger Summary'),
     ]
 
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='transactions')
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = MoneyField()
     type = models.CharField(max_length=32, choices=TYPES)
-    created_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
     note = models.CharField(max_length=255, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['type', 'created_at'])]
 
     def __str__(self):
         return f"{self.event.name} {self.type} {self.amount} @ {self.created_at:%Y-%m-%d %H:%M}"
@@ -117,11 +129,13 @@ class EventInvite(models.Model):
         unique_together = ('event', 'to_user', 'status')
 
 
+# has search-index triggers, see the note above Event
 class Market(models.Model):
     OPEN = 'OPEN'
     SUSPENDED = 'SUSPENDED'
     SETTLED = 'SETTLED'
-    STATUSES = [(OPEN,'Open'),(SUSPENDED,'Suspended'),(SETTLED,'Settled')]
+    VOID = 'VOID'
+    STATUSES = [(OPEN,'Open'),(SUSPENDED,'Suspended'),(SETTLED,'Settled'),(VOID,'Void')]
 
     title = models.CharField(max_length=200)
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_markets')
@@ -130,10 +144,14 @@ class Market(models.Model):
     house_margin = models.DecimalField(max_digits=5, decimal_places=4, default=Decimal('0.05'))
     status = models.CharField(max_length=12, choices=STATUSES, default=OPEN)
     closes_at = models.DateTimeField(null=True, blank=True)
-    created_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    settled_at = models.DateTimeField(null=True, blank=True)
 
     max_bet_limit = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('100.00'))
 
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
     def __str__(self):
         return self.title
 
@@ -169,6 +187,7 @@ class MarketShareRequest(models.Model):
         unique_together = ('market', 'to_user', 'status')
 
 
+# has search-index triggers, see the note above Event
 class Outcome(models.Model):
     market = models.ForeignKey(Market, on_delete=models.CASCADE, related_name='outcomes')
     title = models.CharField(max_length=120)
@@ -184,6 +203,33 @@ class Outcome(models.Model):
         return f"{self.title} ({self.decimal_odds})"
 
 
+class MarketTemplate(models.Model):
+    # a market's shape (outcomes, weights, margin, limit) saved for re-use; see services.create_markets
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='market_templates')
+    title = models.CharField(max_length=200)
+    house_margin = models.DecimalField(max_digits=5, decimal_places=4, default=Decimal('0.05'))
+    max_bet_limit = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('100.00'))
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['title']
+
+    def __str__(self):
+        return self.title
+
+
+class MarketTemplateOutcome(models.Model):
+    template = models.ForeignKey(MarketTemplate, on_delete=models.CASCADE, related_name='outcomes')
+    title = models.CharField(max_length=120)
+    slider_weight = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.title} ({self.slider_weight})"
+
+
 class Wager(models.Model):
     PLACED = 'PLACED'
     CANCELLED = 'CANCELLED'
@@ -194,15 +240,152 @@ class Wager(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wagers')
     market = models.ForeignKey(Market, on_delete=models.CASCADE, related_name='wagers')
     outcome = models.ForeignKey(Outcome, on_delete=models.CASCADE, related_name='wagers')
-    stake = models.DecimalField(max_digits=12, decimal_places=2)
+    stake = MoneyField()
     odds_at_placement = models.DecimalField(max_digits=8, decimal_places=3)
-    potential_payout = models.DecimalField(max_digits=12, decimal_places=2)
+    potential_payout = MoneyField()
     status = models.CharField(max_length=12, choices=STATUSES, default=PLACED)
-    placed_at = models.DateTimeField(default=timezone.now)
+    placed_at = models.DateTimeField(default=timezone.now, db_index=True)
 
 
     class Meta:
         ordering = ['-placed_at']
+        indexes = [models.Index(fields=['status', 'placed_at'])]
+
+class Parlay(models.Model):
+    # multi-leg wager within one event: pays stake x the product of its legs'
+    # odds once every leg has won; the event treasury is the counterparty
+    OPEN = 'OPEN'
+    WON = 'WON'
+    LOST = 'LOST'
+    VOID = 'VOID'
+    STATUSES = [(OPEN, 'Open'), (WON, 'Won'), (LOST, 'Lost'), (VOID, 'Void')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='parlays')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='parlays')
+    stake = MoneyField()
+    odds_at_placement = models.DecimalField(max_digits=12, decimal_places=3)
+    potential_payout = MoneyField()
+    open_legs = models.PositiveSmallIntegerField()  # legs still waiting on their market
+    payout = MoneyField(default=0)
+    status = models.CharField(max_length=8, choices=STATUSES, default=OPEN)
+    placed_at = models.DateTimeField(default=timezone.now)
+    settled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-placed_at']
+        indexes = [models.Index(fields=['event', 'status'])]
+
+    def __str__(self):
+        return f"{self.user} parlay #{self.pk} ({self.status})"
+
+
+class ParlayLeg(models.Model):
+    # indexed by outcome, so settling a market reads only its own legs. Market and
+    # outcome are loose references: archiving a decided leg's market deletes those
+    # rows, and the leg keeps their titles for the parlay list
+    OPEN = 'OPEN'
+    WON = 'WON'
+    LOST = 'LOST'
+    VOID = 'VOID'
+    STATUSES = Parlay.STATUSES
+
+    parlay = models.ForeignKey(Parlay, on_delete=models.CASCADE, related_name='legs')
+    market = models.ForeignKey(Market, on_delete=models.DO_NOTHING, db_constraint=False, related_name='parlay_legs')
+    outcome = models.ForeignKey(Outcome, on_delete=models.DO_NOTHING, db_constraint=False, related_name='parlay_legs')
+    market_title = models.CharField(max_length=200)
+    outcome_title = models.CharField(max_length=120)
+    odds_at_placement = models.DecimalField(max_digits=8, decimal_places=3)
+    status = models.CharField(max_length=8, choices=STATUSES, default=OPEN)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['parlay', 'market'], name='one_parlay_leg_per_market')]
+        indexes = [models.Index(fields=['outcome', 'status'])]
+
+
+class ArchivedMarket(models.Model):
+    # summary left behind when a settled market is moved to cold storage (bets.archive);
+    # id is the original Market id, detail lives at archive_file/archive_offset
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    creator = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='archived_created_markets')
+    house = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_house_markets')
+    event = models.ForeignKey(Event, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_markets')
+    winner_title = models.CharField(max_length=120, blank=True)
+    total_staked = MoneyField(default=0)
+    total_payout = MoneyField(default=0)
+    created_at = models.DateTimeField()
+    settled_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    archive_file = models.CharField(max_length=255)
+    archive_offset = models.BigIntegerField()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.title} (archived)"
+
+    @property
+    def house_net(self):
+        return self.total_staked - self.total_payout
+
+
+class ArchivedPosition(models.Model):
+    # one row per (archived market, bettor) so history totals survive archival
+    market = models.ForeignKey(ArchivedMarket, on_delete=models.CASCADE, related_name='positions')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_positions')
+    staked = MoneyField()
+    returned = MoneyField()
+    wagers = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('market', 'user')
+
+    @property
+    def net(self):
+        return self.returned - self.staked
+
+
+class BettingStats(models.Model):
+    # settled-bet totals per user, per event (event set) and overall (event null);
+    # kept current by settle_market, rebuilt by `manage.py rebuild_stats`
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='betting_stats')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, null=True, blank=True, related_name='betting_stats')
+    wagers = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    staked = MoneyField(default=0)
+    returned = MoneyField(default=0)
+    # derived from the columns above, stored so each board is an index range
+    net = MoneyField(default=0)
+    roi = models.FloatField(default=0)
+    win_rate = models.FloatField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'event'], name='bettingstats_user_event'),
+            models.UniqueConstraint(fields=['user'], condition=models.Q(event__isnull=True), name='bettingstats_user_overall'),
+        ]
+        indexes = [
+            models.Index(fields=['event', 'net', 'user'], name='bettingstats_net'),
+            models.Index(fields=['event', 'roi', 'user'], name='bettingstats_roi'),
+            models.Index(fields=['event', 'win_rate', 'user'], name='bettingstats_win_rate'),
+        ]
+
+    def __str__(self):
+        return f"BettingStats({self.user}, {self.event or 'overall'}, net={self.net})"
+
+    def add(self, wagers: int, wins: int, staked, returned):
+        self.wagers += wagers
+        self.wins += wins
+        self.staked += staked
+        self.returned += returned
+        self.net = self.returned - self.staked
+        self.roi = self.net.cents / self.staked.cents if self.staked else 0.0
+        self.win_rate = self.wins / self.wagers if self.wagers else 0.0
+        self.updated_at = timezone.now()
+
 
 class UserSettings(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='settings')
@@ -212,6 +395,19 @@ class UserSettings(models.Model):
         return f"UserSettings({self.user}, default_max_bet_limit={self.default_max_bet_limit})"
     
 
+class UserLookup(models.Model):
+    # lower-cased copies of username/email, kept current by bets.signals,
+    # so exact and prefix lookups are plain indexed comparisons. The signal
+    # only sees save(): after bulk_create()/update() on users, run
+    # `manage.py rebuild_user_lookup`.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='lookup')
+    username_lower = models.CharField(max_length=150, db_index=True)
+    email_lower = models.CharField(max_length=254, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"UserLookup({self.username_lower})"
+
+
 class Friendship(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='friends_from')
     friend = models.ForeignKey(User, on_delete=models.CASCADE, related_name='friends_to')
@@ -234,3 +430,94 @@ class FriendshipRequest(models.Model):
 
     class Meta:
         unique_together = ('from_user', 'to_user', 'status')
+
+
+class Notification(models.Model):
+    # transactional outbox: written in the same transaction as the change it
+    # reports, delivered later as per-user digests by `manage.py send_notifications`
+    EVENT_INVITE = 'EVENT_INVITE'
+    MARKET_SHARE = 'MARKET_SHARE'
+    FRIEND_REQUEST = 'FRIEND_REQUEST'
+    SETTLEMENT = 'SETTLEMENT'
+    VOID = 'VOID'
+    KINDS = [
+        (EVENT_INVITE, 'Event invite'),
+        (MARKET_SHARE, 'Market share'),
+        (FRIEND_REQUEST, 'Friend request'),
+        (SETTLEMENT, 'Market settled'),
+        (VOID, 'Market voided'),
+    ]
+    PENDING = 'PENDING'
+    SENT = 'SENT'
+    FAILED = 'FAILED'
+    STATUSES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    text = models.CharField(max_length=255)
+    url = models.CharField(max_length=200, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.user} {self.kind}: {self.text}"
+
+
+class Activity(models.Model):
+    # append-only feed written by the services (bets.activity); each event keeps
+    # its newest ACTIVITY_CAP rows (a market without an event, its own), and every
+    # read is one range of the (event, id) or (market, id) index, which also
+    # serve the foreign keys
+    WAGER = 'WAGER'
+    JOINED = 'JOINED'
+    SETTLED = 'SETTLED'
+    VOID = 'VOID'
+    KINDS = [(WAGER, 'Wager placed'), (JOINED, 'Member joined'), (SETTLED, 'Market settled'), (VOID, 'Market voided')]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, null=True, blank=True, db_index=False, related_name='+')
+    # no constraint or cascade: archiving a market deletes the row but keeps its
+    # history, which still links to the archived page under the same id
+    market = models.ForeignKey(Market, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True,
+                               db_index=False, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    text = models.CharField(max_length=255)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'activity'
+        indexes = [
+            models.Index(fields=['event', 'id'], name='activity_event'),
+            models.Index(fields=['market', 'id'], name='activity_market'),
+        ]
+
+    def __str__(self):
+        return self.text
+
+
+class RequestProfile(models.Model):
+    # one staff-triggered profiling run; artifacts live in PROFILE_DIR/<artifact>.*
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='request_profiles')
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField(default=0)
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    query_ms = models.FloatField(default=0)
+    artifact = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,142 @@
+# bets/money.py
+"""Fixed-point money stored as integer cents.
+
+``Money`` wraps an ``int`` number of cents. Arithmetic between amounts is plain
+integer math. Rounding happens only when converting from a ``Decimal`` and when
+a stake is multiplied by decimal odds (``times_odds``). Both round half up,
+which matches ``quantize(TWOPLACES, ROUND_HALF_UP)`` exactly.
+
+Plain numbers (``int``/``Decimal``/``str``) are always read as currency units,
+e.g. ``Money.of('12.34')`` or ``Money.of(5)``. Use ``Money(cents)`` when you
+already have cents.
+"""
+from __future__ import annotations
+from decimal import Decimal, ROUND_HALF_UP
+from functools import total_ordering
+
+from django import forms
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+TWOPLACES = Decimal('0.01')
+ODDS_SCALE = 1000  # decimal_odds has 3 decimal places
+
+
+def _div_round_half_up(n: int, d: int) -> int:
+    q, r = divmod(abs(n), d)
+    if 2 * r >= d:
+        q += 1
+    return q if n >= 0 else -q
+
+
+@total_ordering
+class Money:
+    __slots__ = ('cents',)
+
+    def __init__(self, cents: int = 0):
+        self.cents = int(cents)
+
+    @classmethod
+    def of(cls, value) -> Money:
+        if isinstance(value, Money):
+            return value
+        if isinstance(value, int):
+            return cls(value * 100)
+        d = Decimal(value).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+        return cls(int(d.scaleb(2)))
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.cents).scaleb(-2).quantize(TWOPLACES)
+
+    def times_odds(self, odds) -> Money:
+        """Payout for this stake at ``odds`` (3dp decimal odds), rounded half up to the cent."""
+        milli = int(Decimal(odds).scaleb(3).to_integral_value(rounding=ROUND_HALF_UP))
+        return Money(_div_round_half_up(self.cents * milli, ODDS_SCALE))
+
+    # arithmetic -------------------------------------------------------------
+
+    def __add__(self, other):
+        return Money(self.cents + Money.of(other).cents)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return Money(self.cents - Money.of(other).cents)
+
+    def __rsub__(self, other):
+        return Money(Money.of(other).cents - self.cents)
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def __abs__(self):
+        return Money(abs(self.cents))
+
+    # comparison -------------------------------------------------------------
+
+    def __eq__(self, other):
+        try:
+            return self.cents == Money.of(other).cents
+        except (TypeError, ValueError, ArithmeticError):
+            return NotImplemented
+
+    def __lt__(self, other):
+        return self.cents < Money.of(other).cents
+
+    def __hash__(self):
+        return hash(self.cents)
+
+    def __bool__(self):
+        return self.cents != 0
+
+    # display ----------------------------------------------------------------
+
+    def __str__(self):
+        sign = '-' if self.cents < 0 else ''
+        units, cents = divmod(abs(self.cents), 100)
+        return f"{sign}{units}.{cents:02d}"
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __format__(self, spec):
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+
+class MoneyAttribute(DeferredAttribute):
+    # coerce on assignment so instance attributes are always Money (or an expression)
+    def __set__(self, instance, value):
+        if value is not None and not isinstance(value, Money) and not hasattr(value, 'resolve_expression'):
+            value = Money.of(value)
+        instance.__dict__[self.field.attname] = value
+
+
+class MoneyField(models.BigIntegerField):
+    """Stores ``Money`` as integer cents; accepts Money, Decimal, int or str (units)."""
+
+    descriptor_class = MoneyAttribute
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else Money(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Money):
+            return value
+        return Money.of(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return Money.of(value).cents
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{
+            'form_class': forms.DecimalField,
+            'max_digits': 12,
+            'decimal_places': 2,
+            **kwargs,
+        })
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return '' if value is None else str(value)
@@ -0,0 +1,139 @@
+# bets/netting.py
+"""End-of-night settle-up for an event.
+
+Every settled market in an event moves money between its bettors and its house.
+A market without a house moves it to the event treasury instead. ``positions``
+gives each party's net result over the whole event in one statement. That
+statement is a UNION ALL of six GROUP BYs: bettors and houses of the live
+settled markets (from ``Wager``), bettors and houses of the archived ones
+(from ``ArchivedPosition`` / ``ArchivedMarket``), and bettors and the treasury
+of decided parlays. The treasury is the ``None`` party. The positions always
+sum to zero.
+
+``settle_up`` turns the positions into real-world payments. Finding the true
+minimum number of payments is NP-hard (subset sum), so:
+
+1. a debtor and a creditor whose amounts cancel exactly are paired first, with
+   one dict lookup per debtor;
+2. the largest remaining debtor then pays the largest remaining creditor, and
+   whoever still has a balance goes back on its heap.
+
+Each payment settles at least one party, so n parties need at most n - 1
+payments. The whole plan is O(n log n).
+"""
+from __future__ import annotations
+import heapq
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+from django.db.models import BigIntegerField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedMarket, ArchivedPosition, Market, Parlay, Wager
+from .money import Money, MoneyField
+
+TREASURY = None
+
+
+@dataclass(frozen=True)
+class Transfer:
+    payer: int | None
+    payee: int | None
+    amount: Money
+
+
+def _net(gain, loss):
+    zero = Value(0, output_field=MoneyField())
+    return ExpressionWrapper(Coalesce(gain, zero) - Coalesce(loss, zero), output_field=MoneyField())
+
+
+def positions(event) -> dict[int | None, Money]:
+    """Net result per user id (``TREASURY`` for the event pot) over the event's settled markets; zeros dropped."""
+    won = Q(outcome__is_winner=True)
+    live = Wager.objects.filter(market__event=event, market__status=Market.SETTLED).order_by()
+    bettors = live.values(party=F('user_id')).annotate(
+        net=_net(Sum('potential_payout', filter=won), Sum('stake')),
+    )
+    houses = live.values(party=F('market__house_id')).annotate(
+        net=_net(Sum('stake'), Sum('potential_payout', filter=won)),
+    )
+    archived_bettors = ArchivedPosition.objects.filter(market__event=event).order_by().values(
+        party=F('user_id'),
+    ).annotate(net=_net(Sum('returned'), Sum('staked')))
+    archived_houses = ArchivedMarket.objects.filter(event=event).order_by().values(
+        party=F('house_id'),
+    ).annotate(net=_net(Sum('total_staked'), Sum('total_payout')))
+    decided = Parlay.objects.filter(event=event, status__in=[Parlay.WON, Parlay.LOST]).order_by()
+    parlay_bettors = decided.values(party=F('user_id')).annotate(net=_net(Sum('payout'), Sum('stake')))
+    parlay_treasury = decided.values(party=Value(TREASURY, output_field=BigIntegerField())).annotate(
+        net=_net(Sum('stake'), Sum('payout')),
+    )
+
+    totals: dict[int | None, int] = defaultdict(int)
+    rows = bettors.union(
+        houses, archived_bettors, archived_houses, parlay_bettors, parlay_treasury, all=True,
+    ).values_list('party', 'net')
+    for party, net in rows:
+        totals[party] += net.cents
+    return {party: Money(cents) for party, cents in totals.items() if cents}
+
+
+def settle_up(balances: dict[int | None, Money]) -> list[Transfer]:
+    """Payments that bring every balance to zero: positive balances are owed money, negative ones owe it."""
+    debts = {p: -v.cents for p, v in balances.items() if v < 0}
+    credits = {p: v.cents for p, v in balances.items() if v > 0}
+    if sum(debts.values()) != sum(credits.values()):
+        raise ValueError("Balances do not sum to zero")
+
+    plan = []
+    by_amount = defaultdict(list)
+    for p, cents in credits.items():
+        by_amount[cents].append(p)
+    for p, cents in list(debts.items()):
+        if by_amount.get(cents):
+            payee = by_amount[cents].pop()
+            plan.append(Transfer(p, payee, Money(cents)))
+            del debts[p], credits[payee]
+
+    # heapq is a min-heap: store negated cents; the party key breaks ties deterministically
+    payers = [(-c, _key(p), p) for p, c in debts.items()]
+    payees = [(-c, _key(p), p) for p, c in credits.items()]
+    heapq.heapify(payers)
+    heapq.heapify(payees)
+    while payers:
+        owe, k1, payer = heapq.heappop(payers)
+        due, k2, payee = heapq.heappop(payees)
+        cents = min(-owe, -due)
+        plan.append(Transfer(payer, payee, Money(cents)))
+        if -owe > cents:
+            heapq.heappush(payers, (owe + cents, k1, payer))
+        if -due > cents:
+            heapq.heappush(payees, (due + cents, k2, payee))
+    return plan
+
+
+def _key(party) -> int:
+    return -1 if party is TREASURY else party
+
+
+@dataclass
+class Plan:
+    positions: list[tuple[str, Money]]
+    transfers: list[tuple[str, str, Money]]
+
+
+def settlement_plan(event) -> Plan:
+    """``positions`` and ``settle_up`` for ``event``, with usernames filled in for display."""
+    balances = positions(event)
+    transfers = settle_up(balances)
+    names = dict(get_user_model().objects.filter(id__in=[p for p in balances if p is not TREASURY])
+                 .values_list('id', 'username'))
+
+    def name(party):
+        return 'Event treasury' if party is TREASURY else names.get(party, f'user {party}')
+
+    return Plan(
+        positions=[(name(p), v) for p, v in sorted(balances.items(), key=lambda kv: -kv[1].cents)],
+        transfers=[(name(t.payer), name(t.payee), t.amount) for t in transfers],
+    )
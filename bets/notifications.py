@@ -0,0 +1,159 @@
+# bets/notifications.py
+"""Notification outbox and digest delivery.
+
+Services call ``notify`` inside the transaction that makes the change, so a
+notification exists exactly when its change was committed. No mail is sent
+on the request path. ``manage.py send_notifications`` drains the outbox:
+
+1. ``due_users`` picks users whose oldest pending notification is older than
+   ``NOTIFICATION_DIGEST_MINUTES``. That window lets the settlements and
+   invites of one evening arrive as a single email.
+2. ``claim`` takes those users' due notifications. It pushes their
+   ``next_attempt_at`` forward by a lease, so a second worker skips them.
+3. ``deliver`` renders one digest per user and sends the whole batch over a
+   single mail connection. Each digest that was sent is marked SENT. A
+   failed digest is retried with exponential backoff until
+   ``NOTIFICATION_MAX_ATTEMPTS``, then marked FAILED.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Min
+from django.utils import timezone
+
+from .db import immediate_atomic
+from .models import Notification
+
+LEASE = timedelta(minutes=10)
+
+
+def digest_window() -> timedelta:
+    return timedelta(minutes=getattr(settings, 'NOTIFICATION_DIGEST_MINUTES', 15))
+
+
+def max_attempts() -> int:
+    return getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    base = getattr(settings, 'NOTIFICATION_RETRY_SECONDS', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 6 * 3600))
+
+
+def notify(user_ids: Iterable[int], kind: str, text: str, url: str = '') -> int:
+    """Queue the same notification for every user in ``user_ids`` (one insert)."""
+    return notify_each({uid: text for uid in user_ids if uid is not None}, kind, url)
+
+
+def notify_each(messages: dict[int, str], kind: str, url: str = '') -> int:
+    """Queue a different text per user (one insert), e.g. each bettor's settlement result."""
+    now = timezone.now()
+    Notification.objects.bulk_create([
+        Notification(user_id=uid, kind=kind, text=text[:255], url=url, created_at=now, next_attempt_at=now)
+        for uid, text in messages.items()
+    ])
+    return len(messages)
+
+
+# --- Delivery ----------------------------------------------------------------
+
+def due_users(limit: int, flush: bool = False, now=None) -> list[int]:
+    now = now or timezone.now()
+    qs = (
+        Notification.objects.filter(status=Notification.PENDING, next_attempt_at__lte=now)
+        .values('user_id').annotate(oldest=Min('created_at')).order_by('oldest')
+    )
+    if not flush:
+        qs = qs.filter(oldest__lte=now - digest_window())
+    return [r['user_id'] for r in qs[:limit]]
+
+
+def claim(user_ids: list[int], now=None) -> dict[int, list[Notification]]:
+    now = now or timezone.now()
+    with immediate_atomic():
+        due = Notification.objects.filter(user_id__in=user_ids, status=Notification.PENDING, next_attempt_at__lte=now)
+        rows = list(due.order_by('created_at'))
+        Notification.objects.filter(id__in=[n.id for n in rows]).update(next_attempt_at=now + LEASE)
+    by_user = defaultdict(list)
+    for n in rows:
+        by_user[n.user_id].append(n)
+    return by_user
+
+
+def site_url() -> str:
+    return getattr(settings, 'NOTIFICATION_SITE_URL', 'http://localhost:8000').rstrip('/')
+
+
+def render_digest(user, notes: list[Notification]) -> EmailMessage:
+    lines = [f"Hi {user.username},", ""]
+    for n in notes:
+        lines.append(f"- {n.text}" + (f"\n  {site_url()}{n.url}" if n.url else ""))
+    lines += ["", "— The House"]
+    subject = notes[0].text if len(notes) == 1 else f"{len(notes)} updates from The House"
+    return EmailMessage(subject=subject[:120], body="\n".join(lines), to=[user.email])
+
+
+def deliver(by_user: dict[int, list[Notification]], now=None) -> tuple[int, int]:
+    """Send one digest per user over one connection; returns (digests sent, digests to retry)."""
+    now = now or timezone.now()
+    users = get_user_model().objects.in_bulk(list(by_user))
+    sent, failed, dead = [], {}, []
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:  # no connection: retry the whole batch
+        failed = {uid: str(e) for uid in by_user}
+    else:
+        try:
+            for uid, notes in by_user.items():
+                user = users.get(uid)
+                if user is None or not user.email:
+                    dead += [n.id for n in notes]
+                    continue
+                try:
+                    connection.send_messages([render_digest(user, notes)])
+                except Exception as e:  # one bad address must not sink the batch
+                    failed[uid] = str(e)
+                else:
+                    sent.append(uid)
+        finally:
+            connection.close()
+
+    with immediate_atomic():
+        if sent:
+            Notification.objects.filter(id__in=[n.id for uid in sent for n in by_user[uid]]).update(
+                status=Notification.SENT, sent_at=now,
+            )
+        if dead:
+            Notification.objects.filter(id__in=dead).update(status=Notification.FAILED, last_error='no email address')
+        for uid, error in failed.items():
+            _retry_later(by_user[uid], error, now)
+    return len(sent), len(failed)
+
+
+def _retry_later(notes: list[Notification], error: str, now):
+    attempts = max(n.attempts for n in notes) + 1
+    rows = Notification.objects.filter(id__in=[n.id for n in notes])
+    rows.update(attempts=F('attempts') + 1, last_error=error[:255], next_attempt_at=now + retry_delay(attempts))
+    rows.filter(attempts__gte=max_attempts()).update(status=Notification.FAILED)
+
+
+def drain(batch_size: int = 200, flush: bool = False, now=None) -> tuple[int, int]:
+    """Deliver every due digest, ``batch_size`` users at a time; returns totals (sent, to retry).
+
+    Claimed and retried rows move their ``next_attempt_at`` past ``now``, so each
+    user is picked up at most once per drain.
+    """
+    total_sent = total_failed = 0
+    while True:
+        users = due_users(batch_size, flush, now)
+        if not users:
+            return total_sent, total_failed
+        sent, failed = deliver(claim(users, now), now)
+        total_sent += sent
+        total_failed += failed
@@ -0,0 +1,186 @@
+# bets/profiling.py
+"""On-demand profiling of a single request, for staff.
+
+Add ``?_profile=1`` to a URL, or send ``X-Bets-Profile: 1``. The request then
+runs under cProfile while every SQL statement is recorded with its duration and
+the application frames that issued it. A sampling thread also records the full
+Python stack every ``PROFILE_SAMPLE_INTERVAL`` seconds. Three artifacts are
+written to ``PROFILE_DIR``:
+
+* ``<artifact>.pstats``: load with ``pstats``/snakeviz
+* ``<artifact>.collapsed``: ``frame;frame;frame count`` lines for flamegraph.pl/speedscope
+* ``<artifact>.sql.json``: the statements in execution order
+
+Each run is listed as a ``RequestProfile`` in the admin. Requests that don't
+ask for a profile only pay the trigger check in ``ProfilerMiddleware``.
+"""
+from __future__ import annotations
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+from .models import RequestProfile
+
+TRIGGER_PARAM = '_profile'
+TRIGGER_HEADER = 'HTTP_X_BETS_PROFILE'
+ARTIFACTS = {'pstats': '.pstats', 'collapsed': '.collapsed', 'sql': '.sql.json'}
+
+
+def profile_dir() -> Path:
+    path = Path(getattr(settings, 'PROFILE_DIR', Path(settings.BASE_DIR) / 'profiles'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def artifact_path(profile: RequestProfile, kind: str) -> Path:
+    return profile_dir() / f"{profile.artifact}{ARTIFACTS[kind]}"
+
+
+def is_requested(request) -> bool:
+    if request.META.get(TRIGGER_HEADER):
+        return True
+    return TRIGGER_PARAM in request.META.get('QUERY_STRING', '') and bool(request.GET.get(TRIGGER_PARAM))
+
+
+def _short(filename: str) -> str:
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        return filename[len(base) + 1:]
+    _, sep, rest = filename.rpartition('site-packages/')
+    return rest if sep else filename
+
+
+def _app_stack() -> list[str]:
+    base = str(settings.BASE_DIR)
+    frames = [f for f in traceback.extract_stack()[:-2] if f.filename.startswith(base)]
+    return [f"{_short(f.filename)}:{f.lineno} in {f.name}" for f in frames[-12:]]
+
+
+class _QueryLog:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': repr(params)[:1000],
+                'many': many,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+                'stack': _app_stack(),
+            })
+
+
+class _StackSampler(threading.Thread):
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{_short(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}")
+                frame = frame.f_back
+            if names:
+                self.counts[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def profile_request(request, get_response):
+    queries = _QueryLog()
+    profiler = cProfile.Profile()
+    sampler = _StackSampler(threading.get_ident(), getattr(settings, 'PROFILE_SAMPLE_INTERVAL', 0.001))
+
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(queries))
+        sampler.start()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+            elapsed = (time.perf_counter() - start) * 1000
+            sampler.stop()
+
+    profile = _save(request, response, elapsed, profiler, sampler.counts, queries.queries)
+    response.headers['X-Bets-Profile'] = str(profile.pk)
+    return response
+
+
+def _save(request, response, elapsed, profiler, samples, queries) -> RequestProfile:
+    artifact = uuid.uuid4().hex
+    directory = profile_dir()
+    profiler.dump_stats(directory / f"{artifact}.pstats")
+    (directory / f"{artifact}.collapsed").write_text(
+        ''.join(f"{stack} {n}\n" for stack, n in samples.most_common())
+    )
+    (directory / f"{artifact}.sql.json").write_text(json.dumps(queries, indent=1))
+
+    match = getattr(request, 'resolver_match', None)
+    profile = RequestProfile.objects.create(
+        user=request.user if request.user.is_authenticated else None,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        view_name=(match.view_name if match else '')[:200],
+        status_code=response.status_code,
+        duration_ms=round(elapsed, 3),
+        query_count=len(queries),
+        query_ms=round(sum(q['ms'] for q in queries), 3),
+        artifact=artifact,
+    )
+    _trim()
+    return profile
+
+
+def _trim():
+    keep = getattr(settings, 'PROFILE_KEEP', 200)
+    old = list(RequestProfile.objects.order_by('-created_at', '-id')[keep:])
+    for p in old:
+        for kind in ARTIFACTS:
+            artifact_path(p, kind).unlink(missing_ok=True)
+    if old:
+        RequestProfile.objects.filter(pk__in=[p.pk for p in old]).delete()
+
+
+def top_functions(profile: RequestProfile, limit: int = 30) -> str:
+    out = io.StringIO()
+    path = artifact_path(profile, 'pstats')
+    if not path.exists():
+        return 'Profile file is missing.'
+    stats = pstats.Stats(str(path), stream=out)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def slowest_queries(profile: RequestProfile, limit: int = 15) -> list[dict]:
+    path = artifact_path(profile, 'sql')
+    if not path.exists():
+        return []
+    return sorted(json.loads(path.read_text()), key=lambda q: q['ms'], reverse=True)[:limit]
@@ -0,0 +1,83 @@
+# bets/reconcile.py
+"""Check wallet balances against their ledgers.
+
+A wallet is consistent when its ``balance`` equals the sum of its ledger rows
+(``Transaction`` for user wallets, ``EventTransaction`` for event treasuries).
+Archived ledger rows are represented by their ARCHIVE_SUMMARY row, so the sums
+stay valid after ``archive_ledger``.
+
+Wallets are checked in owner-id ranges. Each range is a single query that
+returns every wallet in it together with its correlated ledger sum. Ranges are
+independent, so the command can spread them over a process pool. Every
+function takes a database alias (``using``), so a backup snapshot can be
+checked the same way (``bets.backup``).
+"""
+from __future__ import annotations
+from dataclasses import asdict, dataclass
+
+from django.db.models import Max, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import EventTransaction, EventWallet, Transaction, Wallet
+from .money import Money, MoneyField
+
+# kind -> (wallet model, owner field, ledger model)
+LEDGERS = {
+    'wallets': (Wallet, 'user_id', Transaction),
+    'event_wallets': (EventWallet, 'event_id', EventTransaction),
+}
+
+
+@dataclass
+class Discrepancy:
+    kind: str
+    owner_id: int
+    balance: Money
+    ledger: Money
+
+    @property
+    def difference(self) -> Money:
+        return self.balance - self.ledger
+
+    def as_dict(self) -> dict:
+        d = asdict(self)
+        d.update(balance=str(self.balance), ledger=str(self.ledger), difference=str(self.difference))
+        return d
+
+
+def id_bounds(kind: str, using=None) -> tuple[int, int] | None:
+    wallet_model, owner, _ = LEDGERS[kind]
+    b = wallet_model.objects.using(using).aggregate(lo=Min(owner), hi=Max(owner))
+    return None if b['lo'] is None else (b['lo'], b['hi'])
+
+
+def chunks(kind: str, size: int, start: int | None = None, using=None):
+    """Half-open owner-id ranges ``[lo, hi)`` covering every wallet of ``kind``."""
+    bounds = id_bounds(kind, using)
+    if bounds is None:
+        return
+    lo = max(bounds[0], start) if start is not None else bounds[0]
+    while lo <= bounds[1]:
+        yield lo, lo + size
+        lo += size
+
+
+def check_range(kind: str, lo: int, hi: int, using=None) -> tuple[int, list[Discrepancy]]:
+    """Return (wallets checked, discrepancies) for owners with ``lo <= id < hi``."""
+    wallet_model, owner, ledger_model = LEDGERS[kind]
+    ledger_sum = (
+        ledger_model.objects.using(using).filter(**{owner: OuterRef(owner)})
+        .order_by().values(owner).annotate(total=Sum('amount')).values('total')
+    )
+    rows = (
+        wallet_model.objects.using(using).filter(**{f'{owner}__gte': lo, f'{owner}__lt': hi})
+        .annotate(ledger=Coalesce(Subquery(ledger_sum, output_field=MoneyField()),
+                                  Value(Money(0), output_field=MoneyField())))
+        .values_list(owner, 'balance', 'ledger')
+    )
+    checked, bad = 0, []
+    for owner_id, balance, ledger in rows.iterator():
+        checked += 1
+        if balance != ledger:
+            bad.append(Discrepancy(kind, owner_id, balance, ledger))
+    return checked, bad
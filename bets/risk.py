@@ -0,0 +1,244 @@
+# bets/risk.py
+"""Combined exposure of a house (or an event treasury) across its open markets.
+
+Every open wager is loaded into numpy arrays in one query. From those we
+build, for each market, the house P&L under each possible winning outcome.
+Markets are treated as independent, with outcome probabilities taken from
+``implied_probability`` normalised to remove the margin. The P&L of the whole
+book is the sum over markets:
+
+* worst / best case: sum of the per-market minima / maxima (always exact)
+* expected: sum of the per-market expectations (always exact)
+* percentiles: exact convolution of the per-market distributions while the
+  number of distinct totals stays small, Monte Carlo sampling otherwise
+
+An event treasury is also the counterparty of the event's open parlays
+(whatever house its markets have). Their P&L depends on several markets at
+once, so they are reported on their own line (``RiskReport.parlays``) and
+added to the worst/expected/best totals, but not to the percentiles.
+
+All amounts are integer cents internally.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .models import Market, Outcome, Parlay, ParlayLeg, Wager
+from .money import Money
+from .services import combined_odds
+
+OPEN_STATUSES = [Market.OPEN, Market.SUSPENDED]
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+EXACT_SUPPORT_LIMIT = 250_000  # max distinct P&L values carried through the convolution
+MC_SAMPLES = 200_000
+
+
+@dataclass
+class MarketRisk:
+    market_id: int
+    title: str
+    wagers: int
+    staked: Money
+    worst_case: Money
+    expected: Money
+    best_case: Money
+
+
+@dataclass
+class ParlayRisk:
+    parlays: int = 0
+    staked: Money = field(default_factory=Money)
+    worst_case: Money = field(default_factory=Money)  # every open parlay wins
+    expected: Money = field(default_factory=Money)
+    best_case: Money = field(default_factory=Money)   # every open parlay loses
+
+
+@dataclass
+class RiskReport:
+    markets: list[MarketRisk] = field(default_factory=list)
+    wagers: int = 0
+    staked: Money = field(default_factory=Money)
+    worst_case: Money = field(default_factory=Money)
+    expected: Money = field(default_factory=Money)
+    best_case: Money = field(default_factory=Money)
+    percentiles: dict[int, Money] = field(default_factory=dict)
+    method: str = 'exact'
+    parlays: ParlayRisk | None = None
+
+    @property
+    def total_worst_case(self) -> Money:
+        return self.worst_case + (self.parlays.worst_case if self.parlays else 0)
+
+    @property
+    def total_expected(self) -> Money:
+        return self.expected + (self.parlays.expected if self.parlays else 0)
+
+    @property
+    def total_best_case(self) -> Money:
+        return self.best_case + (self.parlays.best_case if self.parlays else 0)
+
+
+def open_markets_for(house=None, event=None):
+    qs = Market.objects.filter(status__in=OPEN_STATUSES)
+    if house is not None:
+        qs = qs.filter(house=house)
+    if event is not None:
+        # markets without a house settle into the event treasury (EventWallet)
+        qs = qs.filter(event=event, house__isnull=True)
+    return qs
+
+
+def house_risk(house=None, event=None, *, samples: int = MC_SAMPLES, seed: int | None = None) -> RiskReport:
+    parlays = parlay_risk(event) if event is not None else None
+    markets = dict(open_markets_for(house, event).values_list('id', 'title'))
+    if not markets:
+        return RiskReport(parlays=parlays)
+
+    oc_rows = list(
+        Outcome.objects.filter(market_id__in=markets)
+        .order_by('market_id', 'id')
+        .values_list('market_id', 'id', 'implied_probability')
+    )
+    w_rows = list(
+        Wager.objects.filter(market_id__in=markets, status=Wager.PLACED)
+        .values_list('market_id', 'outcome_id', 'stake', 'potential_payout')
+    )
+
+    market_ids = np.fromiter(markets.keys(), dtype=np.int64)
+    m_index = {mid: i for i, mid in enumerate(market_ids.tolist())}
+    o_index = {oid: i for i, (_, oid, _) in enumerate(oc_rows)}
+    oc_market = np.fromiter((m_index[m] for m, _, _ in oc_rows), dtype=np.int64, count=len(oc_rows))
+    oc_prob = np.fromiter((float(p) for _, _, p in oc_rows), dtype=np.float64, count=len(oc_rows))
+
+    n_m, n_o = len(market_ids), len(oc_rows)
+    if w_rows:
+        w_market = np.fromiter((m_index[r[0]] for r in w_rows), dtype=np.int64, count=len(w_rows))
+        w_outcome = np.fromiter((o_index[r[1]] for r in w_rows), dtype=np.int64, count=len(w_rows))
+        w_stake = np.fromiter((r[2].cents for r in w_rows), dtype=np.int64, count=len(w_rows))
+        w_payout = np.fromiter((r[3].cents for r in w_rows), dtype=np.int64, count=len(w_rows))
+    else:
+        w_market = w_outcome = w_stake = w_payout = np.zeros(0, dtype=np.int64)
+
+    staked_m = np.bincount(w_market, weights=w_stake, minlength=n_m).astype(np.int64)
+    wagers_m = np.bincount(w_market, minlength=n_m)
+    payout_o = np.bincount(w_outcome, weights=w_payout, minlength=n_o).astype(np.int64)
+    pnl_o = staked_m[oc_market] - payout_o  # house P&L if this outcome wins
+
+    # normalised probabilities per market (uniform when the market has no weights)
+    prob_sum = np.bincount(oc_market, weights=oc_prob, minlength=n_m)
+    count_m = np.bincount(oc_market, minlength=n_m)
+    prob_o = np.where(prob_sum[oc_market] > 0, oc_prob / np.where(prob_sum > 0, prob_sum, 1)[oc_market],
+                      1.0 / np.maximum(count_m[oc_market], 1))
+
+    worst_m = np.full(n_m, np.iinfo(np.int64).max)
+    best_m = np.full(n_m, np.iinfo(np.int64).min)
+    np.minimum.at(worst_m, oc_market, pnl_o)
+    np.maximum.at(best_m, oc_market, pnl_o)
+    has_outcomes = count_m > 0
+    worst_m = np.where(has_outcomes, worst_m, 0)
+    best_m = np.where(has_outcomes, best_m, 0)
+    expected_m = np.bincount(oc_market, weights=prob_o * pnl_o, minlength=n_m)
+
+    starts = np.concatenate(([0], np.cumsum(count_m)))
+    dists = [
+        (pnl_o[starts[i]:starts[i + 1]], prob_o[starts[i]:starts[i + 1]])
+        for i in range(n_m) if count_m[i]
+    ]
+    values, method = _exact_percentiles(dists)
+    if values is None:
+        values, method = _sampled_percentiles(dists, samples, seed), 'monte_carlo'
+
+    return RiskReport(
+        markets=sorted(
+            (
+                MarketRisk(
+                    market_id=int(mid), title=markets[int(mid)], wagers=int(wagers_m[i]),
+                    staked=Money(int(staked_m[i])), worst_case=Money(int(worst_m[i])),
+                    expected=Money(int(round(expected_m[i]))), best_case=Money(int(best_m[i])),
+                )
+                for i, mid in enumerate(market_ids)
+            ),
+            key=lambda r: r.worst_case.cents,
+        ),
+        wagers=len(w_rows),
+        staked=Money(int(staked_m.sum())),
+        worst_case=Money(int(worst_m.sum())),
+        expected=Money(int(round(expected_m.sum()))),
+        best_case=Money(int(best_m.sum())),
+        percentiles={p: Money(int(v)) for p, v in zip(PERCENTILES, values)},
+        method=method,
+        parlays=parlays,
+    )
+
+
+def parlay_risk(event) -> ParlayRisk:
+    """The treasury's P&L on ``event``'s open parlays.
+
+    A parlay pays stake x the product of its won and open legs' odds if every
+    open leg wins (the treasury loses payout - stake), and otherwise the
+    treasury keeps the stake. Legs are independent, with the same normalised
+    probabilities as single wagers.
+    """
+    stakes = dict(Parlay.objects.filter(event=event, status=Parlay.OPEN).values_list('id', 'stake'))
+    if not stakes:
+        return ParlayRisk()
+    legs = list(
+        ParlayLeg.objects.filter(parlay_id__in=stakes, status__in=[ParlayLeg.OPEN, ParlayLeg.WON])
+        .values_list('parlay_id', 'market_id', 'outcome_id', 'status', 'odds_at_placement')
+    )
+    weights = defaultdict(dict)
+    for mid, oid, p in Outcome.objects.filter(market_id__in={leg[1] for leg in legs if leg[3] == ParlayLeg.OPEN}) \
+            .values_list('market_id', 'id', 'implied_probability'):
+        weights[mid][oid] = float(p)
+
+    odds, win_prob = defaultdict(list), defaultdict(lambda: 1.0)
+    for pid, mid, oid, status, leg_odds in legs:
+        odds[pid].append(leg_odds)
+        if status == ParlayLeg.OPEN:
+            market = weights[mid]
+            total = sum(market.values())
+            win_prob[pid] *= market.get(oid, 0) / total if total > 0 else 1 / max(len(market), 1)
+
+    report = ParlayRisk(parlays=len(stakes))
+    expected = 0.0
+    for pid, stake in stakes.items():
+        payout = stake.times_odds(combined_odds(odds[pid]))
+        report.staked += stake
+        report.worst_case += stake - payout
+        report.best_case += stake
+        expected += stake.cents - win_prob[pid] * payout.cents
+    report.expected = Money(int(round(expected)))
+    return report
+
+
+def _weighted_percentiles(values: np.ndarray, probs: np.ndarray) -> list[int]:
+    order = np.argsort(values, kind='stable')
+    cum = np.cumsum(probs[order])
+    cum /= cum[-1]
+    idx = np.searchsorted(cum, np.array(PERCENTILES) / 100.0, side='left')
+    return values[order][np.minimum(idx, len(cum) - 1)].tolist()
+
+
+def _exact_percentiles(dists):
+    values = np.zeros(1, dtype=np.int64)
+    probs = np.ones(1)
+    for pnl, p in dists:
+        if len(values) * len(pnl) > EXACT_SUPPORT_LIMIT * 4:
+            return None, None
+        values, inverse = np.unique((values[:, None] + pnl[None, :]).ravel(), return_inverse=True)
+        probs = np.bincount(inverse.ravel(), weights=(probs[:, None] * p[None, :]).ravel())
+        if len(values) > EXACT_SUPPORT_LIMIT:
+            return None, None
+    return _weighted_percentiles(values, probs), 'exact'
+
+
+def _sampled_percentiles(dists, samples: int, seed):
+    rng = np.random.default_rng(seed)
+    total = np.zeros(samples, dtype=np.int64)
+    for pnl, p in dists:
+        cum = np.cumsum(p)
+        pick = np.searchsorted(cum / cum[-1], rng.random(samples), side='right')
+        total += pnl[np.minimum(pick, len(pnl) - 1)]
+    return np.percentile(total, PERCENTILES, method='inverted_cdf').astype(np.int64).tolist()
@@ -0,0 +1,70 @@
+from __future__ import annotations
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_PREFIX = 'replica'
+
+_replica_reads: ContextVar[bool] = ContextVar('bets_replica_reads', default=False)
+_pinned_to_primary: ContextVar[bool] = ContextVar('bets_pinned_to_primary', default=False)
+
+
+def replica_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+@contextmanager
+def read_from_replica():
+    """Route ORM reads inside the block to a replica (unless the request is pinned)."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def pinned_to_primary(pinned: bool = True):
+    token = _pinned_to_primary.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+def use_replica(view):
+    """View decorator: reads go to a replica. Put it *inside* @login_required so the
+    session user is always loaded from the primary."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        with read_from_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Writes always go to ``default``; reads go to a random replica only inside
+    :func:`read_from_replica` and only when the user hasn't written recently."""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not _pinned_to_primary.get():
+            aliases = replica_aliases()
+            if aliases:
+                return random.choice(aliases)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas are file copies of default, see `manage.py sync_replicas`
+        return not db.startswith(REPLICA_PREFIX)
@@ -0,0 +1,185 @@
+# bets/search.py
+"""Full-text search over markets (title + outcome titles) and events (name + description).
+
+On SQLite the ``bets_search`` FTS5 table is maintained by triggers (migration
+0009). A query is split into terms; each term becomes a quoted prefix
+match, and all terms must match. Title hits weigh ten times body hits in
+bm25. Visibility uses the same rules as ``can_view_market`` and
+``event_detail``, expressed as indexed subqueries in the same statement, so a
+page costs one query. For very common terms only the newest
+``SEARCH_CANDIDATES`` visible matches of each kind are ranked, which keeps a
+page in the tens of milliseconds at hundreds of thousands of markets.
+Pagination fetches one extra row to decide whether a next page exists,
+rather than counting every match.
+
+The raw query runs on the alias the router picks for reads, so
+``@use_replica`` on the search view sends it to a replica like the ORM reads.
+
+Other database backends get a plain ORM ``icontains`` search with the same
+visibility rules.
+"""
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Event, EventMembership, Market, MarketShare
+
+PAGE_SIZE = 20
+_TERM = re.compile(r'\w+', re.UNICODE)
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+
+@dataclass
+class Hit:
+    kind: str  # 'market' or 'event'
+    id: int
+    title: str
+    status: str = ''
+    marked_title: str = ''
+    excerpt: str = ''  # matching stretch of the outcomes / description, when the title has no match
+
+    @property
+    def title_html(self):
+        return _html(self.marked_title or self.title)
+
+    @property
+    def excerpt_html(self):
+        return _html(self.excerpt)
+
+
+def _html(text: str):
+    return mark_safe(escape(text).replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>'))
+
+
+def _terms(query: str) -> list[str]:
+    return _TERM.findall(query.lower())[:8]
+
+
+def match_expression(query: str) -> str:
+    return ' AND '.join(f'"{t}"*' for t in _terms(query))
+
+
+def _mark(words: list[str], terms) -> tuple[str, int | None]:
+    first = None
+    out = []
+    for i, w in enumerate(words):
+        token = _TERM.search(w.lower())
+        if token and token.group().startswith(tuple(terms)):
+            first = i if first is None else first
+            w = f'{_MARK_OPEN}{w}{_MARK_CLOSE}'
+        out.append(w)
+    return out, first
+
+
+def snippet(title: str, body: str, terms, width: int = 12) -> tuple[str, str]:
+    """``title`` with matching words marked, and a window of ``body`` around its first match if the title has none."""
+    marked, first = _mark(title.split(), terms)
+    if first is not None or not body:
+        return ' '.join(marked), ''
+    words, first = _mark(body.split(), terms)
+    start = max((first or 0) - width // 3, 0)
+    window = ' '.join(words[start:start + width])
+    return ' '.join(marked), ('…' if start else '') + window + ('…' if start + width < len(words) else '')
+
+
+def search(user, query: str, page: int = 1, page_size: int = PAGE_SIZE) -> tuple[list[Hit], bool]:
+    """One page of hits visible to ``user``, best first, and whether more pages follow."""
+    page = max(page, 1)
+    if not match_expression(query):
+        return [], False
+    connection = connections[router.db_for_read(Market)]  # a replica under @use_replica
+    if connection.vendor == 'sqlite':
+        hits = _fts_search(connection, user, query, page_size + 1, (page - 1) * page_size)
+    else:
+        hits = _orm_search(user, query, page_size + 1, (page - 1) * page_size)
+    return hits[:page_size], len(hits) > page_size
+
+
+_MARKET_VISIBLE = """
+    AND (m.creator_id = %(uid)s OR m.house_id = %(uid)s
+         OR m.event_id IN (SELECT event_id FROM bets_eventmembership WHERE user_id = %(uid)s)
+         OR m.id IN (SELECT market_id FROM bets_marketshare WHERE user_id = %(uid)s))
+"""
+_EVENT_VISIBLE = """
+    AND (e.creator_id = %(uid)s
+         OR e.id IN (SELECT event_id FROM bets_eventmembership WHERE user_id = %(uid)s))
+"""
+
+# Markets have positive rowids and events negative ones, so "newest first" is
+# rowid DESC for markets and rowid ASC for events. FTS5 returns rows in that
+# order without sorting, and each branch stops after ``candidates`` visible
+# rows. Only those rows are scored and sorted. Snippets are cut in Python from
+# the page's own rows: FTS5's snippet() would re-run the MATCH for every row,
+# and prefixes longer than the indexed ones are slow to expand.
+_FTS_SQL = """
+    WITH hits AS (
+        SELECT * FROM (
+            SELECT s.rowid AS id, bm25(bets_search, 0.0, 10.0, 1.0) AS score
+            FROM bets_search s JOIN bets_market m ON m.id = s.rowid
+            WHERE bets_search MATCH %(match)s AND s.rowid > 0 {market_visible}
+            ORDER BY s.rowid DESC LIMIT %(candidates)s
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT s.rowid AS id, bm25(bets_search, 0.0, 10.0, 1.0) AS score
+            FROM bets_search s JOIN bets_event e ON e.id = -s.rowid
+            WHERE bets_search MATCH %(match)s AND s.rowid < 0 {event_visible}
+            ORDER BY s.rowid ASC LIMIT %(candidates)s
+        )
+    ),
+    page AS (
+        SELECT id, score FROM hits ORDER BY score, id DESC LIMIT %(limit)s OFFSET %(offset)s
+    )
+    SELECT s.kind, s.rowid, s.title, s.body, coalesce(m.status, '')
+    FROM page
+    JOIN bets_search s ON s.rowid = page.id
+    LEFT JOIN bets_market m ON m.id = page.id
+    ORDER BY page.score, page.id DESC
+"""
+
+
+def candidates() -> int:
+    return getattr(settings, 'SEARCH_CANDIDATES', 1000)
+
+
+def _fts_search(connection, user, query, limit, offset) -> list[Hit]:
+    sql = _FTS_SQL.format(
+        market_visible='' if user.is_superuser else _MARKET_VISIBLE,
+        event_visible='' if user.is_superuser else _EVENT_VISIBLE,
+    )
+    params = {'match': match_expression(query), 'uid': user.id, 'limit': limit, 'offset': offset,
+              'candidates': candidates()}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    terms = _terms(query)
+    return [
+        Hit(kind, abs(rowid), title, status, *snippet(title, body, terms))
+        for kind, rowid, title, body, status in rows
+    ]
+
+
+def _orm_search(user, query, limit, offset) -> list[Hit]:
+    terms = _TERM.findall(query)[:8]
+    market_q, event_q = Q(), Q()
+    for t in terms:
+        market_q &= Q(title__icontains=t) | Q(outcomes__title__icontains=t)
+        event_q &= Q(name__icontains=t) | Q(description__icontains=t)
+    markets = Market.objects.filter(market_q)
+    events = Event.objects.filter(event_q)
+    if not user.is_superuser:
+        my_events = EventMembership.objects.filter(user=user).values('event_id')
+        markets = markets.filter(
+            Q(creator=user) | Q(house=user) | Q(event_id__in=my_events)
+            | Q(id__in=MarketShare.objects.filter(user=user).values('market_id'))
+        )
+        events = events.filter(Q(creator=user) | Q(id__in=my_events))
+    hits = [Hit('market', m.id, m.title, m.status) for m in markets.distinct().order_by('-created_at')[:offset + limit]]
+    hits += [Hit('event', e.id, e.name) for e in events.distinct().order_by('-created_at')[:offset + limit]]
+    return hits[offset:offset + limit]
@@ -2,11 +2,23 @@
 from __future__ import annotations
 from decimal import Decimal, ROUND_HALF_UP
 import math
+from collections import defaultdict
+from dataclasses import dataclass, field
 from typing import Iterable
 
-from django.db import transaction
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
 from django.contrib.auth import get_user_model
-from .models import Wallet, Transaction, Market, Outcome, Wager, EventWallet, EventTransaction, EventMembership, MarketShare
+from . import activity, notifications, stats, usercache
+from .db import write_atomic
+from .money import Money, MoneyField
+from .models import (
+    Wallet, Transaction, Market, Outcome, Wager, EventWallet, EventTransaction, EventMembership, EventInvite,
+    MarketShare, MarketShareRequest, Friendship, UserLookup, MarketTemplate, MarketTemplateOutcome, Notification,
+    Parlay, ParlayLeg, Activity,
+)
 
 
 
@@ -72,6 +84,162 @@ def can_view_market(user, market):
     return False
 
 
+# --- User lookup -------------------------------------------------------------
+
+SUGGEST_LIMIT = 8
+
+def normalize_lookup(value: str) -> str:
+    return (value or '').strip().lower()
+
+
+def _prefix_range(field: str, prefix: str) -> Q:
+    # a >=/< range instead of LIKE so SQLite can walk the b-tree index
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + '\U0010ffff'})
+
+
+def find_user(query: str):
+    """Resolve a username or email (case-insensitive) in a single indexed query."""
+    q = normalize_lookup(query)
+    if not q:
+        return None
+    return (
+        User.objects
+        .filter(Q(lookup__username_lower=q) | Q(lookup__email_lower=q))
+        .order_by(
+            Case(When(lookup__username_lower=q, then=Value(0)), default=Value(1), output_field=IntegerField()),
+            'id',
+        )
+        .first()
+    )
+
+
+def suggest_users(user, prefix: str, limit: int = SUGGEST_LIMIT):
+    """Typeahead matches for ``prefix``: friends and event co-members first, then everyone else.
+
+    Only usernames are matched by prefix. An email matches only when ``prefix``
+    is the whole address, so the endpoint cannot be used to enumerate emails.
+    """
+    p = normalize_lookup(prefix)
+    if not p:
+        return []
+    match = _prefix_range('lookup__username_lower', p) | Q(lookup__email_lower=p)
+
+    friend_ids = Friendship.objects.filter(user=user).values('friend_id')
+    my_event_ids = EventMembership.objects.filter(user=user).values('event_id')
+    comember_ids = EventMembership.objects.filter(event_id__in=my_event_ids).values('user_id')
+
+    related = list(
+        User.objects.filter(match)
+        .filter(Q(id__in=friend_ids) | Q(id__in=comember_ids))
+        .exclude(id=user.id)
+        .order_by('lookup__username_lower')[:limit]
+    )
+    if len(related) >= limit:
+        return related
+
+    others = (
+        User.objects.filter(match)
+        .exclude(id=user.id)
+        .exclude(id__in=[u.id for u in related])
+        .order_by('lookup__username_lower')[:limit - len(related)]
+    )
+    return related + list(others)
+
+
+@write_atomic
+def rebuild_user_lookup() -> int:
+    """Rewrite every UserLookup row from the user table.
+
+    The post_save signal keeps single saves current, but ``bulk_create`` and
+    ``QuerySet.update`` on users bypass it; run this after such changes.
+    """
+    UserLookup.objects.all().delete()
+    rows = UserLookup.objects.bulk_create(
+        UserLookup(user_id=uid, username_lower=normalize_lookup(username), email_lower=normalize_lookup(email))
+        for uid, username, email in User.objects.values_list('id', 'username', 'email').iterator()
+    )
+    return len(rows)
+
+
+def find_users(queries: Iterable[str]) -> tuple[dict[str, int], list[str]]:
+    """Resolve many usernames/emails in one query: ({query: user_id}, [unmatched])."""
+    wanted = {normalize_lookup(q) for q in queries} - {''}
+    if not wanted:
+        return {}, []
+    rows = list(
+        UserLookup.objects.filter(Q(username_lower__in=wanted) | Q(email_lower__in=wanted))
+        .order_by('user_id').values_list('user_id', 'username_lower', 'email_lower')
+    )
+    found = {uname: uid for uid, uname, _ in rows if uname in wanted}
+    for uid, _, email in rows:  # like find_user, a username match wins over an email match
+        if email in wanted:
+            found.setdefault(email, uid)
+    return found, sorted(wanted - found.keys())
+
+
+# --- Bulk invites ------------------------------------------------------------
+
+def invite_candidates(user, source: str, queries: Iterable[str] = (), event=None) -> tuple[set[int], list[str]]:
+    """User ids to invite from ``source`` ('friends', 'list' or 'event') and any unmatched names."""
+    if source == 'friends':
+        return set(Friendship.objects.filter(user=user).values_list('friend_id', flat=True)), []
+    if source == 'event' and event is not None:
+        return set(EventMembership.objects.filter(event=event).values_list('user_id', flat=True)), []
+    matched, unknown = find_users(queries)
+    return set(matched.values()), unknown
+
+
+def bulk_invite_to_event(event, from_user, user_ids: Iterable[int]) -> dict:
+    """Invite ``user_ids`` to ``event``, skipping members and users with a pending invite.
+
+    Existing memberships and pending invites are read with one query each;
+    the rest are inserted with one ``bulk_create``.
+    """
+    ids = set(user_ids) - {from_user.id, event.creator_id}
+    members = set(EventMembership.objects.filter(event=event, user_id__in=ids).values_list('user_id', flat=True))
+    pending = set(
+        EventInvite.objects.filter(event=event, status=EventInvite.PENDING, to_user_id__in=ids - members)
+        .values_list('to_user_id', flat=True)
+    )
+    new = sorted(ids - members - pending)
+    EventInvite.objects.bulk_create(
+        [EventInvite(event=event, from_user=from_user, to_user_id=uid, seen=False) for uid in new],
+        ignore_conflicts=True,
+    )
+    usercache.invalidate(*new)  # bulk_create sends no post_save
+    notifications.notify(new, Notification.EVENT_INVITE, f"{from_user.username} invited you to {event.name}", reverse('bets:invites'))
+    return {'sent': len(new), 'members': len(members), 'pending': len(pending)}
+
+
+def bulk_share_market(market, from_user, user_ids: Iterable[int]) -> dict:
+    """Send share requests for ``market`` to ``user_ids``; same shape as ``bulk_invite_to_event``."""
+    ids = set(user_ids) - {from_user.id, market.creator_id, market.house_id}
+    members = set(MarketShare.objects.filter(market=market, user_id__in=ids).values_list('user_id', flat=True))
+    pending = set(
+        MarketShareRequest.objects.filter(market=market, status=MarketShareRequest.PENDING, to_user_id__in=ids - members)
+        .values_list('to_user_id', flat=True)
+    )
+    new = sorted(ids - members - pending)
+    MarketShareRequest.objects.bulk_create(
+        [MarketShareRequest(market=market, from_user=from_user, to_user_id=uid, seen=False) for uid in new],
+        ignore_conflicts=True,
+    )
+    usercache.invalidate(*new)
+    notifications.notify(new, Notification.MARKET_SHARE, f"{from_user.username} shared “{market.title}” with you", reverse('bets:invites'))
+    return {'sent': len(new), 'members': len(members), 'pending': len(pending)}
+
+
+@write_atomic
+def join_event(event, user, added_by=None) -> bool:
+    """Make ``user`` a member of ``event``; returns False if they already were."""
+    _, created = EventMembership.objects.get_or_create(
+        event=event, user=user, defaults={'role': EventMembership.MEMBER, 'added_by': added_by},
+    )
+    if created:
+        activity.record(Activity.JOINED, f"{user.username} joined", event_id=event.pk, user_id=user.id)
+    return created
+
+
 # --- Wallet & wagering -------------------------------------------------------
 
 def ensure_wallet(user):
@@ -82,19 +250,54 @@ def ensure_event_wallet(event):
     wallet, _ = EventWallet.objects.get_or_create(event=event)
     return wallet
 
-@transaction.atomic
-def deposit(user, amount: Decimal, note: str = ""):
+@write_atomic
+def deposit(user, amount, note: str = ""):
+    amount = Money.of(amount)
     wallet = ensure_wallet(user)
     wallet.balance += amount
     wallet.save(update_fields=['balance'])
     Transaction.objects.create(user=user, amount=amount, type=Transaction.DEPOSIT, note=note)
+    usercache.invalidate(user.id)
     return wallet.balance
 
-@transaction.atomic
-def place_wager(user, outcome: Outcome, stake: Decimal):
+@write_atomic
+def bulk_credit(user_ids: Iterable[int], amount, note: str = "") -> int:
+    """Credit ``amount`` to every user in ``user_ids``: three statements however many users.
+
+    Missing wallets are created first (ignoring ones that already exist), then
+    one UPDATE adds the amount to every balance and one bulk insert writes the
+    DEPOSIT rows.
+    """
+    amount = Money.of(amount)
+    if amount <= 0:
+        raise ValueError("Amount must be positive")
+    ids = sorted(set(user_ids))
+    if not ids:
+        return 0
+    Wallet.objects.bulk_create([Wallet(user_id=uid) for uid in ids], ignore_conflicts=True)
+    Wallet.objects.filter(user_id__in=ids).update(balance=F('balance') + Value(amount, output_field=MoneyField()))
+    Transaction.objects.bulk_create([
+        Transaction(user_id=uid, amount=amount, type=Transaction.DEPOSIT, note=note) for uid in ids
+    ])
+    usercache.invalidate(*ids)
+    return len(ids)
+
+
+def credit_event_members(event, amount, note: str = "") -> int:
+    """Bankroll every member of ``event`` with ``amount`` play money."""
+    ids = EventMembership.objects.filter(event=event).values_list('user_id', flat=True)
+    return bulk_credit(list(ids), amount, note=note or f"Bankroll for {event.name}")
+
+
+@write_atomic
+def place_wager(user, outcome: Outcome, stake):
+    stake = Money.of(stake)
     wallet = ensure_wallet(user)
     if stake <= 0:
         raise ValueError("Stake must be positive")
+    # re-read inside the write transaction so a concurrent void/settle is seen
+    if Market.objects.filter(pk=outcome.market_id).values_list('status', flat=True).first() != Market.OPEN:
+        raise ValueError("Market is not open")
     if wallet.balance < stake:
         raise ValueError("Insufficient balance")
 
@@ -103,31 +306,40 @@ def place_wager(user, outcome: Outcome, stake: Decimal):
         user=user, amount=-stake, type=Transaction.WAGER_STAKE,
         note=f"Stake on {outcome.market.title}: {outcome.title}"
     )
-    potential = (stake * outcome.decimal_odds).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+    potential = stake.times_odds(outcome.decimal_odds)
     w = Wager.objects.create(
         user=user, market=outcome.market, outcome=outcome,
         stake=stake, odds_at_placement=outcome.decimal_odds,
         potential_payout=potential,
     )
+    usercache.invalidate(user.id)
+    activity.record(Activity.WAGER, f"{user.username} bet {stake} on {outcome.title} in “{outcome.market.title}”",
+                    event_id=outcome.market.event_id, market_id=outcome.market_id, user_id=user.id)
     return w
 
-@transaction.atomic
+@write_atomic
 def settle_market(market: Market, winning_outcome: Outcome):
-    if market.status == Market.SETTLED:
+    status = Market.objects.filter(pk=market.pk).values_list('status', flat=True).first()
+    if status in (Market.SETTLED, Market.VOID):
         return
 
     # mark winner
-    for oc in market.outcomes.all():
+    outcomes = list(market.outcomes.all())
+    for oc in outcomes:
         oc.is_winner = (oc.id == winning_outcome.id)
         oc.save(update_fields=['is_winner'])
+    settle_parlay_legs(market, winning_outcome, outcomes)
 
-    total_staked = Decimal('0.00')
-    total_payout = Decimal('0.00')
+    total_staked = Money(0)
+    total_payout = Money(0)
+    results = defaultdict(stats.Result)
 
     for w in market.wagers.select_related('outcome').all():
         total_staked += w.stake
-        if w.outcome_id == winning_outcome.id:
-            payout = (w.stake * w.odds_at_placement).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+        won = w.outcome_id == winning_outcome.id
+        payout = w.stake.times_odds(w.odds_at_placement) if won else Money(0)
+        results[w.user_id].add(1, int(won), w.stake, payout)
+        if won:
             total_payout += payout
             wallet = ensure_wallet(w.user)
             wallet.balance += payout
@@ -143,7 +355,7 @@ def settle_market(market: Market, winning_outcome: Outcome):
 
     house_user = market.house
 
-    house_delta = (total_staked - total_payout).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+    house_delta = total_staked - total_payout
     if house_user and house_delta != 0:
         wallet = ensure_wallet(house_user)
         wallet.balance += house_delta
@@ -166,5 +378,330 @@ def settle_market(market: Market, winning_outcome: Outcome):
             note=f"Settlement: {market.title}",
         )
 
+    stats.record_settlement(market.event_id, results)
+    usercache.invalidate(house_user.id if house_user else None, *(uid for uid, r in results.items() if r.returned))
+    _notify_settlement(market, winning_outcome, results, house_delta)
+    activity.record(Activity.SETTLED, f"“{market.title}” settled on {winning_outcome.title}",
+                    event_id=market.event_id, market_id=market.pk)
+
     market.status = Market.SETTLED
-    market.save(update_fields=['status'])
+    market.settled_at = timezone.now()
+    market.save(update_fields=['status', 'settled_at'])
+
+
+@write_atomic
+def void_markets(market_ids, note: str = "") -> int:
+    """Void open/suspended markets and refund every PLACED stake.
+
+    Runs a fixed number of statements however many wagers are involved
+    (lock markets, aggregate stakes, one CASE update of the wallets, bulk insert
+    of refund rows, cancel wagers, mark markets). Markets that are already
+    settled or void are skipped, so repeating the call is a no-op.
+    """
+    rows = list(
+        Market.objects.filter(id__in=list(market_ids), status__in=[Market.OPEN, Market.SUSPENDED])
+        .values_list('id', 'title', 'event_id')
+    )
+    if not rows:
+        return 0
+    markets = {mid: title for mid, title, _ in rows}
+
+    placed = Wager.objects.filter(market_id__in=markets, status=Wager.PLACED)
+    refunds = list(placed.values('user_id', 'market_id').annotate(total=Sum('stake')).order_by())
+
+    per_user: dict[int, Money] = {}
+    for r in refunds:
+        per_user[r['user_id']] = per_user.get(r['user_id'], Money(0)) + r['total']
+
+    if per_user:
+        Wallet.objects.filter(user_id__in=per_user).update(balance=Case(
+            *[When(user_id=uid, then=F('balance') + Value(amt, output_field=MoneyField())) for uid, amt in per_user.items()],
+            default=F('balance'),
+            output_field=MoneyField(),
+        ))
+        Transaction.objects.bulk_create([
+            Transaction(
+                user_id=r['user_id'], amount=r['total'], type=Transaction.WAGER_REFUND,
+                note=note or f"Refund (void): {markets[r['market_id']]}",
+            )
+            for r in refunds
+        ])
+        placed.update(status=Wager.CANCELLED)
+        usercache.invalidate(*per_user)
+        _notify_void(markets, refunds, per_user)
+    void_parlay_legs(markets)
+    activity.record_many(
+        Activity(event_id=event_id, market_id=mid, kind=Activity.VOID, text=f"“{title}” was voided")
+        for mid, title, event_id in rows
+    )
+
+    Market.objects.filter(id__in=markets).update(status=Market.VOID, settled_at=timezone.now())
+    return len(markets)
+
+
+def _notify_settlement(market, winning_outcome, results, house_delta):
+    if not results:
+        return
+    texts = {}
+    for uid, r in results.items():
+        outcome = f"you won {r.returned}" if r.returned else f"you lost {r.staked}"
+        texts[uid] = f"“{market.title}” settled on {winning_outcome.title}: {outcome}"
+    if market.house_id and market.house_id not in texts:
+        texts[market.house_id] = f"Your market “{market.title}” settled on {winning_outcome.title}: house {house_delta:+}"
+    notifications.notify_each(texts, Notification.SETTLEMENT, reverse('bets:market_detail', args=[market.pk]))
+
+
+def _notify_void(markets: dict[int, str], refunds, per_user):
+    voided = defaultdict(list)
+    for r in refunds:
+        voided[r['user_id']].append(markets[r['market_id']])
+    notifications.notify_each({
+        uid: (f"“{titles[0]}” was voided" if len(titles) == 1 else f"{len(titles)} markets were voided")
+        + f": {per_user[uid]} refunded"
+        for uid, titles in voided.items()
+    }, Notification.VOID)
+
+
+def void_event(event, note: str = "") -> int:
+    """Void every open/suspended market of ``event`` (e.g. the tournament was cancelled)."""
+    return void_markets(event.markets.values_list('id', flat=True), note=note)
+
+
+# --- Parlays ------------------------------------------------------------------
+#
+# A parlay's legs are indexed by outcome, so settling or voiding a market reads
+# and updates only that market's legs, plus the parlays those legs decide:
+#
+# * a losing leg loses its parlay at once; the stake goes to the event treasury;
+# * a winning or void leg decrements the parlay's ``open_legs``; the parlay
+#   completes when that reaches zero. It pays stake x the product of its won
+#   legs' odds (void legs drop out, as at a bookmaker), or refunds the stake if
+#   every leg was void. The treasury pays the winnings.
+#
+# No statement scans parlays that have no leg in the market being settled.
+
+MAX_PARLAY_ODDS = Decimal('1000000')
+
+
+def combined_odds(odds: Iterable[Decimal]) -> Decimal:
+    return math.prod(odds, start=Decimal(1)).quantize(Decimal('0.001'), rounding=ROUND_HALF_UP)
+
+
+@write_atomic
+def place_parlay(user, outcomes: list[Outcome], stake) -> Parlay:
+    """Stake on every outcome in ``outcomes`` winning: one outcome per market, all open, all in one event."""
+    stake = Money.of(stake)
+    if stake <= 0:
+        raise ValueError("Stake must be positive")
+    max_legs = getattr(settings, 'PARLAY_MAX_LEGS', 8)
+    if not 2 <= len(outcomes) <= max_legs:
+        raise ValueError(f"A parlay needs between 2 and {max_legs} legs")
+    markets = list(Market.objects.filter(pk__in={oc.market_id for oc in outcomes}).values('id', 'title', 'status', 'event_id'))
+    if len(markets) != len(outcomes):
+        raise ValueError("A parlay can have only one leg per market")
+    if any(m['status'] != Market.OPEN for m in markets):
+        raise ValueError("Every market in a parlay must be open")
+    events = {m['event_id'] for m in markets}
+    if len(events) != 1 or None in events:
+        raise ValueError("Parlay legs must all be markets of the same event")
+    odds = combined_odds(oc.decimal_odds for oc in outcomes)
+    if odds > MAX_PARLAY_ODDS:
+        raise ValueError("Combined odds are too long")
+    wallet = ensure_wallet(user)
+    if wallet.balance < stake:
+        raise ValueError("Insufficient balance")
+
+    wallet.balance -= stake; wallet.save(update_fields=['balance'])
+    Transaction.objects.create(
+        user=user, amount=-stake, type=Transaction.WAGER_STAKE, note=f"Stake on {len(outcomes)}-leg parlay",
+    )
+    parlay = Parlay.objects.create(
+        user=user, event_id=events.pop(), stake=stake, odds_at_placement=odds,
+        potential_payout=stake.times_odds(odds), open_legs=len(outcomes),
+    )
+    titles = {m['id']: m['title'] for m in markets}
+    ParlayLeg.objects.bulk_create([
+        ParlayLeg(parlay=parlay, market_id=oc.market_id, outcome=oc, odds_at_placement=oc.decimal_odds,
+                  market_title=titles[oc.market_id], outcome_title=oc.title)
+        for oc in outcomes
+    ])
+    usercache.invalidate(user.id)
+    activity.record(Activity.WAGER, f"{user.username} placed a {len(outcomes)}-leg parlay at {odds}: {stake} to win {parlay.potential_payout}",
+                    event_id=parlay.event_id, user_id=user.id)
+    return parlay
+
+
+def settle_parlay_legs(market, winning_outcome, outcomes):
+    """Settle ``market``'s open parlay legs (called by ``settle_market``, inside its transaction)."""
+    legs = ParlayLeg.objects.filter(outcome__in=outcomes, status=ParlayLeg.OPEN)
+    decided = list(legs.values_list('parlay_id', 'outcome_id'))
+    if not decided:
+        return
+    won = [pid for pid, oc in decided if oc == winning_outcome.id]
+    lost = [pid for pid, oc in decided if oc != winning_outcome.id]
+    legs.filter(outcome=winning_outcome).update(status=ParlayLeg.WON)
+    legs.exclude(outcome=winning_outcome).update(status=ParlayLeg.LOST)
+
+    losing = Parlay.objects.filter(id__in=lost, status=Parlay.OPEN)
+    rows = list(losing.values_list('user_id', 'stake'))
+    if rows:
+        losing.update(status=Parlay.LOST, settled_at=timezone.now())
+        _move_treasury(market.event_id, sum((stake for _, stake in rows), Money(0)), f"Parlays lost: {market.title}")
+        notifications.notify({uid for uid, _ in rows}, Notification.SETTLEMENT,
+                             f"Your parlay lost on “{market.title}”", reverse('bets:event_detail', args=[market.event_id]))
+
+    Parlay.objects.filter(id__in=won, status=Parlay.OPEN).update(open_legs=F('open_legs') - 1)
+    _complete_parlays(won)
+
+
+def void_parlay_legs(market_ids):
+    """Drop the open legs of voided markets from their parlays (called by ``void_markets``)."""
+    legs = ParlayLeg.objects.filter(market_id__in=list(market_ids), status=ParlayLeg.OPEN)
+    per_parlay = defaultdict(int)
+    for pid in legs.values_list('parlay_id', flat=True):
+        per_parlay[pid] += 1
+    if not per_parlay:
+        return
+    legs.update(status=ParlayLeg.VOID)
+    by_count = defaultdict(list)
+    for pid, n in per_parlay.items():
+        by_count[n].append(pid)
+    for n, ids in by_count.items():
+        Parlay.objects.filter(id__in=ids, status=Parlay.OPEN).update(open_legs=F('open_legs') - n)
+    _complete_parlays(list(per_parlay))
+
+
+def _complete_parlays(parlay_ids):
+    """Pay out (or refund, if every leg was void) the parlays in ``parlay_ids`` that have no open legs left."""
+    done = list(Parlay.objects.filter(id__in=parlay_ids, status=Parlay.OPEN, open_legs=0))
+    if not done:
+        return
+    won_odds = defaultdict(list)
+    for pid, odds in ParlayLeg.objects.filter(parlay__in=done, status=ParlayLeg.WON).values_list('parlay_id', 'odds_at_placement'):
+        won_odds[pid].append(odds)
+
+    now = timezone.now()
+    per_user: dict[int, Money] = defaultdict(Money)
+    treasury: dict[int, Money] = defaultdict(Money)
+    txs, texts = [], defaultdict(list)
+    for p in done:
+        p.settled_at = now
+        if p.id in won_odds:
+            p.status, p.payout = Parlay.WON, p.stake.times_odds(combined_odds(won_odds[p.id]))
+            txs.append(Transaction(user_id=p.user_id, amount=p.payout, type=Transaction.WAGER_PAYOUT,
+                                   note=f"Win: {len(won_odds[p.id])}-leg parlay"))
+            treasury[p.event_id] += p.stake - p.payout
+            texts[p.user_id].append(f"Your parlay won {p.payout}")
+        else:
+            p.status, p.payout = Parlay.VOID, Money(0)
+            txs.append(Transaction(user_id=p.user_id, amount=p.stake, type=Transaction.WAGER_REFUND,
+                                   note="Refund (void): parlay"))
+            texts[p.user_id].append(f"Your parlay was voided: {p.stake} refunded")
+        per_user[p.user_id] += txs[-1].amount
+
+    Parlay.objects.bulk_update(done, ['status', 'payout', 'settled_at'])
+    Wallet.objects.filter(user_id__in=per_user).update(balance=Case(
+        *[When(user_id=uid, then=F('balance') + Value(amt, output_field=MoneyField())) for uid, amt in per_user.items()],
+        default=F('balance'),
+        output_field=MoneyField(),
+    ))
+    Transaction.objects.bulk_create(txs)
+    for event_id, delta in treasury.items():
+        _move_treasury(event_id, delta, "Parlays won")
+    usercache.invalidate(*per_user)
+    notifications.notify_each({uid: "; ".join(t) for uid, t in texts.items()}, Notification.SETTLEMENT)
+
+
+def _move_treasury(event_id, delta: Money, note: str):
+    if not delta:
+        return
+    ewallet, _ = EventWallet.objects.get_or_create(event_id=event_id)
+    ewallet.balance += delta
+    ewallet.save(update_fields=['balance'])
+    EventTransaction.objects.create(
+        event_id=event_id, amount=delta, note=note,
+        type=EventTransaction.TREASURY_CREDIT if delta > 0 else EventTransaction.TREASURY_DEBIT,
+    )
+
+
+# --- Templates and batch creation ---------------------------------------------
+
+@dataclass
+class MarketSpec:
+    title: str
+    house_margin: Decimal
+    max_bet_limit: Decimal
+    outcomes: list[tuple[str, int]] = field(default_factory=list)  # (title, slider weight)
+    house_id: int | None = None
+
+
+@write_atomic
+def create_markets(creator, specs: Iterable[MarketSpec], event=None, house=None, closes_at=None) -> list[Market]:
+    """Create many markets with their outcomes: two bulk inserts in one transaction.
+
+    ``house`` overrides every spec's own house. Odds are computed once per
+    distinct (weights, margin) pair, since a recurring slate repeats the same
+    few shapes.
+    """
+    specs = list(specs)
+    markets = Market.objects.bulk_create([
+        Market(
+            title=spec.title, creator=creator, event=event, closes_at=closes_at,
+            house_id=house.id if house is not None else spec.house_id,
+            house_margin=spec.house_margin, max_bet_limit=spec.max_bet_limit,
+        )
+        for spec in specs
+    ])
+
+    odds_cache: dict[tuple, OddsResult] = {}
+    outcomes = []
+    for mkt, spec in zip(markets, specs):
+        weights = tuple(max(0, min(100, w)) for _, w in spec.outcomes)
+        key = (weights, Decimal(spec.house_margin))
+        if key not in odds_cache:
+            odds_cache[key] = compute_odds(weights, key[1])
+        odds = odds_cache[key]
+        outcomes += [
+            Outcome(market=mkt, title=title, slider_weight=w,
+                    implied_probability=odds[i]['prob'], decimal_odds=odds[i]['odds'])
+            for i, ((title, _), w) in enumerate(zip(spec.outcomes, weights))
+        ]
+    Outcome.objects.bulk_create(outcomes)
+    return markets
+
+
+def _specs_from_markets(markets) -> list[MarketSpec]:
+    by_market = defaultdict(list)
+    for oc in Outcome.objects.filter(market__in=[m.id for m in markets]).order_by('id'):
+        by_market[oc.market_id].append((oc.title, oc.slider_weight))
+    return [
+        MarketSpec(m.title, m.house_margin, m.max_bet_limit, by_market[m.id], m.house_id)
+        for m in markets
+    ]
+
+
+def clone_event_markets(source, target, creator, house=None, closes_at=None) -> list[Market]:
+    """Copy every market of ``source`` (whatever its status) into ``target`` as new open markets."""
+    markets = list(source.markets.order_by('created_at', 'id'))
+    return create_markets(creator, _specs_from_markets(markets), event=target, house=house, closes_at=closes_at)
+
+
+def markets_from_templates(templates, creator, event=None, house=None, closes_at=None) -> list[Market]:
+    templates = list(templates.prefetch_related('outcomes'))
+    specs = [
+        MarketSpec(t.title, t.house_margin, t.max_bet_limit, [(o.title, o.slider_weight) for o in t.outcomes.all()])
+        for t in templates
+    ]
+    return create_markets(creator, specs, event=event, house=house, closes_at=closes_at)
+
+
+@write_atomic
+def save_as_template(market, owner) -> MarketTemplate:
+    template = MarketTemplate.objects.create(
+        owner=owner, title=market.title, house_margin=market.house_margin, max_bet_limit=market.max_bet_limit,
+    )
+    MarketTemplateOutcome.objects.bulk_create([
+        MarketTemplateOutcome(template=template, title=oc.title, slider_weight=oc.slider_weight)
+        for oc in market.outcomes.order_by('id')
+    ])
+    return template
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from . import backup, notifications, slowlog, usercache
+from .models import EventInvite, FriendshipRequest, MarketShareRequest, Notification, UserLookup, Wallet
+from .services import normalize_lookup
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def sync_user_lookup(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    UserLookup.objects.update_or_create(
+        user=instance,
+        defaults={
+            'username_lower': normalize_lookup(instance.username),
+            'email_lower': normalize_lookup(instance.email),
+        },
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_wallet(sender, instance, created, raw=False, **kwargs):
+    # eagerly, so read pages never need ensure_wallet's get_or_create
+    if created and not raw:
+        Wallet.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    usercache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=FriendshipRequest)
+@receiver(post_save, sender=EventInvite)
+@receiver(post_save, sender=MarketShareRequest)
+def invalidate_invite_count(sender, instance, **kwargs):
+    usercache.invalidate(instance.to_user_id)
+
+
+@receiver(post_save, sender=FriendshipRequest)
+@receiver(post_save, sender=EventInvite)
+@receiver(post_save, sender=MarketShareRequest)
+def queue_request_notification(sender, instance, created, raw=False, **kwargs):
+    # the bulk invite/share services queue their own: bulk_create sends no post_save
+    if not created or raw:
+        return
+    if sender is EventInvite:
+        kind, text = Notification.EVENT_INVITE, f"{instance.from_user.username} invited you to {instance.event.name}"
+    elif sender is MarketShareRequest:
+        kind, text = Notification.MARKET_SHARE, f"{instance.from_user.username} shared “{instance.market.title}” with you"
+    else:
+        kind, text = Notification.FRIEND_REQUEST, f"{instance.from_user.username} sent you a friend request"
+    notifications.notify([instance.to_user_id], kind, text, reverse('bets:invites'))
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or connection.alias == backup.VERIFY_ALIAS:
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@receiver(connection_created)
+def install_slow_query_log(sender, connection, **kwargs):
+    slowlog.install(connection)
@@ -0,0 +1,123 @@
+# bets/slowlog.py
+"""Slow-query log.
+
+When ``SLOW_QUERY_MS`` is set (it is off by default), every database connection gets an execute
+wrapper (installed on ``connection_created`` in bets.signals). The wrapper
+times each statement. Statements slower than the threshold are appended to
+``SLOW_QUERY_LOG`` as one JSON object per line, with:
+
+* the SQL and its parameters
+* the view and path that issued it (set by ``QueryContextMiddleware``)
+* the query plan, captured on the same connection straight away, so it
+  reflects the indexes and statistics that were in effect
+
+``manage.py slow_queries`` groups the log by ``fingerprint()`` (the SQL with
+literals and IN-lists normalised) and ranks the groups by total time.
+"""
+from __future__ import annotations
+import contextvars
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+
+current_view: contextvars.ContextVar[tuple[str, str] | None] = contextvars.ContextVar('bets_current_view', default=None)
+
+_write_lock = threading.Lock()
+_local = threading.local()  # .explaining guards against logging our own EXPLAIN
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.I)
+_SPACE = re.compile(r'\s+')
+
+
+def threshold_ms() -> float | None:
+    return getattr(settings, 'SLOW_QUERY_MS', None)
+
+
+def log_path() -> Path:
+    return Path(getattr(settings, 'SLOW_QUERY_LOG', Path(settings.BASE_DIR) / 'logs' / 'slow_queries.jsonl'))
+
+
+def normalize(sql: str) -> str:
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:16]
+
+
+def explain(connection, sql: str, params) -> list[str]:
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return []
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except Exception as e:  # the plan is best effort; never break the request over it
+        return [f'explain failed: {e}']
+    finally:
+        _local.explaining = False
+    if connection.vendor == 'sqlite':
+        depth = {0: -1}
+        lines = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node] + detail)
+        return lines
+    return [str(r[0]) for r in rows]
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    ms = (time.perf_counter() - start) * 1000
+    limit = threshold_ms()
+    if limit is not None and ms >= limit:
+        connection = context['connection']
+        view, path = current_view.get() or ('', '')
+        record(
+            alias=connection.alias, ms=round(ms, 3), sql=sql, params=repr(params)[:1000], many=many,
+            view=view, path=path, plan=[] if many else explain(connection, sql, params),
+        )
+    return result
+
+
+def record(**entry):
+    entry['ts'] = datetime.now(dt_timezone.utc).isoformat(timespec='seconds')
+    entry['fingerprint'] = fingerprint(entry['sql'])
+    path = log_path()
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a') as fh:
+            fh.write(json.dumps(entry) + '\n')
+
+
+def install(connection):
+    if threshold_ms() is not None and slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def read_log(path: Path | None = None):
+    path = path or log_path()
+    if not path.exists():
+        return
+    with open(path) as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
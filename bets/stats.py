@@ -0,0 +1,139 @@
+# bets/stats.py
+"""Per-user betting stats and leaderboards.
+
+Each user has one ``BettingStats`` row overall (``event`` null) and one per
+event they have bet in. ``settle_market`` adds each market's result to those
+rows through ``record_settlement``, so reading stats never aggregates wagers.
+
+Every board is an index range. ``(event, net, user)``, ``(event, roi, user)``
+and ``(event, win_rate, user)`` are indexed, so ``leaderboard`` reads the
+first K entries of the index. ``rank_of`` counts the entries above the user in
+the same index, without sorting or touching the table. ROI and win-rate
+boards only include users with at least ``LEADERBOARD_MIN_WAGERS`` settled
+wagers, so that a single lucky bet doesn't top them.
+
+``rebuild_stats`` recomputes every row from the settled wagers and the
+archived positions.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+
+from .db import write_atomic
+from .models import ArchivedPosition, BettingStats, Market, Wager
+from .money import Money
+
+METRICS = {'net': 'Net profit', 'roi': 'ROI', 'win_rate': 'Win rate'}
+
+
+def min_wagers() -> int:
+    return getattr(settings, 'LEADERBOARD_MIN_WAGERS', 5)
+
+
+@dataclass
+class Result:
+    wagers: int = 0
+    wins: int = 0
+    staked: Money = Money(0)
+    returned: Money = Money(0)
+
+    def add(self, wagers, wins, staked, returned):
+        self.wagers += wagers
+        self.wins += wins
+        self.staked += staked
+        self.returned += returned
+
+
+def record_settlement(event_id: int | None, results: dict[int, Result]):
+    """Add one settled market's per-user ``results`` to the overall and event rows."""
+    if not results:
+        return
+    keys = {(uid, None) for uid in results}
+    if event_id is not None:
+        keys |= {(uid, event_id) for uid in results}
+    scope = Q(event__isnull=True) | Q(event_id=event_id) if event_id is not None else Q(event__isnull=True)
+    existing = {(s.user_id, s.event_id): s for s in BettingStats.objects.filter(scope, user_id__in=results)}
+
+    new, changed = [], []
+    for uid, event in keys:
+        row = existing.get((uid, event))
+        if row is None:
+            row = BettingStats(user_id=uid, event_id=event)
+            new.append(row)
+        else:
+            changed.append(row)
+        r = results[uid]
+        row.add(r.wagers, r.wins, r.staked, r.returned)
+
+    BettingStats.objects.bulk_create(new)
+    BettingStats.objects.bulk_update(
+        changed, ['wagers', 'wins', 'staked', 'returned', 'net', 'roi', 'win_rate', 'updated_at'],
+    )
+
+
+def _board(event=None, metric: str = 'net'):
+    qs = BettingStats.objects.filter(event=event) if event is not None else BettingStats.objects.filter(event__isnull=True)
+    if metric != 'net':
+        qs = qs.filter(wagers__gte=min_wagers())
+    return qs
+
+
+def leaderboard(event=None, metric: str = 'net', limit: int = 25):
+    return list(
+        _board(event, metric).select_related('user').order_by(f'-{metric}', 'user_id')[:limit]
+    )
+
+
+def stats_for(user, event=None) -> BettingStats | None:
+    qs = BettingStats.objects.filter(user=user)
+    return qs.filter(event=event).first() if event is not None else qs.filter(event__isnull=True).first()
+
+
+def rank_of(user, event=None, metric: str = 'net') -> int | None:
+    """1-based rank of ``user`` on the board, ties sharing a rank; None if not on it."""
+    mine = stats_for(user, event)
+    if mine is None or (metric != 'net' and mine.wagers < min_wagers()):
+        return None
+    value = getattr(mine, metric)
+    return _board(event, metric).filter(**{f'{metric}__gt': value}).count() + 1
+
+
+# --- Rebuild -----------------------------------------------------------------
+
+@write_atomic
+def rebuild_stats() -> int:
+    totals: dict[tuple[int, int | None], Result] = defaultdict(Result)
+
+    def add(uid, event_id, *values):
+        totals[(uid, None)].add(*values)
+        if event_id is not None:
+            totals[(uid, event_id)].add(*values)
+
+    won = Q(outcome__is_winner=True)
+    live = (
+        Wager.objects.filter(market__status=Market.SETTLED)
+        .values('user_id', 'market__event_id')
+        .annotate(n=Count('id'), wins=Count('id', filter=won), staked=Sum('stake'), returned=Sum('potential_payout', filter=won))
+        .order_by()
+    )
+    for r in live:
+        add(r['user_id'], r['market__event_id'], r['n'], r['wins'], r['staked'], r['returned'] or Money(0))
+
+    archived = (
+        ArchivedPosition.objects.filter(market__winner_title__gt='')  # voided markets have no winner
+        .values_list('user_id', 'market__event_id', 'wagers', 'wins', 'staked', 'returned')
+    )
+    for uid, event_id, *values in archived:
+        add(uid, event_id, *values)
+
+    rows = []
+    for (uid, event_id), r in totals.items():
+        row = BettingStats(user_id=uid, event_id=event_id)
+        row.add(r.wagers, r.wins, r.staked, r.returned)
+        rows.append(row)
+    BettingStats.objects.all().delete()
+    BettingStats.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
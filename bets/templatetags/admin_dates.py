@@ -0,0 +1,80 @@
+from datetime import date, datetime
+
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.utils import timezone
+
+register = template.Library()
+
+
+def _next(d, kind):
+    if kind == 'year':
+        return d.replace(year=d.year + 1)
+    if kind == 'month':
+        return d.replace(year=d.year + d.month // 12, month=d.month % 12 + 1)
+    return d.fromordinal(d.toordinal() + 1)
+
+
+class _ProbedPeriods:
+    """Stands in for ``cl.queryset`` inside Django's ``date_hierarchy``.
+
+    Django lists the years/months/days that have rows with ``SELECT DISTINCT``
+    over a truncated date. That expression can't use an index and reads the
+    whole (filtered) table. Here the range comes from the first and last rows
+    in index order. Each candidate period is then checked with an indexed
+    ``EXISTS``, so there are at most 31 small queries below the year level.
+    """
+
+    def __init__(self, qs, field_name):
+        self._qs = qs
+        self._field = field_name
+
+    def aggregate(self, **kwargs):
+        # only called for the MIN/MAX of the hierarchy field; SQLite can't
+        # answer both from the index in one statement
+        return self._bounds(self._field)
+
+    def _bounds(self, field_name):
+        values = self._qs.exclude(**{f'{field_name}__isnull': True}).values_list(field_name, flat=True)
+        return {'first': values.order_by(field_name).first(), 'last': values.order_by(f'-{field_name}').first()}
+
+    def _periods(self, field_name, kind, aware):
+        bounds = self._bounds(field_name)
+        first, last = bounds['first'], bounds['last']
+        if first is None:
+            return []
+        if aware:
+            first, last = timezone.localtime(first), timezone.localtime(last)
+        cur = date(first.year, 1 if kind == 'year' else first.month, first.day if kind == 'day' else 1)
+        end = last.date() if isinstance(last, datetime) else last
+        found = []
+        while cur <= end:
+            nxt = _next(cur, kind)
+            lo, hi = cur, nxt
+            if aware:
+                lo = timezone.make_aware(datetime.combine(cur, datetime.min.time()))
+                hi = timezone.make_aware(datetime.combine(nxt, datetime.min.time()))
+            if self._qs.filter(**{f'{field_name}__gte': lo, f'{field_name}__lt': hi}).exists():
+                found.append(lo)
+            cur = nxt
+        return found
+
+    def dates(self, field_name, kind):
+        return self._periods(field_name, kind, aware=False)
+
+    def datetimes(self, field_name, kind):
+        return self._periods(field_name, kind, aware=timezone.is_aware(timezone.now()))
+
+
+class _ChangeListView:
+    def __init__(self, cl):
+        self._cl = cl
+        self.queryset = _ProbedPeriods(cl.queryset, cl.date_hierarchy)
+
+    def __getattr__(self, name):
+        return getattr(self._cl, name)
+
+
+@register.inclusion_tag('admin/date_hierarchy.html')
+def indexed_date_hierarchy(cl):
+    return date_hierarchy(_ChangeListView(cl))
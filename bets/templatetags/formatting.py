@@ -1,24 +1,29 @@
 from decimal import Decimal, ROUND_HALF_UP
 from django import template
 
+from ..money import Money
+
 register = template.Library()
 
 TWOP = Decimal('0.01')
 THREEP = Decimal('0.001')
+ODDS_THREEP_BELOW = Decimal('1.01')
 
 @register.filter
 def money(val):
     if val is None or val == '':
         return "0.00"
-    d = Decimal(val).quantize(TWOP, rounding=ROUND_HALF_UP)
-    return f"{d:.2f}"
+    if isinstance(val, Money):
+        return str(val)
+    d = val if isinstance(val, Decimal) else Decimal(val)
+    return f"{d.quantize(TWOP, rounding=ROUND_HALF_UP):.2f}"
 
 @register.filter
 def oddsfmt(val):
     if val is None or val == '':
         return ""
-    d = Decimal(val)
-    if d < Decimal('1.01'):
+    d = val if isinstance(val, Decimal) else Decimal(val)
+    if d < ODDS_THREEP_BELOW:
         d = d.quantize(THREEP, rounding=ROUND_HALF_UP)
         return f"{d:.3f}"
     d = d.quantize(TWOP, rounding=ROUND_HALF_UP)
@@ -34,6 +39,8 @@ def get_item(d, key):
 @register.filter
 def mul(a, b):
     try:
+        if isinstance(a, Money):
+            return a.times_odds(b)
         return Decimal(a) * Decimal(b)
     except Exception:
         return Decimal('0')
@@ -41,6 +48,15 @@ def mul(a, b):
 @register.filter
 def sub(a, b):
     try:
+        if isinstance(a, Money) or isinstance(b, Money):
+            return Money.of(a) - Money.of(b)
         return Decimal(a) - Decimal(b)
     except Exception:
         return Decimal('0')
+
+@register.filter
+def pct(val):
+    try:
+        return f"{float(val) * 100:.1f}%"
+    except (TypeError, ValueError):
+        return "—"
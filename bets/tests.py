@@ -0,0 +1,1194 @@
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import datetime, timedelta, timezone as dt_timezone
+from collections import defaultdict
+import gzip
+import importlib
+import itertools
+import json
+import random
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connections
+from django.db.utils import load_backend
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Activity, ArchivedMarket, BettingStats, Event, EventInvite, EventMembership, EventWallet, EventTransaction, Friendship, Market, MarketShare, MarketTemplate, Notification, Outcome, Parlay, RequestProfile, Transaction, Wager, Wallet
+from .admin import EstimatedCountPaginator
+from .checks import check_search_triggers
+from .db import immediate_atomic, serialized, write_atomic
+from .middleware import PIN_COOKIE, PrimaryPinMiddleware
+from .money import Money
+from .reconcile import check_range, chunks
+from . import reconcile
+from .netting import TREASURY, positions, settle_up
+from .profiling import artifact_path, top_functions
+from .notifications import drain
+from .risk import PERCENTILES, ParlayRisk, house_risk
+from .routers import ReplicaRouter, pinned_to_primary, read_from_replica, use_replica
+from .search import search
+from .slowlog import fingerprint, normalize, read_log
+from . import slowlog
+from . import activity, archive, backup
+from . import warmup
+from .templatetags.admin_dates import _ProbedPeriods
+from .stats import leaderboard, rank_of, rebuild_stats
+from .services import (
+    bulk_credit, bulk_invite_to_event, clone_event_markets, credit_event_members, compute_odds, deposit, find_user, find_users, invite_candidates, join_event, markets_from_templates,
+    place_parlay, place_wager, rebuild_user_lookup, save_as_template, settle_market, suggest_users, void_event, void_markets,
+)
+
+search_migration = importlib.import_module('bets.migrations.0009_search_fts')
+SEARCH_TRIGGERS = search_migration.TRIGGERS
+User = get_user_model()
+TWOPLACES = Decimal('0.01')
+
+
+def decimal_payout(stake: Decimal, odds: Decimal) -> Decimal:
+    # the pre-cents settlement formula
+    return (stake * odds).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+
+
+def all_odds():
+    weights = [[50, 50], [1, 99], [0, 100], [33, 33, 34], [10, 20, 30, 40], [1] * 12, [100, 1, 1], [97, 1, 1, 1]]
+    margins = [Decimal('0'), Decimal('0.05'), Decimal('0.1'), Decimal('0.2'), Decimal('0.9999')]
+    odds = {Decimal('1.001'), Decimal('1.005'), Decimal('1.999'), Decimal('999.990')}
+    for ws in weights:
+        for m in margins:
+            odds.update(r['odds'] for r in compute_odds(ws, m).values())
+    return sorted(odds)
+
+
+class MoneyPayoutTests(SimpleTestCase):
+    def test_times_odds_matches_decimal_for_every_cent_up_to_100(self):
+        for odds in all_odds():
+            for cents in range(1, 10001):
+                stake = Decimal(cents).scaleb(-2)
+                self.assertEqual(
+                    Money(cents).times_odds(odds).to_decimal(), decimal_payout(stake, odds),
+                    f"stake={stake} odds={odds}",
+                )
+
+    def test_times_odds_matches_decimal_for_large_random_stakes(self):
+        rng = random.Random(31)
+        odds = all_odds()
+        for _ in range(50000):
+            stake = Decimal(rng.randint(1, 99999999999)).scaleb(-2)
+            o = rng.choice(odds)
+            self.assertEqual(Money.of(stake).times_odds(o).to_decimal(), decimal_payout(stake, o))
+
+    def test_of_rounds_half_up_like_quantize(self):
+        for raw in ['0.005', '0.015', '2.675', '-0.005', '-2.675', '12.344', '1e3', '7']:
+            d = Decimal(raw)
+            self.assertEqual(Money.of(d).to_decimal(), d.quantize(TWOPLACES, rounding=ROUND_HALF_UP))
+
+    def test_arithmetic_and_display(self):
+        self.assertEqual(str(Money.of('12.30') - Money.of('20')), '-7.70')
+        self.assertEqual(sum([Money.of('0.10')] * 3, Money(0)), Money.of('0.30'))
+        self.assertTrue(Money.of('1.00') > 0)
+        self.assertEqual(f"{Money(123456):.2f}", '1234.56')
+
+
+class CentsMigrationTests(SimpleTestCase):
+    def test_to_cents_matches_quantize(self):
+        to_cents = importlib.import_module('bets.migrations.0004_integer_cents')._to_cents
+        for raw in ['0.00', '0.01', '99.99', '-12.34', '1234567890.12', '0.005']:
+            d = Decimal(raw).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+            self.assertEqual(Decimal(to_cents(raw)).scaleb(-2), d)
+
+
+class SettlementCentsTests(TestCase):
+    def test_settle_market_pays_decimal_results_to_the_cent(self):
+        house = User.objects.create(username='house')
+        rng = random.Random(7)
+        for weights in ([50, 50], [1, 99], [10, 20, 30, 40], [1] * 8):
+            market = Market.objects.create(title=f'm{weights}', creator=house, house=house, house_margin=Decimal('0.07'))
+            odds = compute_odds(weights, market.house_margin)
+            outcomes = [
+                Outcome.objects.create(market=market, title=str(i), slider_weight=w,
+                                       implied_probability=odds[i]['prob'], decimal_odds=odds[i]['odds'])
+                for i, w in enumerate(weights)
+            ]
+
+            expected_balance, expected_house = {}, Decimal('0.00')
+            for n in range(40):
+                bettor, created = User.objects.get_or_create(username=f'bettor{n}')
+                if created:
+                    deposit(bettor, Decimal('100000.00'))
+                stake = Decimal(rng.randint(1, 500000)).scaleb(-2)
+                oc = outcomes[rng.randrange(len(outcomes))]
+                w = place_wager(bettor, oc, stake)
+                self.assertEqual(w.potential_payout.to_decimal(), decimal_payout(stake, oc.decimal_odds))
+                expected_balance.setdefault(bettor.id, Wallet.objects.get(user=bettor).balance.to_decimal())
+                expected_house += stake
+
+            winner = outcomes[0]
+            for w in market.wagers.all():
+                if w.outcome_id == winner.id:
+                    payout = decimal_payout(w.stake.to_decimal(), w.odds_at_placement)
+                    expected_balance[w.user_id] += payout
+                    expected_house -= payout
+
+            house_before = Wallet.objects.get(user=house).balance.to_decimal() if Wallet.objects.filter(user=house).exists() else Decimal('0')
+            settle_market(market, winner)
+
+            for uid, bal in expected_balance.items():
+                self.assertEqual(Wallet.objects.get(user_id=uid).balance.to_decimal(), bal)
+            self.assertEqual(Wallet.objects.get(user=house).balance.to_decimal(), house_before + expected_house)
+
+        for wallet in Wallet.objects.all():
+            ledger = sum((t.amount for t in Transaction.objects.filter(user=wallet.user)), Money(0))
+            self.assertEqual(ledger, wallet.balance)
+
+
+class VoidMarketTests(TestCase):
+    def test_void_event_refunds_every_placed_stake_once(self):
+        house = User.objects.create(username='house')
+        event = Event.objects.create(name='cup', creator=house)
+        outcomes = []
+        for i in range(3):
+            market = Market.objects.create(title=f'm{i}', creator=house, house=house, event=event)
+            outcomes += [Outcome.objects.create(market=market, title=t, decimal_odds=Decimal('1.900')) for t in 'ab']
+        bettors = [User.objects.create(username=f'b{i}') for i in range(5)]
+        for b in bettors:
+            deposit(b, Decimal('100.00'))
+            for oc in outcomes:
+                place_wager(b, oc, Decimal('1.37'))
+
+        with self.assertNumQueries(13):  # includes the outbox insert, the parlay-leg read and the activity insert + trim probe
+            self.assertEqual(void_event(event), 3)
+        self.assertEqual(void_event(event), 0)
+        settle_market(outcomes[0].market, outcomes[0])
+
+        for b in bettors:
+            self.assertEqual(Wallet.objects.get(user=b).balance, Money.of(100))
+            self.assertEqual(Transaction.objects.filter(user=b, type=Transaction.WAGER_REFUND).count(), 3)
+        self.assertFalse(Wager.objects.filter(status=Wager.PLACED).exists())
+        self.assertFalse(Market.objects.exclude(status=Market.VOID).exists())
+        with self.assertRaises(ValueError):
+            place_wager(bettors[0], outcomes[0], Decimal('1.00'))
+
+
+class ReconcileTests(TestCase):
+    def test_check_range_reports_only_mismatched_wallets(self):
+        users = [User.objects.create(username=f'u{i}') for i in range(6)]
+        for u in users:
+            deposit(u, Decimal('10.00'))
+        Wallet.objects.filter(user=users[2]).update(balance=Money(1))
+        Transaction.objects.create(user=users[4], amount=Money(-5), type=Transaction.WITHDRAW)
+
+        found, checked = [], 0
+        for lo, hi in chunks('wallets', 2):
+            n, bad = check_range('wallets', lo, hi)
+            checked += n
+            found += bad
+        self.assertEqual(checked, 6)
+        self.assertEqual(sorted((d.owner_id, d.difference) for d in found),
+                         [(users[2].id, Money(1) - Money.of(10)), (users[4].id, Money(5))])
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.enterContext(override_settings(ARCHIVE_DIR=self.dir))
+        cache.clear()  # cached users from earlier tests share these ids
+
+    def snapshot(self, event, markets, bettor):
+        """What users and the checks see of ``markets``: detail pages, history results, positions, reconcile."""
+        self.client.force_login(event.creator)
+        pages = [re.search(r'Total staked: .*?</p>', self.client.get(f'/markets/{m.pk}/').content.decode()).group()
+                 for m in markets]
+        self.client.force_login(bettor)
+        results = (re.search(r'href="/markets/(\d+)/".*Your result:</em> <strong>([^<]+)<', li, re.S)
+                   for li in self.client.get('/markets/history/').content.decode().split('<li>'))
+        history = dict(r.groups() for r in results if r)
+        bad = [d for kind in reconcile.LEDGERS for lo, hi in chunks(kind, 100) for d in check_range(kind, lo, hi)[1]]
+        return pages, history, positions(event), bad
+
+    def test_archived_markets_and_ledger_read_the_same_as_before(self):
+        house = User.objects.create(username='house')
+        event = Event.objects.create(name='cup', creator=house)
+        a, b = User.objects.create(username='a'), User.objects.create(username='b')
+        for u in (a, b):
+            EventMembership.objects.create(event=event, user=u)
+            deposit(u, Decimal('100.00'))
+        markets, outcomes = [], []
+        for i, h in enumerate((house, None, house)):  # the middle one is backed by the treasury
+            markets.append(Market.objects.create(title=f'm{i}', creator=house, house=h, event=event))
+            outcomes.append([Outcome.objects.create(market=markets[-1], title=t, decimal_odds=Decimal('1.900')) for t in ('yes', 'no')])
+        for i in range(2):
+            place_wager(a, outcomes[i][0], Decimal('3.33'))
+            place_wager(b, outcomes[i][1], Decimal('5.00'))
+        place_parlay(a, [outcomes[0][0], outcomes[2][0]], Decimal('2.00'))
+        open_parlay = place_parlay(b, [outcomes[1][0], outcomes[2][1]], Decimal('1.00'))
+        for i in range(2):
+            settle_market(markets[i], outcomes[i][0])
+        before = self.snapshot(event, markets[:2], a)
+        self.assertEqual(before[3], [])
+
+        later = timezone.now() + timedelta(seconds=1)
+        self.assertEqual(archive.archive_settled_markets(older_than=later), 0)  # legs of parlays still open on m2
+        settle_market(markets[2], outcomes[2][1])  # a's parlay loses, b's wins
+        open_parlay.refresh_from_db()
+        self.assertEqual(open_parlay.status, Parlay.WON)
+        before = self.snapshot(event, markets[:2], a)
+
+        self.assertEqual(archive.archive_settled_markets(older_than=later), 3)
+        self.assertFalse(Market.objects.filter(event=event).exists())
+        self.assertEqual(ArchivedMarket.objects.filter(event=event).count(), 3)
+        moved = archive.archive_ledger(older_than=later)
+        self.assertEqual(moved['event_transactions'], EventTransaction.objects.filter(event=event).count() + 2)
+        self.assertFalse(Transaction.objects.exclude(type=Transaction.ARCHIVE_SUMMARY).exists())
+        self.assertEqual(len(list(archive.iter_archived_ledger())), moved['transactions'])
+
+        self.assertEqual(self.snapshot(event, markets[:2], a), before)
+        self.assertEqual(sorted(w['stake'] for w in archive.load_archived_market(markets[0].pk)['wagers']), ['3.33', '5.00'])
+        legs = {(leg.market_title, leg.outcome_title, leg.status) for leg in open_parlay.legs.all()}
+        self.assertEqual(legs, {('m1', 'yes', 'WON'), ('m2', 'no', 'WON')})
+        self.client.force_login(b)
+        self.assertContains(self.client.get(f'/events/{event.pk}/'), 'm2: no (won)')
+
+
+class RiskTests(TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.house = User.objects.create(username='house')
+        bettors = [User.objects.create(username=f'b{i}') for i in range(4)]
+        for b in bettors:
+            deposit(b, Decimal('1000.00'))
+        self.book = []  # per market: [(probability weight, house P&L in cents if it wins)]
+        for i, n in enumerate((2, 3, 2, 4, 3)):
+            market = Market.objects.create(title=f'm{i}', creator=self.house, house=self.house)
+            outcomes = [Outcome.objects.create(market=market, title=f'o{j}', implied_probability=Decimal(rng.randint(5, 60)) / 100,
+                                               decimal_odds=Decimal(rng.randint(1100, 6000)) / 1000) for j in range(n)]
+            for _ in range(6):
+                place_wager(rng.choice(bettors), rng.choice(outcomes), Decimal(rng.randint(100, 5000)) / 100)
+            wagers = list(Wager.objects.filter(market=market))
+            staked = sum(w.stake.cents for w in wagers)
+            self.book.append([
+                (float(oc.implied_probability), staked - sum(w.potential_payout.cents for w in wagers if w.outcome_id == oc.id))
+                for oc in outcomes
+            ])
+
+    def brute_force(self):
+        """Every combination of winners, with its probability: the distribution house_risk summarises."""
+        totals = defaultdict(float)
+        for combo in itertools.product(*self.book):
+            p = 1.0
+            for (weight, _), market in zip(combo, self.book):
+                p *= weight / sum(w for w, _ in market)
+            totals[sum(pnl for _, pnl in combo)] += p
+        return totals
+
+    def percentile(self, totals, q):
+        cum = 0.0
+        for value in sorted(totals):
+            cum += totals[value]
+            if cum >= q / 100 - 1e-12:
+                return value
+
+    def test_exact_report_matches_enumerating_every_outcome(self):
+        totals = self.brute_force()
+        report = house_risk(house=self.house)
+        self.assertEqual(report.method, 'exact')
+        self.assertEqual((report.wagers, report.staked), (30, sum(Wager.objects.values_list('stake', flat=True), Money(0))))
+        self.assertEqual(report.worst_case.cents, min(totals))
+        self.assertEqual(report.best_case.cents, max(totals))
+        self.assertAlmostEqual(report.expected.cents, sum(v * p for v, p in totals.items()), delta=len(self.book))
+        self.assertEqual({q: m.cents for q, m in report.percentiles.items()}, {q: self.percentile(totals, q) for q in PERCENTILES})
+
+    def test_monte_carlo_percentiles_are_within_tolerance(self):
+        totals = self.brute_force()
+        with mock.patch('bets.risk.EXACT_SUPPORT_LIMIT', 10):
+            report = house_risk(house=self.house, samples=100_000, seed=1)
+        self.assertEqual(report.method, 'monte_carlo')
+        self.assertEqual((report.worst_case.cents, report.best_case.cents), (min(totals), max(totals)))  # exact either way
+        for q in PERCENTILES:
+            # the sampled value's exact CDF rank lies within 1.5 points of q
+            rank = sum(p for v, p in totals.items() if v <= report.percentiles[q].cents)
+            below = rank - totals[report.percentiles[q].cents]
+            self.assertLessEqual(below, q / 100 + 0.015, q)
+            self.assertGreaterEqual(rank, q / 100 - 0.015, q)
+
+
+class SlowQueryLogTests(TestCase):
+    def test_fingerprint_ignores_literals_and_in_list_length(self):
+        a = fingerprint("SELECT * FROM bets_market WHERE id IN (?, ?, ?) AND title = 'a' LIMIT 21")
+        b = fingerprint("SELECT  *  FROM bets_market WHERE id IN (?) AND title = 'it''s' LIMIT 5")
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, fingerprint("SELECT * FROM bets_market WHERE id IN (?) AND status = 'a' LIMIT 5"))
+        self.assertEqual(normalize("UPDATE t SET x = %s WHERE id = 42"), "UPDATE t SET x = ? WHERE id = ?")
+
+    def test_slow_statement_is_logged_with_its_plan(self):
+        path = Path(tempfile.mkdtemp()) / 'slow.jsonl'
+        self.addCleanup(shutil.rmtree, path.parent, ignore_errors=True)
+        connection = connections['default']
+        with override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_LOG=path):
+            slowlog.install(connection)
+            try:
+                Market.objects.filter(status=Market.OPEN).count()
+            finally:
+                connection.execute_wrappers.remove(slowlog.slow_query_wrapper)
+        entry, = [e for e in read_log(path) if 'bets_market' in e['sql']]
+        self.assertEqual((entry['alias'], entry['fingerprint']), ('default', fingerprint(entry['sql'])))
+        self.assertTrue(any('bets_market' in line for line in entry['plan']), entry['plan'])
+        self.assertFalse([e for e in read_log(path) if 'EXPLAIN' in e['sql']])
+
+
+class UserLookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username='me')
+        self.alice = User.objects.create(username='Alice', email='ALICE@example.com')
+        self.alina = User.objects.create(username='alina', email='x@example.com')
+        self.bob = User.objects.create(username='bob', email='alice')
+
+    def test_find_user_is_case_insensitive_and_prefers_usernames(self):
+        self.assertEqual(find_user('  ALICE '), self.alice)
+        self.assertEqual(find_user('alice@EXAMPLE.com'), self.alice)
+        self.assertEqual(find_user('x@example.com'), self.alina)
+        self.assertIsNone(find_user('ali'))
+        self.assertIsNone(find_user(''))
+
+    def test_suggest_users_matches_username_prefixes_and_whole_emails_only(self):
+        Friendship.objects.create(user=self.me, friend=self.alina)
+        self.assertEqual(suggest_users(self.me, 'AL'), [self.alina, self.alice])
+        self.assertEqual(suggest_users(self.me, 'x@'), [])
+        self.assertEqual(suggest_users(self.me, 'x@example.com'), [self.alina])
+        self.assertEqual(suggest_users(self.me, 'me'), [])
+        self.assertEqual(suggest_users(self.me, 'al', limit=1), [self.alina])
+
+    def test_suggest_endpoint(self):
+        url = reverse('bets:user_suggest')
+        self.assertEqual(self.client.get(url, {'q': 'al'}).status_code, 302)
+        self.client.force_login(self.me)
+        body = self.client.get(url, {'q': 'al'}).json()
+        self.assertEqual([r['username'] for r in body['results']], ['Alice', 'alina'])
+        self.assertEqual(self.client.get(url, {'q': 'alice@'}).json(), {'results': []})
+
+    def test_rebuild_user_lookup_catches_up_after_bulk_writes(self):
+        User.objects.bulk_create([User(username='Zed', email='Z@example.com')])
+        User.objects.filter(pk=self.bob.pk).update(username='Robert')
+        self.assertIsNone(find_user('zed'))
+        self.assertEqual(rebuild_user_lookup(), User.objects.count())
+        self.assertEqual(find_user('z@example.com').username, 'Zed')
+        self.assertEqual(find_user('robert'), self.bob)
+        self.assertIsNone(find_user('bob'))
+
+
+class BulkInviteTests(TestCase):
+    def test_bulk_invite_skips_members_and_pending_in_constant_queries(self):
+        me = User.objects.create(username='me')
+        friends = [User.objects.create(username=f'f{i}', email=f'f{i}@example.com') for i in range(30)]
+        Friendship.objects.bulk_create([Friendship(user=me, friend=f) for f in friends])
+        event = Event.objects.create(name='cup', creator=me)
+        EventMembership.objects.create(event=event, user=friends[0])
+        EventInvite.objects.create(event=event, from_user=me, to_user=friends[1])
+
+        ids, _ = invite_candidates(me, 'friends')
+        with self.assertNumQueries(4):  # includes the one outbox insert
+            result = bulk_invite_to_event(event, me, ids)
+        self.assertEqual(result, {'sent': 28, 'members': 1, 'pending': 1})
+        self.assertEqual(bulk_invite_to_event(event, me, ids)['sent'], 0)
+        self.assertEqual(EventInvite.objects.filter(event=event, status=EventInvite.PENDING).count(), 29)
+
+    def test_event_admins_and_superusers_may_bulk_invite(self):
+        owner = User.objects.create(username='owner')
+        root = User.objects.create_superuser('root', password='pw')
+        stranger = User.objects.create(username='stranger')
+        guest = User.objects.create(username='guest')
+        event = Event.objects.create(name='cup', creator=owner)
+        url = reverse('bets:event_bulk_invite', args=[event.pk])
+
+        self.client.force_login(stranger)
+        self.client.post(url, {'source': 'list', 'people': 'guest'})
+        self.assertFalse(EventInvite.objects.exists())
+
+        self.client.force_login(root)
+        self.client.post(url, {'source': 'list', 'people': 'guest'})
+        self.assertEqual(list(EventInvite.objects.values_list('to_user', 'from_user')), [(guest.id, root.id)])
+
+    def test_find_users_matches_usernames_and_emails_in_one_query(self):
+        a = User.objects.create(username='Alice', email='al@example.com')
+        b = User.objects.create(username='bob', email='alice')
+        with self.assertNumQueries(1):
+            found, unknown = find_users(['alice', 'AL@example.com', 'bob', 'zed'])
+        self.assertEqual(found, {'alice': a.id, 'al@example.com': a.id, 'bob': b.id})
+        self.assertEqual(unknown, ['zed'])
+
+
+class BettingStatsTests(TestCase):
+    def _snapshot(self):
+        return sorted(
+            BettingStats.objects.values_list('user_id', 'event_id', 'wagers', 'wins', 'staked', 'returned', 'net'),
+            key=lambda r: (r[0], r[1] or 0),
+        )
+
+    def test_settlement_updates_match_a_rebuild(self):
+        rng = random.Random(40)
+        house = User.objects.create(username='house')
+        event = Event.objects.create(name='cup', creator=house)
+        bettors = [User.objects.create(username=f'b{i}') for i in range(8)]
+        for b in bettors:
+            deposit(b, Decimal('1000.00'))
+        for n in range(6):
+            market = Market.objects.create(title=f'm{n}', creator=house, house=house, event=event if n % 2 else None)
+            outcomes = [Outcome.objects.create(market=market, title=t, decimal_odds=Decimal('2.150')) for t in 'abc']
+            for b in bettors:
+                for _ in range(rng.randint(0, 3)):
+                    place_wager(b, rng.choice(outcomes), Decimal(rng.randint(100, 5000)).scaleb(-2))
+            settle_market(market, rng.choice(outcomes))
+
+        incremental = self._snapshot()
+        self.assertTrue(incremental)
+        rebuild_stats()
+        self.assertEqual(self._snapshot(), incremental)
+
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir, ignore_errors=True)
+        with override_settings(ARCHIVE_DIR=archive_dir):
+            self.assertEqual(archive.archive_settled_markets(older_than=timezone.now() + timedelta(days=1)), 6)
+        rebuild_stats()  # from the stored per-position counts alone
+        self.assertEqual(self._snapshot(), incremental)
+
+        top = leaderboard(metric='net', limit=3)
+        self.assertEqual(rank_of(top[0].user), 1)
+        nets = [s.net for s in leaderboard(limit=100)]
+        self.assertEqual(nets, sorted(nets, reverse=True))
+        for s in BettingStats.objects.filter(event__isnull=True):
+            self.assertEqual(s.net, Wallet.objects.get(user=s.user).balance - Money.of(1000))
+
+
+class SearchTests(TestCase):
+    def test_index_follows_writes_and_respects_visibility(self):
+        owner = User.objects.create(username='owner')
+        guest = User.objects.create(username='guest')
+        event = Event.objects.create(name='Office Cup', description='Five-a-side on Fridays', creator=owner)
+        shared = Market.objects.create(title='Who scores first?', creator=owner, house=owner, event=event)
+        Outcome.objects.create(market=shared, title='Zlatan')
+        private = Market.objects.create(title='Who scores last?', creator=owner, house=owner)
+
+        def found(user, q):
+            return [(h.kind, h.id) for h in search(user, q)[0]]
+
+        self.assertEqual(set(found(owner, 'scor')), {('market', shared.id), ('market', private.id)})
+        self.assertEqual(found(owner, 'zlat'), [('market', shared.id)])
+        self.assertEqual(found(owner, 'fridays'), [('event', event.id)])
+        self.assertEqual(found(guest, 'scores'), [])
+
+        EventMembership.objects.create(event=event, user=guest)
+        self.assertEqual(found(guest, 'scores'), [('market', shared.id)])
+        MarketShare.objects.create(market=private, user=guest)
+        self.assertEqual(len(found(guest, 'scores')), 2)
+
+        Outcome.objects.filter(market=shared).update(title='Ibrahimovic')
+        self.assertEqual(found(owner, 'zlatan'), [])
+        self.assertEqual(found(owner, 'ibra'), [('market', shared.id)])
+        Market.objects.filter(pk=private.pk).update(title='Who gets booked?')
+        self.assertEqual(found(owner, 'booked'), [('market', private.id)])
+        private.delete()
+        self.assertEqual(found(owner, 'booked'), [])
+
+    def test_title_matches_rank_first_and_pages(self):
+        owner = User.objects.create(username='owner')
+        body_hit = Market.objects.create(title='Match result', creator=owner, house=owner)
+        Outcome.objects.create(market=body_hit, title='Derby draw')
+        title_hit = Market.objects.create(title='Derby winner', creator=owner, house=owner)
+        hits, has_next = search(owner, 'derby', page_size=1)
+        self.assertEqual((hits[0].id, has_next), (title_hit.id, True))
+        hits, has_next = search(owner, 'derby', page=2, page_size=1)
+        self.assertEqual((hits[0].id, has_next), (body_hit.id, False))
+        hits = search(owner, 'derby')[0]
+        self.assertEqual(hits[0].title_html, '<mark>Derby</mark> winner')
+        self.assertEqual((hits[1].title_html, hits[1].excerpt_html), ('Match result', '<mark>Derby</mark> draw'))
+        self.assertEqual(search(owner, '"*()'), ([], False))
+
+
+@contextmanager
+def replica(alias='replica1'):
+    """A second connection to the test database that the router treats as the only replica.
+
+    Not added to DATABASES, so a TransactionTestCase may query it; it sees committed rows.
+    """
+    config = dict(connections['default'].settings_dict)
+    connections[alias] = load_backend(config['ENGINE']).DatabaseWrapper(config, alias)
+    try:
+        with mock.patch('bets.routers.replica_aliases', return_value=[alias]):
+            yield connections[alias]
+    finally:
+        connections[alias].close()
+        del connections[alias]
+
+
+class WriteTransactionTests(TransactionTestCase):
+    def test_outermost_write_begins_immediate_and_nested_ones_run_inline(self):
+        conn = connections['default']
+        with CaptureQueriesContext(conn) as outer:
+            with immediate_atomic():
+                with CaptureQueriesContext(conn) as inner, immediate_atomic():
+                    User.objects.create(username='a')
+        begins = [q['sql'] for q in outer.captured_queries if q['sql'].startswith('BEGIN')]
+        self.assertEqual(begins, ['BEGIN IMMEDIATE'])
+        self.assertFalse([q for q in inner.captured_queries if q['sql'].startswith('BEGIN')])
+        self.assertIn('SAVEPOINT', inner.captured_queries[0]['sql'])
+        self.assertIsNone(conn.transaction_mode)
+        self.assertTrue(User.objects.filter(username='a').exists())
+
+    def test_write_atomic_rolls_back_on_error(self):
+        @write_atomic
+        def fail():
+            User.objects.create(username='a')
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertFalse(User.objects.exists())
+
+
+class WriterLaneTests(SimpleTestCase):
+    @staticmethod
+    @serialized
+    def where():
+        return threading.current_thread().name
+
+    def test_calls_run_inline_unless_serialized_writes_is_on(self):
+        self.assertEqual(self.where(), threading.current_thread().name)
+        with override_settings(BETS_SERIALIZED_WRITES=True):
+            self.assertTrue(self.where().startswith('bets-writer'))
+
+    @override_settings(BETS_SERIALIZED_WRITES=True)
+    def test_lane_propagates_exceptions_and_runs_nested_calls_inline(self):
+        @serialized
+        def outer():
+            return threading.current_thread().name, self.where()
+
+        lane, nested = outer()
+        self.assertEqual(lane, nested)
+
+        @serialized
+        def fail():
+            raise ValueError(threading.current_thread().name)
+
+        with self.assertRaisesRegex(ValueError, '^bets-writer'):
+            fail()
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser('admin', password='pw')
+        start = timezone.make_aware(datetime(2023, 11, 20, 12))
+        Transaction.objects.bulk_create(
+            Transaction(user=self.user, type=Transaction.DEPOSIT, amount=Money(100), created_at=start + timedelta(days=9 * i))
+            for i in range(30)
+        )
+        self.qs = Transaction.objects.order_by('-id')
+
+    def test_count_is_exact_below_the_cap_even_after_deletes(self):
+        Transaction.objects.filter(pk__in=self.qs.values('pk')[:12]).delete()
+        paginator = EstimatedCountPaginator(self.qs, 10)
+        self.assertEqual((paginator.count, paginator.num_pages), (18, 2))
+        self.assertEqual(len(paginator.page(2)), 8)
+
+    def test_count_past_the_cap_uses_the_table_estimate(self):
+        Transaction.objects.filter(pk__in=self.qs.reverse().values('pk')[:5]).delete()
+        with mock.patch('bets.admin.COUNT_CAP', 10):
+            self.assertEqual(EstimatedCountPaginator(self.qs, 10).count, 30)  # largest pk, before ANALYZE
+            connections['default'].cursor().execute('ANALYZE')
+            self.assertEqual(EstimatedCountPaginator(self.qs, 10).count, 25)
+            deposits = self.qs.filter(type=Transaction.DEPOSIT)
+            self.assertEqual(EstimatedCountPaginator(deposits, 10).count, 10)
+
+    def test_date_hierarchy_periods_match_django(self):
+        probed = _ProbedPeriods(Transaction.objects.all(), 'created_at')
+        for kind in ('year', 'month'):
+            self.assertEqual(probed.datetimes('created_at', kind), list(Transaction.objects.datetimes('created_at', kind)))
+        december = Transaction.objects.filter(created_at__year=2023, created_at__month=12)
+        self.assertEqual(_ProbedPeriods(december, 'created_at').datetimes('created_at', 'day'),
+                         list(december.datetimes('created_at', 'day')))
+        self.assertEqual(_ProbedPeriods(Transaction.objects.none(), 'created_at').datetimes('created_at', 'year'), [])
+
+    def test_changelist_renders_the_indexed_date_hierarchy(self):
+        self.client.force_login(self.user)
+        url = reverse('admin:bets_transaction_changelist')
+        response = self.client.get(url)
+        self.assertContains(response, '?created_at__year=2024')
+        self.assertContains(response, '30 transactions')
+        response = self.client.get(url, {'created_at__year': 2024})
+        months = sorted({int(m) for m in re.findall(r'created_at__month=(\d+)', response.content.decode())})
+        expected = Transaction.objects.filter(created_at__year=2024).datetimes('created_at', 'month')
+        self.assertEqual(months, [d.month for d in expected])
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('bets.routers.replica_aliases', return_value=['replica1'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = ReplicaRouter()
+
+    def reads_from(self):
+        return self.router.db_for_read(Market)
+
+    def test_reads_use_a_replica_only_inside_read_from_replica_and_unpinned(self):
+        self.assertEqual(self.reads_from(), 'default')
+        with read_from_replica():
+            self.assertEqual(self.reads_from(), 'replica1')
+            with pinned_to_primary():
+                self.assertEqual(self.reads_from(), 'default')
+        self.assertEqual(self.router.db_for_write(Market), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'bets'))
+        self.assertTrue(self.router.allow_migrate('default', 'bets'))
+
+    def test_use_replica_routes_safe_methods_only(self):
+        view = use_replica(lambda request: self.reads_from())
+        factory = RequestFactory()
+        self.assertEqual(view(factory.get('/')), 'replica1')
+        self.assertEqual(view(factory.post('/')), 'default')
+
+    @override_settings(PRIMARY_PIN_SECONDS=7)
+    def test_a_write_pins_reads_to_the_primary_until_the_cookie_expires(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.reads_from())
+            return HttpResponse()
+
+        middleware = PrimaryPinMiddleware(use_replica(view))
+        factory = RequestFactory()
+        response = middleware(factory.post('/'))
+        pin = response.cookies[PIN_COOKIE]
+        self.assertEqual(pin['max-age'], 7)
+
+        pinned = factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = pin.value
+        self.assertNotIn(PIN_COOKIE, middleware(pinned).cookies)
+        middleware(factory.get('/'))  # the browser drops the cookie after max-age
+        self.assertEqual(seen, ['default', 'default', 'replica1'])
+
+
+class SearchTriggerTests(TestCase):
+    def test_migrations_leave_every_search_trigger_in_place(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            names = {name for name, in cursor.fetchall()}
+        self.assertLessEqual(set(SEARCH_TRIGGERS), names)
+        self.assertEqual(check_search_triggers(None, databases=['default']), [])
+
+    def test_check_reports_a_dropped_trigger(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('DROP TRIGGER bets_search_outcome_ai')
+        errors = check_search_triggers(None, databases=['default'])
+        self.assertEqual([e.id for e in errors], ['bets.E001'])
+        self.assertIn('bets_search_outcome_ai', errors[0].msg)
+
+        conn = connections['default']  # the schema editor refuses to run inside the test's transaction
+        search_migration.create_triggers(None, mock.Mock(connection=conn, execute=lambda sql: conn.cursor().execute(sql)))
+        self.assertEqual(check_search_triggers(None, databases=['default']), [])
+
+
+class ReplicaSearchTests(TransactionTestCase):
+    def test_search_view_runs_the_full_text_query_on_the_replica(self):
+        owner = User.objects.create_user('owner', password='pw')
+        Market.objects.create(title='Derby winner', creator=owner, house=owner)
+        self.client.force_login(owner)
+        with replica() as conn, CaptureQueriesContext(conn) as on_replica, \
+                CaptureQueriesContext(connections['default']) as on_default:
+            self.assertContains(self.client.get('/search/', {'q': 'derby'}), '<mark>Derby</mark> winner')
+        self.assertTrue(any('bets_search' in q['sql'] for q in on_replica.captured_queries))
+        self.assertFalse(any('bets_search' in q['sql'] for q in on_default.captured_queries))
+
+
+class NettingTests(TestCase):
+    def test_positions_come_from_one_query_and_plan_squares_everyone(self):
+        rng = random.Random(42)
+        owner = User.objects.create(username='owner')
+        event = Event.objects.create(name='poker night', creator=owner)
+        people = [User.objects.create(username=f'p{i}') for i in range(10)]
+        for p in people:
+            deposit(p, Decimal('500.00'))
+        for n in range(12):
+            house = people[n % 4] if n % 3 else None  # every third market is banked by the treasury
+            market = Market.objects.create(title=f'm{n}', creator=owner, house=house, event=event)
+            outcomes = [Outcome.objects.create(market=market, title=t, decimal_odds=Decimal('2.750')) for t in 'ab']
+            for p in people:
+                if p != house and rng.random() < 0.7:
+                    place_wager(p, rng.choice(outcomes), Decimal(rng.randint(100, 3000)).scaleb(-2))
+            settle_market(market, rng.choice(outcomes))
+
+        with self.assertNumQueries(1):
+            nets = positions(event)
+        self.assertEqual(sum(nets.values(), Money(0)), Money(0))
+        self.assertEqual(nets.get(TREASURY, Money(0)), EventWallet.objects.get(event=event).balance)
+        for p in people:
+            self.assertEqual(nets.get(p.id, Money(0)), Wallet.objects.get(user=p).balance - Money.of(500))
+
+        plan = settle_up(nets)
+        self.assertLessEqual(len(plan), len(nets) - 1)
+        left = dict(nets)
+        for t in plan:
+            self.assertGreater(t.amount, 0)
+            left[t.payer] += t.amount
+            left[t.payee] -= t.amount
+        self.assertFalse(any(left.values()))
+
+    def test_exact_matches_pair_first(self):
+        plan = settle_up({1: Money(-500), 2: Money(-300), 3: Money(300), 4: Money(500)})
+        self.assertEqual({(t.payer, t.payee, t.amount.cents) for t in plan}, {(1, 4, 500), (2, 3, 300)})
+        with self.assertRaises(ValueError):
+            settle_up({1: Money(-1)})
+
+
+class MarketCloneTests(TestCase):
+    def test_clone_copies_every_market_in_constant_queries(self):
+        owner = User.objects.create(username='owner')
+        other = User.objects.create(username='other')
+        week1 = Event.objects.create(name='week 1', creator=owner)
+        week2 = Event.objects.create(name='week 2', creator=owner)
+        shapes = [[50, 50], [20, 30, 50], [90, 10]]
+        for n in range(30):
+            m = Market.objects.create(title=f'm{n}', creator=owner, house=other if n % 2 else owner, event=week1,
+                                      house_margin=Decimal('0.0800'), max_bet_limit=Decimal('25.00'))
+            weights = shapes[n % 3]
+            odds = compute_odds(weights, m.house_margin)
+            for i, w in enumerate(weights):
+                Outcome.objects.create(market=m, title=f'o{i}', slider_weight=w,
+                                       implied_probability=odds[i]['prob'], decimal_odds=odds[i]['odds'])
+        settle_market(m, m.outcomes.first())
+
+        with self.assertNumQueries(6):  # 2 reads, then savepoint, 2 bulk inserts, release
+            copies = clone_event_markets(week1, week2, owner)
+        self.assertEqual(len(copies), 30)
+
+        def shape(event):
+            return [
+                (m.title, m.house_id, m.house_margin, m.max_bet_limit, m.status,
+                 [(o.title, o.slider_weight, o.decimal_odds, o.implied_probability) for o in m.outcomes.all()])
+                for m in event.markets.order_by('title').prefetch_related('outcomes')
+            ]
+        original, cloned = shape(week1), shape(week2)
+        self.assertEqual([r[:4] + r[5:] for r in cloned], [r[:4] + r[5:] for r in original])
+        self.assertEqual({r[4] for r in cloned}, {Market.OPEN})
+
+    def test_templates_round_trip(self):
+        owner = User.objects.create(username='owner')
+        m = Market.objects.create(title='Coin toss', creator=owner, house_margin=Decimal('0.1000'))
+        Outcome.objects.create(market=m, title='Heads', slider_weight=50, decimal_odds=Decimal('1.820'))
+        Outcome.objects.create(market=m, title='Tails', slider_weight=50, decimal_odds=Decimal('1.820'))
+        save_as_template(m, owner)
+        created = markets_from_templates(MarketTemplate.objects.filter(owner=owner), owner, house=owner)
+        self.assertEqual(len(created), 1)
+        copy = Market.objects.get(pk=created[0].pk)
+        self.assertEqual((copy.title, copy.house_id, copy.house_margin), ('Coin toss', owner.id, Decimal('0.1000')))
+        self.assertEqual(list(copy.outcomes.values_list('title', 'decimal_odds')),
+                         [('Heads', Decimal('1.820')), ('Tails', Decimal('1.820'))])
+
+
+class BulkCreditTests(TestCase):
+    def test_credit_creates_missing_wallets_in_constant_statements(self):
+        owner = User.objects.create(username='owner')
+        event = Event.objects.create(name='cup', creator=owner)
+        members = [User.objects.create(username=f'm{i}') for i in range(40)]
+        EventMembership.objects.bulk_create([EventMembership(event=event, user=u) for u in members])
+        for u in members[:10]:
+            deposit(u, Decimal('5.00'))
+
+        # member ids, savepoint, insert wallets, update balances, insert deposits, release
+        with self.assertNumQueries(6):
+            self.assertEqual(credit_event_members(event, Decimal('20.00')), 40)
+
+        balances = dict(Wallet.objects.filter(user__in=members).values_list('user_id', 'balance'))
+        self.assertEqual(len(balances), 40)
+        for i, u in enumerate(members):
+            self.assertEqual(balances[u.id], Money.of('25.00' if i < 10 else '20.00'))
+        self.assertEqual(Transaction.objects.filter(type=Transaction.DEPOSIT, note='Bankroll for cup').count(), 40)
+        self.assertEqual(bulk_credit([], Decimal('1')), 0)
+        with self.assertRaises(ValueError):
+            bulk_credit([owner.id], Decimal('0'))
+
+
+class CachedRequestPathTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch('bets.usercache.shared_cache', return_value=True)
+    def test_repeat_page_view_skips_the_database_until_a_write(self, _):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user('alice', password='pw')
+        self.assertTrue(Wallet.objects.filter(user=user).exists())
+        self.assertTrue(self.client.login(username='alice', password='pw'))
+
+        self.client.get('/search/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/search/').status_code, 200)
+
+        self.client.get('/')
+        with self.captureOnCommitCallbacks(execute=True):
+            deposit(user, Decimal('12.34'))
+        self.assertContains(self.client.get('/'), '12.34')
+
+        other = User.objects.create(username='bob')
+        with self.captureOnCommitCallbacks(execute=True):
+            EventInvite.objects.create(event=Event.objects.create(name='cup', creator=other), from_user=other, to_user=user)
+        self.assertContains(self.client.get('/search/'), 'Invites (1)')
+
+    def test_process_local_cache_reads_the_user_row_every_request(self):
+        user = User.objects.create_user('alice', password='pw')
+        self.client.force_login(user)
+        self.client.get('/search/')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/search/').status_code, 200)
+        # another worker's write: this process's cache never hears of it
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/search/').status_code, 302)
+
+
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        override = override_settings(STATIC_ROOT=root)
+        override.enable()
+        self.addCleanup(override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.hashed = staticfiles_storage.stored_name('bets/app.js')
+
+    def test_hashed_assets_are_immutable_and_served_precompressed(self):
+        self.assertRegex(self.hashed, r'^bets/app\.[0-9a-f]{12}\.js$')
+        response = self.client.get(f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/javascript')
+        plain = staticfiles_storage.open(self.hashed).read()
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+        response = self.client.get(f'/static/{self.hashed}')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(b''.join(response.streaming_content), plain)
+
+    def test_unhashed_names_revalidate_and_unknown_paths_fall_through(self):
+        response = self.client.get('/static/bets/app.js')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(self.client.get('/static/bets/missing.js').status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        override = override_settings(PROFILE_DIR=self.dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_non_staff_profile_requests_are_ignored(self):
+        self.client.force_login(User.objects.create_user('alice', password='pw'))
+        response = self.client.get('/search/', {'q': 'cup', '_profile': '1'}, HTTP_X_BETS_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Bets-Profile', response)
+        self.assertFalse(RequestProfile.objects.exists())
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+    def test_staff_request_is_profiled(self):
+        staff = User.objects.create_user('root', password='pw', is_staff=True)
+        self.client.force_login(staff)
+        self.assertNotIn('X-Bets-Profile', self.client.get('/search/', {'q': 'cup'}))
+
+        response = self.client.get('/search/', {'q': 'cup', '_profile': '1'})
+        profile = RequestProfile.objects.get()
+        self.assertEqual(response['X-Bets-Profile'], str(profile.pk))
+        self.assertEqual((profile.user, profile.method, profile.view_name, profile.status_code),
+                         (staff, 'GET', 'bets:search', 200))
+        self.assertGreater(profile.query_count, 0)
+        sql = json.loads(artifact_path(profile, 'sql').read_text())
+        self.assertEqual(len(sql), profile.query_count)
+        self.assertTrue(artifact_path(profile, 'pstats').exists())
+        self.assertIn('function calls', top_functions(profile))
+
+
+@skipIf(settings.HOT_TEMPLATE_ENGINE != 'jinja2', 'Jinja2 is not installed')
+class HotTemplateParityTests(TestCase):
+    """The Jinja2 ports in bets/jinja2/ must show what the Django templates show."""
+
+    FIGURES = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}|[A-Z][a-z]{2} \d{1,2}, \d{2}:\d{2}|-?\d+\.\d{2,3}%?')
+
+    def setUp(self):
+        cache.clear()
+        self.house = User.objects.create(username='house')
+        self.bettor = User.objects.create(username='bettor')
+        deposit(self.bettor, Decimal('100.00'))
+        noon_utc = datetime(2026, 1, 1, 12, tzinfo=dt_timezone.utc)
+        self.open = Market.objects.create(title='open', creator=self.house, house=self.house, closes_at=noon_utc)
+        self.settled = Market.objects.create(title='settled', creator=self.house, house=self.house)
+        for market in (self.open, self.settled):
+            yes, no = [Outcome.objects.create(market=market, title=t, decimal_odds=Decimal(o)) for t, o in (('yes', '1.905'), ('no', '2.10'))]
+            place_wager(self.bettor, yes, Decimal('12.34'))
+            place_wager(self.bettor, no, Decimal('5.00'))
+        settle_market(self.settled, self.settled.outcomes.get(title='yes'))
+        Activity.objects.update(created_at=noon_utc + timedelta(minutes=30))
+
+    def render(self, engine, user, url):
+        self.client.force_login(user)
+        with override_settings(HOT_TEMPLATE_ENGINE=engine):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # only Django templates are recorded (the forms' widgets render through Django under both)
+        self.assertEqual('bets/base.html' in [t.name for t in response.templates], engine == 'django')
+        return response.content.decode()
+
+    def assertSameFigures(self, user, url):
+        django_page, jinja_page = (self.render(engine, user, url) for engine in ('django', 'jinja2'))
+        figures = self.FIGURES.findall(django_page)
+        self.assertTrue(figures, url)
+        self.assertEqual(sorted(self.FIGURES.findall(jinja_page)), sorted(figures), url)
+        return jinja_page
+
+    def test_hot_pages_show_the_same_dates_money_and_odds_under_both_engines(self):
+        self.assertSameFigures(self.bettor, reverse('bets:dashboard'))
+        self.assertSameFigures(self.bettor, reverse('bets:market_history'))
+        self.assertSameFigures(self.house, reverse('bets:market_detail', args=[self.settled.pk]))
+        page = self.assertSameFigures(self.house, reverse('bets:market_detail', args=[self.open.pk]))
+        self.assertIn('Closes at: 2026-01-01 23:00', page)  # Australia/Melbourne, not UTC
+
+    def test_activity_timestamps_are_local_under_jinja(self):
+        page = self.render('jinja2', self.house, reverse('bets:market_detail', args=[self.open.pk]))
+        self.assertIn('<span class="badge">Jan 1, 23:30</span>', page)
+        self.assertNotIn('Jan 1, 12:30', page)
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        if any(to.startswith('bounce') for m in messages for to in m.to):
+            raise OSError('mailbox unavailable')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='bets.tests.CountingBackend', NOTIFICATION_DIGEST_MINUTES=15,
+                   NOTIFICATION_MAX_ATTEMPTS=2, NOTIFICATION_RETRY_SECONDS=60)
+class NotificationTests(TestCase):
+    def test_outbox_is_sent_as_one_digest_per_user_over_one_connection(self):
+        CountingBackend.opened = 0
+        house = User.objects.create(username='house', email='house@example.com')
+        alice = User.objects.create(username='alice', email='alice@example.com')
+        bounce = User.objects.create(username='bob', email='bounce@example.com')
+        event = Event.objects.create(name='cup', creator=house)
+        market = Market.objects.create(title='final', creator=house, house=house, event=event)
+        yes, no = (Outcome.objects.create(market=market, title=t, decimal_odds=Decimal('2.000')) for t in ('yes', 'no'))
+        for u, oc in ((alice, yes), (bounce, no)):
+            deposit(u, Decimal('10.00'))
+            place_wager(u, oc, Decimal('4.00'))
+        bulk_invite_to_event(event, house, [alice.id, bounce.id])
+        settle_market(market, yes)
+        self.assertEqual(Notification.objects.filter(user=alice).count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(drain(), (0, 0))  # still inside the digest window
+        later = timezone.now() + timedelta(minutes=20)
+        self.assertEqual(drain(now=later), (2, 1))
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['alice@example.com', 'house@example.com'])
+        digest = next(m for m in mail.outbox if m.to == ['alice@example.com'])
+        self.assertEqual(digest.subject, '2 updates from The House')
+        self.assertIn('you won 8.00', digest.body)
+        self.assertIn('house invited you to cup', digest.body)
+
+        self.assertEqual(drain(now=later), (0, 0))  # the retry is backed off
+        self.assertEqual(drain(now=later + timedelta(minutes=2)), (0, 1))
+        self.assertEqual(set(Notification.objects.filter(user=bounce).values_list('status', 'attempts')),
+                         {(Notification.FAILED, 2)})
+        self.assertFalse(Notification.objects.filter(status=Notification.PENDING).exists())
+
+
+class WarmupTests(TestCase):
+    def test_warm_up_compiles_every_template_and_reverses_every_url(self):
+        with self.assertLogs('bets.warmup', 'INFO') as logs:
+            self.assertEqual(list(warmup.warm_up()), ['urls', 'templates', 'database', 'caches'])
+        self.assertFalse([line for line in logs.output if line.startswith('ERROR')])
+        self.assertGreater(warmup.compile_templates(), 15)
+        self.assertGreater(warmup.resolve_urls(), 30)
+
+    def test_warm_up_closes_the_connections_it_opened(self):
+        with mock.patch.object(connections, 'close_all') as close_all, self.assertLogs('bets.warmup', 'INFO'):
+            warmup.warm_up()
+        close_all.assert_called_once_with()
+
+
+class ParlayTests(TestCase):
+    def test_event_risk_counts_open_parlays_against_the_treasury(self):
+        house = User.objects.create(username='house')
+        event = Event.objects.create(name='cup', creator=house)
+        markets = []
+        for i in range(3):
+            m = Market.objects.create(title=f'm{i}', creator=house, house=house, event=event)
+            markets.append([Outcome.objects.create(market=m, title=t, decimal_odds=Decimal('2.000'), implied_probability=Decimal(p))
+                            for t, p in (('yes', '0.60'), ('no', '0.40'))])
+        a, b, c = users = [User.objects.create(username=n) for n in 'abc']
+        for u in users:
+            deposit(u, Decimal('100.00'))
+        place_parlay(a, [markets[0][0], markets[1][0]], Decimal('10.00'))  # pays 40 at 0.6 once m0 has won
+        place_parlay(b, [markets[0][1], markets[2][0]], Decimal('10.00'))  # lost once m0 settles
+        place_parlay(c, [markets[1][1], markets[2][1]], Decimal('5.00'))   # pays 20 at 0.4 x 0.4
+        settle_market(markets[0][0].market, markets[0][0])
+
+        report = house_risk(event=event)
+        self.assertEqual(report.markets, [])
+        self.assertEqual(report.parlays, ParlayRisk(
+            parlays=2, staked=Money.of(15), worst_case=Money.of(-45), best_case=Money.of(15),
+            expected=Money(1000 - 2400 + 500 - 320),
+        ))
+        self.assertEqual((report.total_worst_case, report.total_best_case), (Money.of(-45), Money.of(15)))
+
+        self.client.force_login(house)
+        response = self.client.get(reverse('bets:event_risk', args=[event.pk]))
+        self.assertContains(response, 'Open parlays: 2')
+
+    def test_legs_settle_incrementally_and_the_event_nets_to_zero(self):
+        house = User.objects.create(username='house')
+        event = Event.objects.create(name='cup', creator=house)
+        markets = []
+        for i in range(6):
+            m = Market.objects.create(title=f'm{i}', creator=house, house=house, event=event)
+            markets.append([Outcome.objects.create(market=m, title=t, decimal_odds=Decimal('2.000')) for t in ('yes', 'no')])
+        a, b, c, d = users = [User.objects.create(username=n) for n in 'abcd']
+        for u in users:
+            deposit(u, Decimal('100.00'))
+
+        pa = place_parlay(a, [markets[0][0], markets[1][0], markets[2][0]], Decimal('10.00'))
+        pb = place_parlay(b, [markets[0][1], markets[1][0]], Decimal('10.00'))
+        pc = place_parlay(c, [markets[0][0], markets[3][0]], Decimal('10.00'))
+        pd = place_parlay(d, [markets[4][0], markets[5][1]], Decimal('10.00'))
+        self.assertEqual((pa.odds_at_placement, pa.potential_payout), (Decimal('8.000'), Money.of(80)))
+        for legs in ([markets[0][0], markets[0][1]], [markets[0][0]], [markets[0][0], Outcome.objects.create(
+                market=Market.objects.create(title='other', creator=house), title='x', decimal_odds=Decimal('2'))]):
+            with self.assertRaises(ValueError):
+                place_parlay(a, legs, Decimal('1.00'))
+
+        settle_market(markets[0][0].market, markets[0][0])  # b loses at once
+        void_markets([markets[3][0].market_id])  # c's other leg drops out: pays at 2.000
+        settle_market(markets[1][0].market, markets[1][0])
+        # 9 for the market itself; for its one parlay leg: leg read, 2 leg updates, decrement,
+        # 2 completion reads, 3 payout writes, 3 treasury statements, 1 notification; 2 for activity
+        with self.assertNumQueries(23):
+            settle_market(markets[2][0].market, markets[2][0])
+        void_event(event)  # every leg of d void: refunded
+        with self.assertRaises(ValueError):
+            place_parlay(a, [markets[4][0], markets[5][0]], Decimal('1.00'))
+
+        status = dict(Parlay.objects.values_list('user_id', 'status'))
+        self.assertEqual(status, {a.id: Parlay.WON, b.id: Parlay.LOST, c.id: Parlay.WON, d.id: Parlay.VOID})
+        balances = dict(Wallet.objects.filter(user__in=users).values_list('user_id', 'balance'))
+        self.assertEqual(balances, {a.id: Money.of(170), b.id: Money.of(90), c.id: Money.of(110), d.id: Money.of(100)})
+        self.assertEqual(EventWallet.objects.get(event=event).balance, Money.of(-70))
+        self.assertEqual(sum((t.amount for t in EventTransaction.objects.filter(event=event)), Money(0)), Money.of(-70))
+        self.assertEqual(positions(event), {a.id: Money.of(70), b.id: Money.of(-10), c.id: Money.of(10), TREASURY: Money.of(-70)})
+
+
+class ActivityTests(TestCase):
+    @override_settings(ACTIVITY_CAP=5, ACTIVITY_TRIM_BATCH=3)
+    def test_feed_is_capped_per_event_and_polls_from_a_cursor(self):
+        house = User.objects.create(username='house')
+        event = Event.objects.create(name='cup', creator=house)
+        market = Market.objects.create(title='final', creator=house, house=house, event=event)
+        yes = Outcome.objects.create(market=market, title='yes', decimal_odds=Decimal('2.000'))
+        loose = Market.objects.create(title='loose', creator=house, house=house)
+        loose_yes = Outcome.objects.create(market=loose, title='yes', decimal_odds=Decimal('2.000'))
+        alice = User.objects.create_user('alice', password='pw')
+        deposit(alice, Decimal('100.00'))
+
+        self.assertTrue(join_event(event, alice, added_by=house))
+        self.assertFalse(join_event(event, alice))
+        place_wager(alice, yes, Decimal('1.00'))
+        place_wager(alice, loose_yes, Decimal('2.00'))
+        self.assertEqual([a.kind for a in activity.feed(event=event)], [Activity.WAGER, Activity.JOINED])
+        self.assertEqual([a.text for a in activity.feed(market=loose)], ["alice bet 2.00 on yes in “loose”"])
+
+        cursor = activity.feed(event=event)[0].id
+        for _ in range(6):  # 8 rows: trimmed back to 5 once 3 past the cap
+            place_wager(alice, yes, Decimal('1.00'))
+        self.assertEqual(Activity.objects.filter(event=event).count(), 5)
+        settle_market(market, yes)
+        with self.assertNumQueries(1):
+            new, more = activity.poll(cursor, event=event)
+        self.assertEqual([a.kind for a in new], [Activity.WAGER] * 5 + [Activity.SETTLED])  # the oldest was trimmed
+        self.assertFalse(more)
+        self.assertEqual(Activity.objects.filter(event=event).count(), 6)
+        self.assertEqual(Activity.objects.filter(market=loose).count(), 1)  # another scope, untouched
+
+        self.assertTrue(self.client.login(username='alice', password='pw'))
+        data = self.client.get(f'/events/{event.pk}/activity/', {'since': new[-2].id}).json()
+        self.assertEqual(([i['kind'] for i in data['items']], data['cursor']), ([Activity.SETTLED], new[-1].id))
+        data = self.client.get(f'/events/{event.pk}/activity/', {'since': data['cursor']}).json()
+        self.assertEqual((data['items'], data['cursor'], data['more']), ([], new[-1].id, False))
+        self.assertContains(self.client.get(f'/markets/{market.pk}/'), '“final” settled on yes')
+        self.assertContains(self.client.get(f'/events/{event.pk}/'), f'data-cursor="{new[-1].id}"')
+        self.client.force_login(User.objects.create(username='bob'))
+        self.assertEqual(self.client.get(f'/markets/{loose.pk}/activity/').status_code, 403)
+
+    @override_settings(ACTIVITY_PAGE=4)
+    def test_poll_pages_through_a_burst_larger_than_a_page(self):
+        house = User.objects.create_user('house', password='pw')
+        event = Event.objects.create(name='cup', creator=house)
+        for i in range(10):
+            market = Market.objects.create(title=f'm{i}', creator=house, house=house, event=event)
+            Outcome.objects.create(market=market, title='yes', decimal_odds=Decimal('2.000'))
+        self.client.force_login(house)
+        cursor = self.client.get(f'/events/{event.pk}/activity/').json()['cursor']
+        self.assertEqual(void_event(event), 10)  # one record_many of 10 rows
+
+        seen, more = [], True
+        while more:
+            data = self.client.get(f'/events/{event.pk}/activity/', {'since': cursor}).json()
+            seen += [i['text'] for i in data['items']]
+            cursor, more = data['cursor'], data['more']
+        self.assertEqual(seen, [f"“m{i}” was voided" for i in range(10)])
+
+
+class BackupTests(TransactionTestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_snapshot_verifies_restores_and_rotates(self):
+        user = User.objects.create(username='alice')
+        deposit(user, Decimal('25.00'))
+        with override_settings(BACKUP_DIR=self.dir, BACKUP_KEEP=2):
+            first = backup.snapshot(verify=True, pages=4, sleep=0)
+            deposit(user, Decimal('5.00'))
+            self.assertIsNone(backup.restore(first, safety_snapshot=False))
+            self.assertEqual(Wallet.objects.get(user=user).balance, Money.of(25))
+
+            for stamp in ('20200101-000000', '20200102-000000'):
+                (self.dir / f'db-{stamp}.sqlite3.gz').write_bytes(b'')
+            self.assertEqual([p.name for p in backup.rotate()], ['db-20200101-000000.sqlite3.gz'])
+            self.assertEqual(backup.snapshot_at(first.taken_at).path, first.path)
+            with self.assertRaises(ValueError):
+                backup.snapshot_at(first.taken_at.replace(year=2019))
+
+            Wallet.objects.filter(user=user).update(balance=Money(1))
+            with self.assertRaises(ValueError):
+                backup.snapshot(verify=True)
+        self.assertEqual(sorted(p.name for p in self.dir.iterdir()), ['db-20200102-000000.sqlite3.gz', first.path.name])
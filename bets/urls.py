@@ -8,15 +8,27 @@ app_name = 'bets'
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('deposit/', views.deposit_view, name='deposit'),
+    path('risk/', views.risk_report, name='risk_report'),
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('search/', views.search_view, name='search'),
 
     path('friends/', views.friends, name='friends'),
     path('friends/accept/<int:req_id>/', views.friend_accept, name='friend_accept'),
     path('friends/decline/<int:req_id>/', views.friend_decline, name='friend_decline'),
     path('friends/remove/<int:user_id>/', views.unfriend, name='unfriend'),
+    path('users/suggest/', views.user_suggest, name='user_suggest'),
 
     path('events/new/', views.event_create, name='event_create'),
     path('events/<int:pk>/', views.event_detail, name='event_detail'),
     path('events/<int:pk>/invite/', views.event_invite, name='event_invite'),
+    path('events/<int:pk>/invite/bulk/', views.event_bulk_invite, name='event_bulk_invite'),
+    path('events/<int:pk>/risk/', views.event_risk, name='event_risk'),
+    path('events/<int:pk>/leaderboard/', views.leaderboard, name='event_leaderboard'),
+    path('events/<int:pk>/void/', views.event_void, name='event_void'),
+    path('events/<int:pk>/clone/', views.event_clone_markets, name='event_clone_markets'),
+    path('events/<int:pk>/credit/', views.event_credit, name='event_credit'),
+    path('events/<int:pk>/parlay/', views.event_parlay, name='event_parlay'),
+    path('events/<int:pk>/activity/', views.event_activity, name='event_activity'),
     path('events/invite/<int:invite_id>/accept/', views.event_invite_accept, name='event_invite_accept'),
     path('events/invite/<int:invite_id>/decline/', views.event_invite_decline, name='event_invite_decline'),
     path('events/<int:pk>/remove/<int:user_id>/', views.event_remove_member, name='event_remove_member'),
@@ -25,7 +37,13 @@ urlpatterns = [
     path('markets/new/', views.market_create, name='market_create'),
     path('markets/<int:pk>/', views.market_detail, name='market_detail'),
     path('markets/<int:pk>/share/', views.market_share_invite, name='market_share_invite'),
+    path('markets/<int:pk>/share/bulk/', views.market_bulk_share, name='market_bulk_share'),
     path('markets/<int:pk>/settle/', views.market_settle, name='market_settle'),
+    path('markets/<int:pk>/void/', views.market_void, name='market_void'),
+    path('markets/<int:pk>/activity/', views.market_activity, name='market_activity'),
+    path('markets/<int:pk>/save-template/', views.market_save_template, name='market_save_template'),
+    path('markets/templates/', views.market_templates, name='market_templates'),
+    path('markets/templates/<int:pk>/delete/', views.market_template_delete, name='market_template_delete'),
     
     path('markets/share/<int:req_id>/accept/', views.market_share_accept, name='market_share_accept'),
     path('markets/share/<int:req_id>/decline/', views.market_share_decline, name='market_share_decline'),
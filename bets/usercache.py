@@ -0,0 +1,106 @@
+# bets/usercache.py
+"""Per-user cache for the authenticated request path.
+
+Everything a logged-in page needs about its user is cached: the ``User`` row
+(through ``CachedModelBackend``, which ``AuthenticationMiddleware`` calls), the
+wallet, and the unseen-invite count for the nav. With cached_db sessions, a
+page without content queries needs no database round trips, and a page with
+content needs only its own.
+
+Each user's entries are keyed under a version token, ``bets:uv:<id>``.
+``invalidate`` replaces the token, so every entry for that user goes stale at
+once. The replacement is a random value, not a counter, so that an evicted
+token can never come back and match an old entry. Writers call ``invalidate``
+for the users they touch:
+
+* ledger services: deposit, wagers, settlement, voids, bulk credits;
+* signals: user saves, invite and share requests.
+
+The new token is set when the transaction commits. A reader racing the write
+either caches the old value under the old token, which nobody will read
+again, or loads the new value.
+
+A process-local cache (LocMem) only sees its own process's invalidations, so
+with several workers a deactivated user or a changed password would stay
+valid elsewhere for up to ``TTL``. ``CachedModelBackend`` therefore loads the
+``User`` row from the database unless the cache is shared by every process.
+"""
+from __future__ import annotations
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import EventInvite, FriendshipRequest, MarketShareRequest, Wallet
+
+TTL = 300
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache() -> bool:
+    """Whether the default cache is shared by every worker (Redis, Memcached, database)."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def _version_key(user_id) -> str:
+    return f'bets:uv:{user_id}'
+
+
+def version(user_id) -> str:
+    token = cache.get(_version_key(user_id))
+    if token is None:
+        token = uuid.uuid4().hex
+        if not cache.add(_version_key(user_id), token, timeout=None):
+            token = cache.get(_version_key(user_id), token)
+    return token
+
+
+def invalidate(*user_ids):
+    ids = {uid for uid in user_ids if uid is not None}
+    if ids:
+        transaction.on_commit(lambda: cache.set_many({_version_key(uid): uuid.uuid4().hex for uid in ids}, timeout=None))
+
+
+def _cached(user_id, name: str, load):
+    key = f'bets:u:{user_id}:{version(user_id)}:{name}'
+    value = cache.get(key)
+    if value is None:
+        value = load()
+        cache.set(key, value, TTL)
+    return value
+
+
+def get_user(user_id):
+    User = get_user_model()
+    return _cached(user_id, 'user', lambda: User._default_manager.filter(pk=user_id).first() or False) or None
+
+
+def wallet_for(user) -> Wallet:
+    """The user's wallet for display. Never writes: a user without one (predating eager creation) sees a zero balance."""
+    return _cached(user.id, 'wallet', lambda: Wallet.objects.filter(user_id=user.id).first() or Wallet(user_id=user.id))
+
+
+def invite_count(user_id) -> int:
+    def load():
+        total = 0
+        for model in (FriendshipRequest, EventInvite, MarketShareRequest):
+            total += model.objects.filter(to_user_id=user_id, status='PENDING', seen=False).count()
+        return total
+    return _cached(user_id, 'invites', load)
+
+
+class CachedModelBackend(ModelBackend):
+    """``ModelBackend`` that serves ``get_user`` (run once per request) from the
+    per-user cache, when that cache is shared (see ``shared_cache``)."""
+
+    def get_user(self, user_id):
+        if not shared_cache():
+            return super().get_user(user_id)
+        user = get_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
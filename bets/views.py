@@ -1,31 +1,53 @@
 # bets/views.py
 from __future__ import annotations
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
+from django.conf import settings
 from django.utils import timezone
 from django.db.models import Q
 from django.contrib import messages
 from django.contrib.auth import get_user_model, logout
 User = get_user_model()
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.db import transaction
 from django.views.decorators.http import require_POST
 
-from .forms import DepositForm, EventForm, MarketForm, EventInviteForm, MarketShareForm, UserLookupForm
-from .services import ensure_wallet, deposit as do_deposit, compute_odds, place_wager, settle_market, can_view_market
+from .archive import archived_history, can_view_archived_market, load_archived_market
+from .money import Money
+from .risk import house_risk
+from .routers import use_replica
+from . import activity, netting, search, stats, usercache
+from .forms import DepositForm, EventForm, MarketForm, EventInviteForm, MarketShareForm, UserLookupForm, BulkInviteForm
+from .forms import CloneMarketsForm, EventCreditForm, ParlayForm, UseTemplatesForm
+from .services import deposit as do_deposit, compute_odds, place_wager, settle_market, void_event, void_markets, can_view_market, find_user, suggest_users
+from .services import bulk_invite_to_event, bulk_share_market, invite_candidates
+from .services import clone_event_markets, credit_event_members, markets_from_templates, save_as_template
+from .services import join_event, place_parlay
 from .models import (
-    Event, Market, Outcome, Wager, UserSettings,
+    Event, Market, Outcome, Wager, UserSettings, ArchivedMarket, MarketTemplate, Parlay,
     Friendship, FriendshipRequest,
     EventWallet,
     EventMembership, EventInvite,
     MarketShare, MarketShareRequest
 )
 
-TWOPLACES = Decimal('0.01')
+def render_hot(request, template_name, context):
+    # dashboard / market pages have Jinja2 ports in bets/jinja2/ (see HOT_TEMPLATE_ENGINE)
+    return render(request, template_name, context, using=getattr(settings, 'HOT_TEMPLATE_ENGINE', None))
+
+
+def _is_event_admin(ev, user) -> bool:
+    # the creator, an ADMIN member, or a superuser may manage the event
+    return (
+        user == ev.creator or user.is_superuser or
+        EventMembership.objects.filter(event=ev, user=user, role=EventMembership.ADMIN).exists()
+    )
 
 @login_required
+@use_replica
 def dashboard(request):
-    wallet = ensure_wallet(request.user)
+    wallet = usercache.wallet_for(request.user)
 
     member_event_ids = EventMembership.objects.filter(user=request.user).values_list('event_id', flat=True)
     events_for_you = (
@@ -36,7 +58,7 @@ def dashboard(request):
     your_markets = (
     Market.objects
     .filter(Q(creator=request.user) | Q(house=request.user))
-    .exclude(status=Market.SETTLED)
+    .exclude(status__in=[Market.SETTLED, Market.VOID])
     .select_related('event')
     .order_by('-created_at')[:10]
 )
@@ -59,15 +81,71 @@ def dashboard(request):
         .prefetch_related('outcomes')[:3]
     )
 
-    return render(request, 'bets/dashboard.html', {
+    return render_hot(request, 'bets/dashboard.html', {
         'wallet': wallet,
         'events': events_for_you,
         'your_markets': your_markets,
         'open_markets': open_markets,
         'settled_preview': settled_preview,
+        'my_stats': stats.stats_for(request.user),
         'deposit_form': DepositForm(),
     })
 
+@login_required
+@use_replica
+def risk_report(request):
+    return render(request, 'bets/risk.html', {'report': house_risk(house=request.user)})
+
+@login_required
+@use_replica
+def leaderboard(request, pk: int | None = None):
+    ev = None
+    if pk is not None:
+        ev = get_object_or_404(Event, pk=pk)
+        if not (request.user == ev.creator or request.user.is_superuser
+                or EventMembership.objects.filter(event=ev, user=request.user).exists()):
+            messages.error(request, "You don’t have access to this event.")
+            return redirect('bets:dashboard')
+
+    metric = request.GET.get('by', 'net')
+    if metric not in stats.METRICS:
+        metric = 'net'
+    rows = stats.leaderboard(ev, metric)
+    ranked, prev, rank = [], None, 0
+    for i, row in enumerate(rows, 1):
+        value = getattr(row, metric)
+        if value != prev:
+            rank, prev = i, value
+        ranked.append((rank, row))
+
+    return render(request, 'bets/leaderboard.html', {
+        'event': ev,
+        'metric': metric,
+        'metrics': stats.METRICS,
+        'rows': ranked,
+        'my_stats': stats.stats_for(request.user, ev),
+        'my_rank': stats.rank_of(request.user, ev, metric),
+        'min_wagers': stats.min_wagers(),
+    })
+
+
+@login_required
+@use_replica
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    hits, has_next = search.search(request.user, query, page) if query else ([], False)
+    return render(request, 'bets/search.html', {
+        'query': query,
+        'hits': hits,
+        'page': page,
+        'has_next': has_next,
+    })
+
+
 @login_required
 def deposit_view(request):
     if request.method == 'POST':
@@ -107,11 +185,7 @@ def event_detail(request, pk: int):
         messages.error(request, "You don’t have access to this event.")
         return redirect('bets:dashboard')
 
-    can_invite = (
-        request.user == ev.creator or
-        EventMembership.objects.filter(event=ev, user=request.user, role=EventMembership.ADMIN).exists() or
-        request.user.is_superuser
-    )
+    can_invite = _is_event_admin(ev, request.user)
 
     invite_form = EventInviteForm()
 
@@ -123,21 +197,81 @@ def event_detail(request, pk: int):
     member_users = [m.user for m in members]
 
     markets = ev.markets.select_related('creator', 'house').order_by('-created_at')
+    parlay_form = ParlayForm(event=ev)
 
     return render(request, 'bets/event_detail.html', {
         'event': ev,
         'invite_form': invite_form,
+        'bulk_invite_form': BulkInviteForm(user=request.user, exclude_event=ev) if can_invite else None,
+        'clone_form': CloneMarketsForm(user=request.user, target=ev) if can_invite else None,
+        'credit_form': EventCreditForm() if can_invite else None,
         'members': member_users,
         'can_invite': can_invite,
         'markets': markets,
+        'settlement': netting.settlement_plan(ev),
+        'parlay_form': parlay_form if parlay_form.fields['outcomes'].queryset.exists() else None,
+        'parlays': Parlay.objects.filter(event=ev, user=request.user).prefetch_related('legs')[:20],
+        'activity': activity.feed(event=ev),
     })
 
 
+def _activity_json(request, **scope):
+    # ?since=<id> pages forward from the client's cursor; without it, the newest page
+    since = request.GET.get('since', '')
+    if since.isdigit():
+        rows, more = activity.poll(int(since), **scope)
+        cursor = rows[-1].id if rows else int(since)
+    else:
+        rows, more = activity.feed(**scope)[::-1], False
+        cursor = rows[-1].id if rows else 0
+    return JsonResponse({'items': [activity.as_json(a) for a in rows], 'cursor': cursor, 'more': more})
+
+
+@login_required
+def event_activity(request, pk: int):
+    ev = get_object_or_404(Event, pk=pk)
+    is_member = EventMembership.objects.filter(event=ev, user=request.user).exists()
+    if not (request.user == ev.creator or is_member or request.user.is_superuser):
+        return JsonResponse({'error': "You don’t have access to this event."}, status=403)
+    return _activity_json(request, event=ev)
+
+
+@require_POST
+@login_required
+def event_parlay(request, pk: int):
+    ev = get_object_or_404(Event, pk=pk)
+    is_member = EventMembership.objects.filter(event=ev, user=request.user).exists()
+    if not (request.user == ev.creator or is_member or request.user.is_superuser):
+        messages.error(request, "You don’t have access to this event.")
+        return redirect('bets:dashboard')
+
+    form = ParlayForm(request.POST, event=ev)
+    if not form.is_valid():
+        messages.error(request, "; ".join(e for errs in form.errors.values() for e in errs))
+        return redirect('bets:event_detail', pk=pk)
+    try:
+        parlay = place_parlay(request.user, list(form.cleaned_data['outcomes']), form.cleaned_data['stake'])
+    except ValueError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, f"Parlay placed at {parlay.odds_at_placement}: pays {parlay.potential_payout} if every leg wins.")
+    return redirect('bets:event_detail', pk=pk)
+
+
+@login_required
+@use_replica
+def event_risk(request, pk: int):
+    ev = get_object_or_404(Event, pk=pk)
+    if not _is_event_admin(ev, request.user):
+        messages.error(request, "Only event admins can see the treasury risk report.")
+        return redirect('bets:event_detail', pk=pk)
+    return render(request, 'bets/risk.html', {'report': house_risk(event=ev), 'event': ev})
+
+
 @login_required
 def event_invite(request, pk: int):
     ev = get_object_or_404(Event, pk=pk)
-    is_admin = (request.user == ev.creator) or EventMembership.objects.filter(event=ev, user=request.user, role=EventMembership.ADMIN).exists()
-    if not is_admin:
+    if not _is_event_admin(ev, request.user):
         messages.error(request, "You don’t have permission to invite to this event.")
         return redirect('bets:event_detail', pk=pk)
 
@@ -145,7 +279,7 @@ def event_invite(request, pk: int):
         form = EventInviteForm(request.POST)
         if form.is_valid():
             q = form.cleaned_data['query'].strip()
-            u = User.objects.filter(username__iexact=q).first() or User.objects.filter(email__iexact=q).first()
+            u = find_user(q)
             if not u:
                 messages.error(request, "User not found.")
             elif EventMembership.objects.filter(event=ev, user=u).exists():
@@ -164,11 +298,83 @@ def event_invite(request, pk: int):
     return render(request, 'bets/event_detail.html', {'event': ev, 'invite_form': form, 'members': members, 'pending_invites': pending})
 
 
+def _report_bulk_invite(request, result: dict, unknown: list[str], noun: str):
+    if result['sent']:
+        messages.success(request, f"{noun} sent to {result['sent']} people.")
+    skipped = [f"{n} {label}" for n, label in ((result['members'], "already in"), (result['pending'], "already pending")) if n]
+    if skipped:
+        messages.info(request, "Skipped: " + ", ".join(skipped) + ".")
+    if unknown:
+        messages.error(request, "Not found: " + ", ".join(unknown[:20]) + ("…" if len(unknown) > 20 else ""))
+    if not (result['sent'] or result['members'] or result['pending'] or unknown):
+        messages.info(request, "Nobody to invite.")
+
+
+@require_POST
+@login_required
+def event_bulk_invite(request, pk: int):
+    ev = get_object_or_404(Event, pk=pk)
+    if not _is_event_admin(ev, request.user):
+        messages.error(request, "You don’t have permission to invite to this event.")
+        return redirect('bets:event_detail', pk=pk)
+
+    form = BulkInviteForm(request.POST, user=request.user, exclude_event=ev)
+    if not form.is_valid():
+        messages.error(request, "; ".join(e for errs in form.errors.values() for e in errs))
+        return redirect('bets:event_detail', pk=pk)
+
+    ids, unknown = invite_candidates(request.user, form.cleaned_data['source'], form.people_list(), form.cleaned_data['event'])
+    _report_bulk_invite(request, bulk_invite_to_event(ev, request.user, ids), unknown, "Invites")
+    return redirect('bets:event_detail', pk=pk)
+
+
+@require_POST
+@login_required
+def event_credit(request, pk: int):
+    ev = get_object_or_404(Event, pk=pk)
+    if not _is_event_admin(ev, request.user):
+        messages.error(request, "You don’t have permission to credit this event’s members.")
+        return redirect('bets:event_detail', pk=pk)
+
+    form = EventCreditForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, "; ".join(e for errs in form.errors.values() for e in errs))
+        return redirect('bets:event_detail', pk=pk)
+
+    amount = form.cleaned_data['amount']
+    n = credit_event_members(ev, amount, note=form.cleaned_data['note'])
+    messages.success(request, f"Credited {amount} to {n} member(s).")
+    return redirect('bets:event_detail', pk=pk)
+
+
+@require_POST
+@login_required
+def event_clone_markets(request, pk: int):
+    ev = get_object_or_404(Event, pk=pk)
+    if not _is_event_admin(ev, request.user):
+        messages.error(request, "You don’t have permission to add markets to this event.")
+        return redirect('bets:event_detail', pk=pk)
+
+    form = CloneMarketsForm(request.POST, user=request.user, target=ev)
+    if not form.is_valid():
+        messages.error(request, "; ".join(e for errs in form.errors.values() for e in errs))
+        return redirect('bets:event_detail', pk=pk)
+
+    source = form.cleaned_data['source']
+    markets = clone_event_markets(
+        source, ev, request.user,
+        house=request.user if form.cleaned_data['be_the_house'] else None,
+        closes_at=form.cleaned_data['closes_at'],
+    )
+    messages.success(request, f"Copied {len(markets)} market(s) from {source.name}.")
+    return redirect('bets:event_detail', pk=pk)
+
+
 @login_required
 @require_POST
 def event_invite_accept(request, invite_id: int):
     inv = get_object_or_404(EventInvite, pk=invite_id, to_user=request.user, status=EventInvite.PENDING)
-    EventMembership.objects.get_or_create(event=inv.event, user=request.user, defaults={'role': EventMembership.MEMBER, 'added_by': inv.from_user})
+    join_event(inv.event, request.user, added_by=inv.from_user)
     inv.status = EventInvite.ACCEPTED; inv.save(update_fields=['status'])
     messages.success(request, f"Joined event: {inv.event.name}")
     return redirect('bets:dashboard')
@@ -188,8 +394,7 @@ def event_invite_decline(request, invite_id: int):
 def event_remove_member(request, pk: int, user_id: int):
     ev = get_object_or_404(Event, pk=pk)
 
-    is_admin = (request.user == ev.creator) or EventMembership.objects.filter(event=ev, user=request.user, role=EventMembership.ADMIN).exists()
-    if not is_admin:
+    if not _is_event_admin(ev, request.user):
         messages.error(request, "You don’t have permission to remove members.")
         return redirect('bets:event_detail', pk=pk)
 
@@ -329,7 +534,81 @@ def market_settle(request, pk: int):
         messages.success(request, 'Market settled.')
         return redirect('bets:market_detail', pk=mkt.pk)
 
-    return render(request, 'bets/market_detail.html', {'market': mkt})
+    return render_hot(request, 'bets/market_detail.html', {'market': mkt})
+
+
+@require_POST
+@login_required
+def market_void(request, pk: int):
+    mkt = get_object_or_404(Market, pk=pk)
+    if request.user != mkt.creator and request.user != mkt.house and not request.user.is_superuser:
+        messages.error(request, "You don’t have permission to void this market.")
+        return redirect('bets:market_detail', pk=mkt.pk)
+
+    if void_markets([mkt.pk]):
+        messages.success(request, "Market voided. All open stakes were refunded.")
+    else:
+        messages.error(request, "Only open or suspended markets can be voided.")
+    return redirect('bets:market_detail', pk=mkt.pk)
+
+
+@require_POST
+@login_required
+def market_save_template(request, pk: int):
+    mkt = get_object_or_404(Market, pk=pk)
+    if not can_view_market(request.user, mkt):
+        messages.error(request, "You don’t have access to this market.")
+        return redirect('bets:dashboard')
+    save_as_template(mkt, request.user)
+    messages.success(request, f"Saved “{mkt.title}” as a template.")
+    return redirect('bets:market_templates')
+
+
+@login_required
+def market_templates(request):
+    if request.method == 'POST':
+        form = UseTemplatesForm(request.POST, user=request.user)
+        if form.is_valid():
+            event = form.cleaned_data['event']
+            if form.cleaned_data['be_the_house']:
+                house = request.user
+            else:
+                house = event.default_house if event else None
+            markets = markets_from_templates(
+                form.cleaned_data['templates'], request.user,
+                event=event, house=house, closes_at=form.cleaned_data['closes_at'],
+            )
+            messages.success(request, f"Created {len(markets)} market(s).")
+            if event:
+                return redirect('bets:event_detail', pk=event.pk)
+            return redirect('bets:dashboard')
+    else:
+        form = UseTemplatesForm(user=request.user)
+
+    templates = MarketTemplate.objects.filter(owner=request.user).prefetch_related('outcomes')
+    return render(request, 'bets/market_templates.html', {'form': form, 'templates': templates})
+
+
+@require_POST
+@login_required
+def market_template_delete(request, pk: int):
+    template = get_object_or_404(MarketTemplate, pk=pk, owner=request.user)
+    template.delete()
+    messages.info(request, f"Deleted template “{template.title}”.")
+    return redirect('bets:market_templates')
+
+
+@require_POST
+@login_required
+def event_void(request, pk: int):
+    ev = get_object_or_404(Event, pk=pk)
+    if not _is_event_admin(ev, request.user):
+        messages.error(request, "You don’t have permission to void this event’s markets.")
+        return redirect('bets:event_detail', pk=ev.pk)
+
+    n = void_event(ev)
+    messages.success(request, f"Voided {n} market{'s' if n != 1 else ''}. All open stakes were refunded.")
+    return redirect('bets:event_detail', pk=ev.pk)
 
 
 @login_required
@@ -343,7 +622,7 @@ def market_share_invite(request, pk: int):
         form = MarketShareForm(request.POST)
         if form.is_valid():
             q = form.cleaned_data['query'].strip()
-            u = User.objects.filter(username__iexact=q).first() or User.objects.filter(email__iexact=q).first()
+            u = find_user(q)
             if not u:
                 messages.error(request, "User not found.")
             elif MarketShare.objects.filter(market=mkt, user=u).exists():
@@ -359,7 +638,28 @@ def market_share_invite(request, pk: int):
 
     shared_users = User.objects.filter(shared_markets__market=mkt).distinct()
     pending = MarketShareRequest.objects.filter(market=mkt, status=MarketShareRequest.PENDING)
-    return render(request, 'bets/market_share.html', {'market': mkt, 'form': form, 'shared_users': shared_users, 'pending_requests': pending})
+    return render(request, 'bets/market_share.html', {
+        'market': mkt, 'form': form, 'shared_users': shared_users, 'pending_requests': pending,
+        'bulk_form': BulkInviteForm(user=request.user),
+    })
+
+
+@require_POST
+@login_required
+def market_bulk_share(request, pk: int):
+    mkt = get_object_or_404(Market, pk=pk)
+    if request.user != mkt.creator and request.user != mkt.house and not request.user.is_superuser:
+        messages.error(request, "Only the market creator or house can share this market.")
+        return redirect('bets:market_detail', pk=pk)
+
+    form = BulkInviteForm(request.POST, user=request.user)
+    if not form.is_valid():
+        messages.error(request, "; ".join(e for errs in form.errors.values() for e in errs))
+        return redirect('bets:market_share_invite', pk=pk)
+
+    ids, unknown = invite_candidates(request.user, form.cleaned_data['source'], form.people_list(), form.cleaned_data['event'])
+    _report_bulk_invite(request, bulk_share_market(mkt, request.user, ids), unknown, "Share requests")
+    return redirect('bets:market_share_invite', pk=pk)
 
 
 @login_required
@@ -406,19 +706,15 @@ def market_remove_user(request, pk: int, user_id: int):
 
 @login_required
 def market_detail(request, pk: int):
-    mkt = get_object_or_404(Market, pk=pk)
+    mkt = Market.objects.filter(pk=pk).first()
+    if mkt is None:
+        return _archived_market_detail(request, pk)
 
     wagers = mkt.wagers.select_related('user', 'outcome').all() if mkt.status == Market.SETTLED else []
 
-    total_staked = sum((w.stake for w in wagers), Decimal('0.00'))
-
-    total_payout_raw = sum((
-        (w.stake * w.odds_at_placement) if w.outcome.is_winner else Decimal('0.00')
-        for w in wagers
-    ), Decimal('0.00'))
-
-    total_payout = total_payout_raw.quantize(TWOPLACES, rounding=ROUND_HALF_UP)
-    house_net    = (total_staked - total_payout).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+    total_staked = sum((w.stake for w in wagers), Money(0))
+    total_payout = sum((w.stake.times_odds(w.odds_at_placement) for w in wagers if w.outcome.is_winner), Money(0))
+    house_net    = total_staked - total_payout
 
     can_manage = (request.user == mkt.creator) or (request.user == mkt.house) or request.user.is_superuser
 
@@ -429,10 +725,41 @@ def market_detail(request, pk: int):
         'total_payout': total_payout,
         'house_net': house_net,
         'can_manage': can_manage,
+        'activity': activity.feed(market=mkt),
     }
-    return render(request, 'bets/market_detail.html', ctx)
+    return render_hot(request, 'bets/market_detail.html', ctx)
+
 
 @login_required
+def market_activity(request, pk: int):
+    mkt = get_object_or_404(Market, pk=pk)
+    if not can_view_market(request.user, mkt):
+        return JsonResponse({'error': "You don’t have access to this market."}, status=403)
+    return _activity_json(request, market=mkt)
+
+def _archived_market_detail(request, pk: int):
+    am = get_object_or_404(ArchivedMarket, pk=pk)
+    if not can_view_archived_market(request.user, am):
+        messages.error(request, "You don’t have access to this market.")
+        return redirect('bets:dashboard')
+
+    detail = load_archived_market(pk) or {'outcomes': [], 'wagers': []}
+    outcomes = {oc['id']: oc for oc in detail['outcomes']}
+    users = User.objects.in_bulk({w['user_id'] for w in detail['wagers']})
+    wagers = [
+        {**w, 'user': users.get(w['user_id']), 'outcome': outcomes.get(w['outcome_id'], {})}
+        for w in detail['wagers']
+    ]
+    return render(request, 'bets/market_archived.html', {
+        'market': am,
+        'outcomes': detail['outcomes'],
+        'wagers': wagers,
+        'can_manage': request.user.id in (am.creator_id, am.house_id) or request.user.is_superuser,
+    })
+
+
+@login_required
+@use_replica
 def market_history(request):
     f = request.GET.get('filter', 'all')
 
@@ -458,16 +785,17 @@ def market_history(request):
     bettor_net = {}
     for mid in bet_market_ids:
         ws = Wager.objects.filter(user=request.user, market_id=mid).select_related('outcome')
-        stakes = sum((w.stake for w in ws), Decimal('0.00'))
-        pays = sum((
-            (w.stake * w.odds_at_placement) if w.outcome.is_winner else Decimal('0.00')
-            for w in ws
-        ), Decimal('0.00'))
-        bettor_net[mid] = (pays - stakes).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+        stakes = sum((w.stake for w in ws), Money(0))
+        pays = sum((w.stake.times_odds(w.odds_at_placement) for w in ws if w.outcome.is_winner), Money(0))
+        bettor_net[mid] = pays - stakes
 
 
-    return render(request, 'bets/market_history.html', {
+    archived, archived_net = archived_history(request.user, f)
+    bettor_net.update(archived_net)
+
+    return render_hot(request, 'bets/market_history.html', {
         'settled_markets': settled,
+        'archived_markets': archived,
         'filter': f,
         'bettor_net': bettor_net,
     })
@@ -487,7 +815,7 @@ def friends(request):
         form = UserLookupForm(request.POST)
         if form.is_valid():
             q = form.cleaned_data['query'].strip()
-            u = User.objects.filter(username__iexact=q).first() or User.objects.filter(email__iexact=q).first()
+            u = find_user(q)
             if not u:
                 messages.error(request, "User not found.")
             elif u == request.user:
@@ -502,11 +830,11 @@ def friends(request):
         form = UserLookupForm()
     return render(request, 'bets/friends.html', {'friends': friends, 'form': form})
 
-def _house_net_for(mkt: Market) -> Decimal:
+def _house_net_for(mkt: Market) -> Money:
     ws = mkt.wagers.select_related('outcome').all()
-    total_staked = sum((w.stake for w in ws), Decimal('0.00'))
-    total_payout = sum(((w.stake * w.odds_at_placement) if w.outcome.is_winner else Decimal('0.00')) for w in ws)
-    return (total_staked - total_payout)
+    total_staked = sum((w.stake for w in ws), Money(0))
+    total_payout = sum((w.stake.times_odds(w.odds_at_placement) for w in ws if w.outcome.is_winner), Money(0))
+    return total_staked - total_payout
 
 
 @login_required
@@ -519,7 +847,7 @@ def friends(request):
         form = UserLookupForm(request.POST)
         if form.is_valid():
             q = form.cleaned_data['query'].strip()
-            u = User.objects.filter(username__iexact=q).first() or User.objects.filter(email__iexact=q).first()
+            u = find_user(q)
             if not u:
                 messages.error(request, "User not found.")
             elif u == request.user:
@@ -570,6 +898,12 @@ def unfriend(request, user_id: int):
     return redirect('bets:friends')
 
 
+@login_required
+def user_suggest(request):
+    users = suggest_users(request.user, request.GET.get('q', ''))
+    return JsonResponse({'results': [{'id': u.id, 'username': u.username} for u in users]})
+
+
 @login_required
 def invites(request):
     event_incoming = EventInvite.objects.filter(to_user=request.user, status=EventInvite.PENDING).select_related('event','from_user')
@@ -579,6 +913,7 @@ def invites(request):
     friend_incoming.update(seen=True)
     event_incoming.update(seen=True)
     market_incoming.update(seen=True)
+    usercache.invalidate(request.user.id)
 
     return render(request, 'bets/invites.html', {
         'event_incoming': event_incoming,
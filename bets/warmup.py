@@ -0,0 +1,117 @@
+# bets/warmup.py
+"""Warm a worker before it accepts traffic.
+
+A fresh worker pays on its first requests for work that every later request
+reuses:
+
+* building the URL resolver;
+* compiling templates (both engines cache compiled templates per process);
+* importing the database backend and checking that the ``connection_created``
+  hooks (SQLite pragmas, the slow-query log) run cleanly;
+* first-use costs such as the static manifest, the ``formatting`` filters
+  and the Decimal arithmetic in ``compute_odds``.
+
+``warm_up`` does all of that up front. ``be_the_house/wsgi.py`` calls it after
+building the application when ``WARMUP_ON_BOOT`` is set. It closes the
+connections it opened before returning: wsgi.py may run in a master process
+that later forks (``gunicorn --preload``), and a SQLite connection must not be
+shared with the children. Each worker reconnects on its first query.
+``manage.py bench_startup`` measures the effect.
+"""
+from __future__ import annotations
+import logging
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.template import engines
+from django.templatetags.static import static
+from django.urls import NoReverseMatch, get_resolver, reverse
+
+log = logging.getLogger(__name__)
+
+
+def resolve_urls() -> int:
+    """Build the resolver and reverse every ``bets:`` URL name once; returns how many reversed."""
+    resolver = get_resolver()
+    resolver.resolve('/')
+    _, app_resolver = resolver.namespace_dict['bets']
+    done = 0
+    for name in [k for k in app_resolver.reverse_dict if isinstance(k, str)]:
+        for possibilities, *_ in app_resolver.reverse_dict.getlist(name):
+            _, params = possibilities[0]
+            try:
+                reverse(f'bets:{name}', kwargs={p: 1 for p in params})
+            except NoReverseMatch:  # a converter that rejects 1; the resolver is built regardless
+                continue
+            done += 1
+            break
+    return done
+
+
+def compile_templates(prefix: str = 'bets/') -> int:
+    """Load every ``prefix`` template through each configured engine, so it is compiled and cached."""
+    done = 0
+    for engine in engines.all():
+        names = set()
+        for root in engine.template_dirs:
+            base = Path(root) / prefix
+            if base.is_dir():
+                names.update(f'{prefix}{p.relative_to(base).as_posix()}' for p in base.rglob('*.html'))
+        for name in sorted(names):
+            engine.get_template(name)
+            done += 1
+    return done
+
+
+def open_connections() -> int:
+    """Connect every configured database and run one query on it."""
+    for alias in connections:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+    return len(connections.all())
+
+
+def prime_caches() -> None:
+    from .services import compute_odds
+    from .templatetags.formatting import money, oddsfmt, pct
+
+    static('bets/styles.css')  # loads the staticfiles manifest
+    money(Decimal('1.5'))
+    oddsfmt(Decimal('1.005'))
+    pct(0.5)
+    compute_odds([50, 50], Decimal('0.05'))
+    cache.get('bets:warmup')
+
+
+STEPS = [
+    ('urls', resolve_urls),
+    ('templates', compile_templates),
+    ('database', open_connections),
+    ('caches', prime_caches),
+]
+
+
+def warm_up() -> dict[str, float]:
+    """Run every warm-up step; returns milliseconds per step. A failing step is logged, not raised."""
+    timings = {}
+    try:
+        for name, step in STEPS:
+            t0 = time.perf_counter()
+            try:
+                step()
+            except Exception:
+                log.exception("Warm-up step %r failed", name)
+            timings[name] = (time.perf_counter() - t0) * 1000
+    finally:
+        connections.close_all()
+    log.info("Worker warm-up: %s", ', '.join(f'{k} {v:.0f} ms' for k, v in timings.items()))
+    return timings
+
+
+def warm_up_if_enabled() -> None:
+    if getattr(settings, 'WARMUP_ON_BOOT', False):
+        warm_up()
@@ -110,3 +110,65 @@ function setupOutcomeBuilder(initialOutcomes) {
   renderPreview();
 }
 
+
+function setupUserSuggest(input) {
+  const list = document.createElement('datalist');
+  list.id = `${input.id || input.name}-suggestions`;
+  input.setAttribute('list', list.id);
+  input.after(list);
+
+  let timer = null;
+  let last = '';
+  input.addEventListener('input', () => {
+    const q = input.value.trim();
+    clearTimeout(timer);
+    if (!q || q === last) return;
+    timer = setTimeout(async () => {
+      last = q;
+      const res = await fetch(`${input.dataset.userSuggest}?q=${encodeURIComponent(q)}`, {
+        headers: { 'Accept': 'application/json' },
+      });
+      if (!res.ok) return;
+      const data = await res.json();
+      list.innerHTML = '';
+      data.results.forEach(u => {
+        const opt = document.createElement('option');
+        opt.value = u.username;
+        list.appendChild(opt);
+      });
+    }, 150);
+  });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+  document.querySelectorAll('[data-user-suggest]').forEach(setupUserSuggest);
+});
+
+// Poll an activity feed (bets.activity) for items newer than the list's data-cursor.
+function setupActivityFeed(listId, intervalMs = 15000) {
+  const list = document.getElementById(listId);
+  if (!list) return;
+
+  async function poll() {
+    if (document.hidden) return;
+    const res = await fetch(`${list.dataset.url}?since=${list.dataset.cursor || 0}`, {
+      headers: { 'Accept': 'application/json' },
+    });
+    if (!res.ok) return;
+    const data = await res.json();
+    list.dataset.cursor = data.cursor;
+    if (data.items.length) list.querySelector('[data-empty]')?.remove();
+    // items come oldest first; prepending each leaves the newest on top
+    data.items.forEach(item => {
+      const li = document.createElement('li');
+      const when = document.createElement('span');
+      when.className = 'badge';
+      when.textContent = new Date(item.created_at).toLocaleString([], { month: 'short', day: 'numeric', hour: '2-digit', minute: '2-digit' });
+      li.append(when, ' ', item.text);
+      list.prepend(li);
+    });
+    if (data.more) return poll();
+  }
+
+  setInterval(() => poll().catch(() => {}), intervalMs);
+}